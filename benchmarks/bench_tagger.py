@@ -0,0 +1,65 @@
+import re
+import json
+import time
+import random
+import string
+from typing import Dict, List, Any
+from src.data.coins import build_alias_table
+from src.data.tagger import CoinTagger
+
+def synthetic_aliases(coins: int, seed: int = 0) -> Dict[str, List[str]]:
+    rng = random.Random(seed)
+    aliases = build_alias_table(extra_path=None)
+    while len(aliases) < coins:
+        name = ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 10)))
+        ticker = ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 4)))
+        aliases[f'{name}-token'] = [name, ticker, f'{name} token']
+    return aliases
+
+def synthetic_posts(aliases: Dict[str, List[str]], count: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    filler = ['the', 'market', 'is', 'moving', 'canada', 'adaptive', 'today', 'buy', 'sell', 'hodl', 'moon', 'chart']
+    names = [alias for values in aliases.values() for alias in values]
+    posts = []
+    for _ in range(count):
+        words = rng.choices(filler, k=rng.randint(10, 60))
+        for _ in range(rng.randint(0, 3)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(names).upper() if rng.random() < 0.3 else rng.choice(names))
+        posts.append(' '.join(words))
+    return posts
+
+def naive_tag(patterns: List[tuple], text: str) -> List[str]:
+    found = []
+    for crypto_id, pattern in patterns:
+        if crypto_id not in found and pattern.search(text):
+            found.append(crypto_id)
+    return found
+
+def benchmark_tagger(coins: int = 300, posts: int = 5000) -> Dict[str, Any]:
+    aliases = synthetic_aliases(coins)
+    corpus = synthetic_posts(aliases, posts)
+    start = time.perf_counter()
+    tagger = CoinTagger(aliases)
+    build_seconds = time.perf_counter() - start
+    patterns = [(crypto_id, re.compile(rf'(?<!\w){re.escape(alias)}(?!\w)', re.IGNORECASE))
+                for crypto_id, values in aliases.items() for alias in values]
+    start = time.perf_counter()
+    automaton_tags = [tagger.tag(text) for text in corpus]
+    automaton_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    naive_tags = [naive_tag(patterns, text) for text in corpus]
+    naive_seconds = time.perf_counter() - start
+    agreement = sum(sorted(a) == sorted(b) for a, b in zip(automaton_tags, naive_tags)) / len(corpus)
+    return {
+        'coins': len(aliases),
+        'patterns': tagger.pattern_count,
+        'posts': len(corpus),
+        'build_seconds': build_seconds,
+        'automaton_posts_per_sec': len(corpus) / automaton_seconds,
+        'naive_regex_posts_per_sec': len(corpus) / naive_seconds,
+        'speedup': naive_seconds / automaton_seconds,
+        'agreement': agreement
+    }
+
+if __name__ == '__main__':
+    print(json.dumps(benchmark_tagger(), indent=2))
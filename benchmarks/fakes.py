@@ -0,0 +1,166 @@
+import json
+import time
+import zlib
+import random
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+WORDS = ['market', 'pump', 'dump', 'hodl', 'moon', 'bearish', 'bullish', 'whale', 'rally', 'crash', 'support',
+         'resistance', 'breakout', 'fees', 'staking', 'etf', 'halving', 'wallet', 'exchange', 'chart', 'today',
+         'great', 'terrible', 'love', 'hate', 'buy', 'sell', 'long', 'short', 'liquidated', 'gm', 'wagmi']
+COINS = ['bitcoin', 'btc', 'ethereum', 'eth', 'bnb', 'xrp', 'cardano', 'ada', 'dogecoin', 'doge']
+
+def synthetic_texts(count: int, seed: int = 0, min_words: int = 5, max_words: int = 60) -> List[str]:
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        words = rng.choices(WORDS, k=rng.randint(min_words, max_words))
+        words.insert(rng.randrange(len(words) + 1), rng.choice(COINS))
+        texts.append(' '.join(words))
+    return texts
+
+class FakeCoinGeckoHandler(BaseHTTPRequestHandler):
+    history_days = 365
+    latency = 0.0
+
+    def _body(self) -> Optional[dict]:
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path.endswith('/simple/price'):
+            currencies = params.get('vs_currencies', ['usd'])[0].split(',')
+            return {coin: {cur: 100.0 + i for i, cur in enumerate(currencies)} for coin in params.get('ids', [''])[0].split(',')}
+        if url.path.endswith('/market_chart'):
+            days = min(int(float(params.get('days', ['1'])[0])), self.history_days)
+            end = int(time.time() // 86400 * 86400 * 1000)
+            points = [end - (days - i) * 86400000 for i in range(days + 1)]
+            return {
+                'prices': [[t, 100.0 + i % 50] for i, t in enumerate(points)],
+                'total_volumes': [[t, 1e6 + i] for i, t in enumerate(points)],
+                'market_caps': [[t, 1e9 + i] for i, t in enumerate(points)]
+            }
+        return None
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        body = self._body()
+        payload = json.dumps(body if body is not None else {'error': 'not found'}).encode('utf-8')
+        self.send_response(200 if body is not None else 404)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+class FakeCoinGeckoServer:
+    def __init__(self, history_days: int = 365, latency: float = 0.0):
+        handler = type('Handler', (FakeCoinGeckoHandler,), {'history_days': history_days, 'latency': latency})
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self.server.server_address[1]}/api/v3'
+
+    def __enter__(self) -> 'FakeCoinGeckoServer':
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+class FakeTweepyClient:
+    def __init__(self, tweets_per_query: int = 500, latency: float = 0.0, seed: int = 0, **kwargs):
+        self.tweets_per_query = tweets_per_query
+        self.latency = latency
+        self.seed = seed
+        self.calls = 0
+        self._tweets: Dict[str, list] = {}
+
+    def _corpus(self, query: str) -> list:
+        if query not in self._tweets:
+            digest = zlib.crc32(query.encode('utf-8'))
+            texts = synthetic_texts(self.tweets_per_query, seed=self.seed + digest)
+            base = 10 ** 12 + (digest & 0xffff) * 10 ** 6
+            created = datetime.now(timezone.utc)
+            self._tweets[query] = [
+                SimpleNamespace(id=base + self.tweets_per_query - i, text=text, lang='en', created_at=created,
+                                public_metrics={'like_count': i % 7, 'retweet_count': i % 3, 'reply_count': i % 2})
+                for i, text in enumerate(texts)
+            ]
+        return self._tweets[query]
+
+    def search_recent_tweets(self, query, max_results=10, since_id=None, until_id=None, next_token=None,
+                             tweet_fields=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        self.calls += 1
+        tweets = [t for t in self._corpus(query)
+                  if (since_id is None or t.id > int(since_id)) and (until_id is None or t.id < int(until_id))]
+        offset = int(next_token or 0)
+        page = tweets[offset:offset + max_results]
+        meta = {'newest_id': str(tweets[0].id)} if tweets else {}
+        if offset + max_results < len(tweets):
+            meta['next_token'] = str(offset + max_results)
+        return SimpleNamespace(data=page or None, meta=meta)
+
+class FakeSubreddit:
+    def __init__(self, name: str, posts: int, latency: float = 0.0):
+        now = time.time()
+        self.latency = latency
+        self.posts = [
+            SimpleNamespace(id=f'{name}-{i}', title=title, selftext=text, created_utc=now - 30 * i,
+                            score=i % 100, num_comments=i % 20, url=f'https://reddit.com/{name}/{i}')
+            for i, (title, text) in enumerate(zip(synthetic_texts(posts, seed=1, max_words=12),
+                                                  synthetic_texts(posts, seed=2)))
+        ]
+
+    def new(self, limit=None):
+        for post in self.posts[:limit]:
+            if self.latency:
+                time.sleep(self.latency)
+            yield post
+
+class FakeReddit:
+    posts_per_subreddit = 100
+    latency = 0.0
+    _subreddits: Dict[str, FakeSubreddit] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, **kwargs):
+        pass
+
+    @classmethod
+    def configure(cls, posts_per_subreddit: int, latency: float = 0.0):
+        cls.posts_per_subreddit = posts_per_subreddit
+        cls.latency = latency
+        cls._subreddits = {}
+
+    def subreddit(self, name: str) -> FakeSubreddit:
+        with self._lock:
+            if name not in self._subreddits:
+                self._subreddits[name] = FakeSubreddit(name, self.posts_per_subreddit, self.latency)
+            return self._subreddits[name]
+
+class FakePipeline:
+    def __init__(self, batch_latency: float = 0.0, item_latency: float = 0.0):
+        self.batch_latency = batch_latency
+        self.item_latency = item_latency
+
+    @staticmethod
+    def _score(text: str) -> dict:
+        bucket = sum(map(ord, text[:32])) % 3
+        return {'label': ['POS', 'NEU', 'NEG'][bucket], 'score': 0.5 + (len(text) % 50) / 100}
+
+    def __call__(self, inputs, **kwargs):
+        batch = [inputs] if isinstance(inputs, str) else list(inputs)
+        if self.batch_latency or self.item_latency:
+            time.sleep(self.batch_latency + self.item_latency * len(batch))
+        return [self._score(text) for text in batch]
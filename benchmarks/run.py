@@ -0,0 +1,354 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import platform
+import argparse
+import tempfile
+import functools
+import subprocess
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Dict, Any, Callable, Iterator, List, Optional
+from unittest import mock
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.fakes import FakeCoinGeckoServer, FakeTweepyClient, FakeReddit, FakePipeline, synthetic_texts
+
+SIZES = {
+    'small': {'tweets_per_coin': 200, 'posts_per_subreddit': 100, 'history_days': 365, 'texts': 2000,
+              'files': 20, 'records_per_file': 100},
+    'medium': {'tweets_per_coin': 1000, 'posts_per_subreddit': 500, 'history_days': 1000, 'texts': 20000,
+               'files': 100, 'records_per_file': 200},
+    'large': {'tweets_per_coin': 5000, 'posts_per_subreddit': 2000, 'history_days': 2000, 'texts': 100000,
+              'files': 400, 'records_per_file': 250}
+}
+CREDENTIALS = ['TWITTER_API_KEY', 'TWITTER_API_SECRET', 'TWITTER_ACCESS_TOKEN', 'TWITTER_ACCESS_TOKEN_SECRET',
+               'REDDIT_CLIENT_ID', 'REDDIT_CLIENT_SECRET']
+
+@contextmanager
+def workspace() -> Iterator[str]:
+    # Collectors, caches and the dashboard all resolve data/ relative to the working directory.
+    cwd = os.getcwd()
+    path = tempfile.mkdtemp(prefix='cryptopulse-bench-')
+    os.chdir(path)
+    try:
+        yield path
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(path, ignore_errors=True)
+
+def timed(fn: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def synthetic_records(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    now = time.time()
+    coins = ['bitcoin', 'ethereum', 'binancecoin', 'ripple', 'cardano', 'dogecoin']
+    return [{'id': f'{seed}-{i}', 'title': text[:40], 'text': text, 'created_utc': now - 60 * i,
+             'crypto_id': coins[i % len(coins)], 'score': i % 100}
+            for i, text in enumerate(synthetic_texts(count, seed=seed))]
+
+def fast_limiter():
+    from src.data.rate_limiter import TokenBucket
+    return TokenBucket(rate=1e6, capacity=1e6, name='bench')
+
+def bench_collectors(size: Dict[str, int], latency: float = 0.0) -> Dict[str, Any]:
+    from src.data import reddit_collector, twitter_collector
+    from src.data.collector import DataCollector
+    from src.data.metrics import METRICS
+    FakeReddit.configure(size['posts_per_subreddit'], latency)
+    twitter_client = FakeTweepyClient(tweets_per_query=size['tweets_per_coin'], latency=latency)
+    results = {}
+    with FakeCoinGeckoServer(history_days=size['history_days'], latency=latency) as server, \
+            mock.patch.dict(os.environ, {name: 'bench' for name in CREDENTIALS}), \
+            mock.patch.object(reddit_collector.praw, 'Reddit', FakeReddit), \
+            mock.patch.object(twitter_collector.tweepy, 'Client', lambda **kwargs: twitter_client):
+        collector = DataCollector()
+        for source in (collector.twitter, collector.reddit, collector.price):
+            source.rate_limiter = fast_limiter()
+        collector.price.base_url = server.base_url
+        collector.price.history_days = size['history_days']
+        collector.twitter.collect_all_tweets = functools.partial(
+            collector.twitter.collect_all_tweets, max_results_per_crypto=size['tweets_per_coin'])
+        collector.reddit.collect_all = functools.partial(collector.reddit.collect_all, limit=size['posts_per_subreddit'])
+        # The first cycle backfills everything; the second only sees what the cursors have not covered.
+        for cycle in ('cold', 'warm'):
+            calls = twitter_client.calls
+            METRICS.reset()
+            start = time.perf_counter()
+            report = collector.collect_all()
+            results[cycle] = {
+                'cycle_seconds': time.perf_counter() - start,
+                'sources': {name: {'status': r['status'], 'seconds': r['duration']} for name, r in report.items()},
+                'stage_seconds': {name: totals['seconds'] for name, totals in METRICS.stage_summary().items()},
+                'twitter_requests': twitter_client.calls - calls
+            }
+    return results
+
+def bench_analyzer(size: Dict[str, int], model: Optional[str] = None, batch_latency: float = 0.0) -> Dict[str, Any]:
+    from src.sentiment import backends
+    from src.sentiment.analyzer import SentimentAnalyzer
+    from src.sentiment.cache import SentimentCache
+    from src.sentiment.prefilter import PreInferenceFilter
+    patch = (mock.patch.object(backends, 'pipeline', lambda *args, **kwargs: FakePipeline(batch_latency))
+             if model is None else nullcontext())
+    texts = synthetic_texts(size['texts'], seed=3)
+    results = {'model': model or 'stub', 'texts': len(texts)}
+    with patch:
+        analyzer = SentimentAnalyzer(**({'model_name': model} if model else {}))
+        # Unbatched inference is only sampled; it exists to show what batching buys.
+        for batch_size, sample in ((1, texts[:max(1, len(texts) // 8)]), (32, texts)):
+            seconds = timed(lambda: analyzer.analyze_texts(sample, batch_size=batch_size))
+            results[f'batch{batch_size}_items_per_sec'] = len(sample) / seconds
+        analyzer.cache = SentimentCache(analyzer.model_id, db_path='data/cache/bench.sqlite')
+        results['cache_cold_items_per_sec'] = len(texts) / timed(lambda: analyzer.analyze_texts(texts))
+        results['cache_warm_items_per_sec'] = len(texts) / timed(lambda: analyzer.analyze_texts(texts))
+        analyzer.cache.close()
+        analyzer.cache = None
+        # Bot-style copies (extra emoji and a fresh link) of half the corpus, to show what the prefilter saves.
+        copies = [f'{text} 🚀 https://t.co/{i}' for i, text in enumerate(texts[:len(texts) // 2])]
+        analyzer.prefilter = PreInferenceFilter()
+        results['prefilter_items_per_sec'] = (len(texts) + len(copies)) / timed(
+            lambda: analyzer._score_texts(texts + copies, batch_size=32))
+        results['prefilter_avoided_fraction'] = analyzer.prefilter.report()['avoided_fraction']
+        analyzer.prefilter = None
+        os.makedirs('data/bench/input', exist_ok=True)
+        for i in range(size['files']):
+            with open(f'data/bench/input/posts_{i:05d}.json', 'w', encoding='utf-8') as f:
+                json.dump(synthetic_records(size['records_per_file'], seed=i), f)
+        items = size['files'] * size['records_per_file']
+        seconds = timed(lambda: analyzer.analyze_directory('data/bench/input', 'data/bench/output', incremental=True))
+        results['directory_items_per_sec'] = items / seconds
+        results['directory_files_per_sec'] = size['files'] / seconds
+        results['directory_rerun_seconds'] = timed(
+            lambda: analyzer.analyze_directory('data/bench/input', 'data/bench/output', incremental=True))
+    return results
+
+def peak_memory(fn: Callable[[], Any]) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+def bench_io(size: Dict[str, int]) -> Dict[str, Any]:
+    from src.data import records as record_io
+    from src.data.storage import DataStore
+    from src.sentiment.manifest import write_json_atomic
+    records = synthetic_records(size['files'] * size['records_per_file'], seed=4)
+    os.makedirs('data/bench/io', exist_ok=True)
+    path = 'data/bench/io/records.json'
+    write_seconds = timed(lambda: write_json_atomic(path, records))
+    megabytes = os.path.getsize(path) / 1e6
+
+    def read():
+        with open(path, 'r', encoding='utf-8') as f:
+            json.load(f)
+    read_seconds = timed(read)
+    results = {
+        'records': len(records),
+        'json_megabytes': megabytes,
+        'json_write_mb_per_sec': megabytes / write_seconds,
+        'json_read_mb_per_sec': megabytes / read_seconds,
+        'json_read_records_per_sec': len(records) / read_seconds,
+        'json_read_peak_mb': peak_memory(read)
+    }
+    # Streaming formats: sizes are on-disk bytes, peak memory is what a full pass over the file allocates.
+    encoders = {'orjson': record_io.orjson, 'stdlib': None} if record_io.orjson is not None else {'stdlib': None}
+    for encoder, module in encoders.items():
+        with mock.patch.object(record_io, 'orjson', module):
+            for suffix in ('.jsonl', '.jsonl.gz', '.json'):
+                name = f'{suffix.lstrip(".").replace(".", "_")}_{encoder}'
+                target = f'data/bench/io/records{suffix}'
+                seconds = timed(lambda: record_io.write_records(target, iter(records)))
+                results[f'{name}_megabytes'] = os.path.getsize(target) / 1e6
+                results[f'{name}_write_records_per_sec'] = len(records) / seconds
+                scan = lambda: sum(1 for _ in record_io.iter_records(target))
+                results[f'{name}_read_records_per_sec'] = len(records) / timed(scan)
+                results[f'{name}_read_peak_mb'] = peak_memory(scan)
+    store = DataStore('data/bench/store')
+    results['store_append_records_per_sec'] = len(records) / timed(lambda: store.append('posts', records, time_key='created_utc'))
+    results['store_query_seconds'] = timed(lambda: store.query('posts', coins=['bitcoin']))
+    return results
+
+def bench_dashboard(size: Dict[str, int]) -> Dict[str, Any]:
+    from streamlit.testing.v1 import AppTest
+    from src.data.price_collector import PriceCollector
+    from src.sentiment.manifest import write_json_atomic
+    with FakeCoinGeckoServer(history_days=size['history_days']) as server:
+        collector = PriceCollector(base_url=server.base_url, rate_limiter=fast_limiter())
+        collector.history_days = size['history_days']
+        collector.collect_all_data()
+    records = synthetic_records(size['records_per_file'] * 10, seed=5)
+    for record in records:
+        scored = FakePipeline._score(record['text'])
+        record['sentiment_analysis'] = {'sentiment': scored['label'].lower(), 'confidence': scored['score']}
+    os.makedirs('data/sentiment/reddit', exist_ok=True)
+    write_json_atomic(f'data/sentiment/reddit/sentiment_posts_{datetime.now():%Y%m%d_%H%M%S}.json', records)
+    app = AppTest.from_file(os.path.join(REPO_ROOT, 'webapp', 'app.py'), default_timeout=120)
+    results = {'cold_seconds': timed(app.run), 'warm_seconds': timed(app.run)}
+    if app.exception:
+        results['exception'] = str(app.exception[0].value)
+    pages = {}
+    for page in app.sidebar.radio[0].options if app.sidebar.radio else []:
+        radio = app.sidebar.radio[0]
+        pages[page] = timed(lambda: radio.set_value(page).run())
+    results['page_seconds'] = pages
+    return results
+
+def bench_tagger(size: Dict[str, int]) -> Dict[str, Any]:
+    from benchmarks.bench_tagger import benchmark_tagger
+    return benchmark_tagger(posts=size['texts'])
+
+def bench_ticks(size: Dict[str, int], capacity: int = 4096) -> Dict[str, Any]:
+    from src.data.coins import CRYPTOCURRENCIES
+    from src.data.records import read_records, write_records
+    from src.data.ticks import TickBuffer
+    coins = list(CRYPTOCURRENCIES)
+    snapshot = {coin: {f'{cur}{suffix}': 1.0 for cur in ('usd', 'eur', 'gbp', 'jpy')
+                       for suffix in ('', '_24h_vol', '_market_cap', '_24h_change')} for coin in coins}
+    buffer = TickBuffer(coins, ['usd', 'eur', 'gbp', 'jpy'], capacity=capacity)
+    ticks = size['texts']
+    append_seconds = timed(lambda: [buffer.append(float(i), snapshot) for i in range(ticks)])
+    reads = 1000
+    window_seconds = timed(lambda: [buffer.window(coins[i % len(coins)], n=240) for i in range(reads)])
+    latest_seconds = timed(lambda: [buffer.latest() for _ in range(reads)])
+    # The file path the dashboard used before: one snapshot file per collection, re-read on every refresh.
+    write_records('data/prices_current_bench.jsonl', [{'crypto_id': coin, **values} for coin, values in snapshot.items()])
+    file_seconds = timed(lambda: [read_records('data/prices_current_bench.jsonl') for _ in range(reads)])
+    return {
+        'appends_per_sec': ticks / append_seconds,
+        'window_us': window_seconds / reads * 1e6,
+        'latest_us': latest_seconds / reads * 1e6,
+        'file_read_us': file_seconds / reads * 1e6
+    }
+
+STARTUP_SNIPPETS = {
+    'interpreter': 'pass',
+    'import_collector': 'import src.data.collector',
+    'import_analyzer': 'import src.sentiment.analyzer',
+    'import_storage': 'import src.data.storage',
+    'prices_only': 'from src.data.collector import DataCollector; DataCollector(sources=["price"]).price'
+}
+HEAVY_MODULES = ('tweepy', 'praw', 'transformers', 'torch', 'pandas', 'pyarrow')
+
+def bench_startup(size: Dict[str, int], repeat: int = 5) -> Dict[str, Any]:
+    # Each snippet runs in a fresh interpreter; the best of several runs filters out disk cache noise.
+    env = {**os.environ, 'PYTHONPATH': REPO_ROOT + os.pathsep + os.environ.get('PYTHONPATH', '')}
+    env = {name: value for name, value in env.items() if name not in CREDENTIALS}
+    results = {}
+    for name, snippet in STARTUP_SNIPPETS.items():
+        probe = f'{snippet}\nimport sys, json; print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))'
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = subprocess.run([sys.executable, '-c', probe], env=env, capture_output=True, text=True, check=True).stdout
+            best = min(best, time.perf_counter() - start)
+        results[f'{name}_seconds'] = best
+        results[f'{name}_heavy_modules'] = json.loads(output.strip().splitlines()[-1])
+    return results
+
+SUITES = {
+    'startup': bench_startup,
+    'collectors': bench_collectors,
+    'analyzer': bench_analyzer,
+    'io': bench_io,
+    'dashboard': bench_dashboard,
+    'tagger': bench_tagger,
+    'ticks': bench_ticks
+}
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(suites: List[str], size_name: str = 'small', model: Optional[str] = None, latency: float = 0.0) -> Dict[str, Any]:
+    size = SIZES[size_name]
+    report = {
+        'revision': git_revision(),
+        'timestamp': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'size': size_name,
+        'parameters': size,
+        'results': {}
+    }
+    for name in suites:
+        with workspace():
+            kwargs = {}
+            if name == 'analyzer':
+                kwargs = {'model': model, 'batch_latency': latency}
+            elif name == 'collectors':
+                kwargs = {'latency': latency}
+            start = time.perf_counter()
+            try:
+                report['results'][name] = SUITES[name](size, **kwargs)
+            except Exception as e:
+                report['results'][name] = {'error': f'{type(e).__name__}: {e}'}
+            report['results'][name]['suite_seconds'] = time.perf_counter() - start
+    return report
+
+def _flatten(results: Dict[str, Any], prefix: str = '') -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}.{key}' if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.1) -> List[Dict[str, Any]]:
+    old, new = _flatten(baseline['results']), _flatten(current['results'])
+    rows = []
+    for name in sorted(set(old) & set(new)):
+        higher_is_better = name.endswith('_per_sec')
+        if not (higher_is_better or name.endswith('_seconds')) or not old[name]:
+            continue
+        change = (new[name] - old[name]) / old[name]
+        regressed = change < -threshold if higher_is_better else change > threshold
+        rows.append({'metric': name, 'baseline': old[name], 'current': new[name], 'change': change, 'regressed': regressed})
+    return rows
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Offline CryptoPulse benchmarks')
+    parser.add_argument('suites', nargs='*', help=f'Suites to run (default all): {", ".join(SUITES)}')
+    parser.add_argument('--size', choices=list(SIZES), default='small')
+    parser.add_argument('--model', help='Real sentiment model to benchmark instead of the stub pipeline')
+    parser.add_argument('--latency', type=float, default=0.0, help='Simulated per-request/per-batch latency in seconds')
+    parser.add_argument('--output', help='Where to write the JSON report (default benchmarks/results/<revision>_<size>.json)')
+    parser.add_argument('--compare', help='Baseline report to compare against; exits non-zero on regressions')
+    parser.add_argument('--threshold', type=float, default=0.1)
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.suites if name not in SUITES]
+    if unknown:
+        parser.error(f'unknown suites: {", ".join(unknown)}')
+    logging.disable(logging.INFO)
+    report = run(args.suites or list(SUITES), args.size, args.model, args.latency)
+    output = args.output or os.path.join(REPO_ROOT, 'benchmarks', 'results', f'{report["revision"] or "local"}_{args.size}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            rows = compare(json.load(f), report, args.threshold)
+        for row in rows:
+            flag = 'REGRESSED' if row['regressed'] else ''
+            print(f"{row['metric']:<60} {row['baseline']:>12.4g} -> {row['current']:>12.4g} ({row['change']:+.1%}) {flag}")
+        return 1 if any(row['regressed'] for row in rows) else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -14,6 +14,7 @@ setup(
         "requests==2.31.0",
         "pandas==2.2.1",
         "numpy==1.26.4",
+        "pyarrow==15.0.2",
         "python-dotenv==1.0.1",
         "transformers==4.37.2",
         "torch==2.2.1",
@@ -0,0 +1,38 @@
+import os
+import json
+import logging
+from typing import Dict, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CRYPTOCURRENCIES = {
+    'bitcoin': 'Bitcoin',
+    'ethereum': 'Ethereum',
+    'binancecoin': 'BNB',
+    'ripple': 'XRP',
+    'cardano': 'Cardano',
+    'dogecoin': 'Dogecoin'
+}
+
+CRYPTO_KEYWORDS = {
+    'bitcoin': ['bitcoin', 'btc', '#bitcoin', '#btc'],
+    'ethereum': ['ethereum', 'eth', '#ethereum', '#eth'],
+    'binancecoin': ['bnb', 'binance coin', '#bnb'],
+    'ripple': ['ripple', 'xrp', '#ripple', '#xrp'],
+    'cardano': ['cardano', 'ada', '#cardano', '#ada'],
+    'dogecoin': ['dogecoin', 'doge', '#dogecoin', '#doge']
+}
+
+def build_alias_table(extra_path: Optional[str] = 'data/coin_aliases.json') -> Dict[str, List[str]]:
+    aliases: Dict[str, set] = {}
+    for crypto_id, name in CRYPTOCURRENCIES.items():
+        aliases.setdefault(crypto_id, set()).update({crypto_id, name.lower()})
+    for crypto_id, keywords in CRYPTO_KEYWORDS.items():
+        aliases.setdefault(crypto_id, set()).update(keyword.lstrip('#$').lower() for keyword in keywords)
+    if extra_path and os.path.exists(extra_path):
+        with open(extra_path, 'r', encoding='utf-8') as f:
+            for crypto_id, extra in json.load(f).items():
+                aliases.setdefault(crypto_id, set()).update(alias.lstrip('#$').lower() for alias in extra)
+        logger.info(f'Loaded extra coin aliases from {extra_path}')
+    return {crypto_id: sorted(values) for crypto_id, values in aliases.items()}
@@ -1,33 +1,116 @@
+import os
 import logging
-from src.data.twitter_collector import TwitterCollector
-from src.data.reddit_collector import RedditCollector
-from src.data.price_collector import PriceCollector
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from typing import Dict, Any, Callable, Iterable, Optional, TYPE_CHECKING
+from src.data.metrics import METRICS, MetricsRegistry, profiled
 import time
 
+if TYPE_CHECKING:
+    from src.data.storage import DataStore
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SOURCES = ('twitter', 'reddit', 'price')
+
+def parse_sources(sources: Optional[Iterable[str]] = None) -> tuple:
+    if sources is None:
+        sources = [s for s in os.getenv('CRYPTOPULSE_SOURCES', '').split(',') if s.strip()] or SOURCES
+    selected = tuple(dict.fromkeys(s.strip().lower() for s in sources))
+    unknown = [s for s in selected if s not in SOURCES]
+    if unknown:
+        raise ValueError(f'Unknown data sources: {", ".join(unknown)} (expected any of {", ".join(SOURCES)})')
+    return selected
+
 class DataCollector:
-    def __init__(self):
-        self.twitter = TwitterCollector()
-        self.reddit = RedditCollector()
-        self.price = PriceCollector()
-
-    def collect_all(self):
-        logger.info('Starting Twitter data collection...')
-        self.twitter.collect_all_tweets()
-        logger.info('Starting Reddit data collection...')
-        self.reddit.collect_all()
-        logger.info('Starting price data collection...')
-        self.price.collect_all_data()
-        logger.info('All data collection complete.')
-
-    def schedule_collection(self, interval_minutes=60):
+    # Source collectors (and the tweepy/praw/requests stacks behind them) are only imported and built
+    # when first used, so a prices-only job never needs social media credentials.
+    def __init__(self, store: Optional['DataStore'] = None, metrics: Optional[MetricsRegistry] = None,
+                 sources: Optional[Iterable[str]] = None):
+        self.store = store
+        self.metrics = metrics or METRICS
+        self.sources = parse_sources(sources)
+
+    @cached_property
+    def twitter(self):
+        from src.data.twitter_collector import TwitterCollector
+        return TwitterCollector(store=self.store)
+
+    @cached_property
+    def reddit(self):
+        from src.data.reddit_collector import RedditCollector
+        return RedditCollector(store=self.store)
+
+    @cached_property
+    def price(self):
+        from src.data.price_collector import PriceCollector
+        return PriceCollector(store=self.store)
+
+    def _run_source(self, name: str, collect: Callable[[], Any]) -> Dict[str, Any]:
+        logger.info(f'Starting {name} data collection...')
+        start = time.perf_counter()
+        try:
+            collect()
+            status = {'status': 'ok'}
+        except Exception as e:
+            logger.error(f'{name} data collection failed: {e}')
+            self.metrics.error(name.lower(), 'collect')
+            status = {'status': 'error', 'error': str(e)}
+        status['duration'] = time.perf_counter() - start
+        logger.info(f'{name} data collection finished in {status["duration"]:.1f}s ({status["status"]})')
+        return status
+
+    def collect_all(self, profile_path: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        # Collectors are resolved inside the worker, so one that cannot be built (e.g. missing credentials)
+        # only fails its own source.
+        collectors = {
+            'twitter': ('Twitter', lambda: self.twitter.collect_all_tweets()),
+            'reddit': ('Reddit', lambda: self.reddit.collect_all()),
+            'price': ('Price', lambda: self.price.collect_all_data())
+        }
+        sources = dict(collectors[source] for source in self.sources)
+        if not sources:
+            logger.warning('No data sources selected; nothing to collect')
+            return {}
+        before = self.metrics.stage_summary()
+        start = time.perf_counter()
+        # cProfile only sees the thread it was enabled on, so a profiled cycle runs the sources sequentially.
+        with profiled(profile_path):
+            if profile_path:
+                report = {name: self._run_source(name, collect) for name, collect in sources.items()}
+            else:
+                with ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix='collector') as executor:
+                    futures = {name: executor.submit(self._run_source, name, collect) for name, collect in sources.items()}
+                    report = {name: future.result() for name, future in futures.items()}
+        elapsed = time.perf_counter() - start
+        self.metrics.observe('cycle_duration_seconds', elapsed)
+        logger.info(f'All data collection complete in {elapsed:.1f}s: '
+                    + ', '.join(f'{name} {r["duration"]:.1f}s' for name, r in report.items()))
+        stages = {name: totals['seconds'] - before.get(name, {}).get('seconds', 0.0)
+                  for name, totals in self.metrics.stage_summary().items()}
+        logger.info('Stage breakdown: ' + ', '.join(f'{name} {seconds:.2f}s' for name, seconds in sorted(stages.items()) if seconds > 0))
+        return report
+
+    def schedule_collection(self, interval_minutes=60, metrics_path: Optional[str] = None,
+                            profile_path: Optional[str] = None):
+        first = True
         while True:
-            self.collect_all()
+            self.collect_all(profile_path=profile_path if first else None)
+            first = False
+            if metrics_path:
+                self.metrics.write_textfile(metrics_path)
             logger.info(f'Waiting {interval_minutes} minutes until next collection...')
             time.sleep(interval_minutes * 60)
 
 if __name__ == '__main__':
-    collector = DataCollector()
-    collector.collect_all() 
\ No newline at end of file
+    store = None
+    if os.getenv('CRYPTOPULSE_STORAGE') == 'parquet':
+        from src.data.storage import DataStore
+        store = DataStore()
+    collector = DataCollector(store=store)
+    if os.getenv('CRYPTOPULSE_METRICS_PORT'):
+        collector.metrics.serve(int(os.getenv('CRYPTOPULSE_METRICS_PORT')))
+    collector.collect_all(profile_path=os.getenv('CRYPTOPULSE_PROFILE'))
+    if os.getenv('CRYPTOPULSE_METRICS_FILE'):
+        collector.metrics.write_textfile(os.getenv('CRYPTOPULSE_METRICS_FILE'))
@@ -0,0 +1,54 @@
+import os
+import json
+import logging
+import threading
+from typing import Dict, Any, Iterable
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class CursorStore:
+    def __init__(self, path: str, max_seen_ids: int = 5000):
+        self.path = path
+        self.max_seen_ids = max_seen_ids
+        self._lock = threading.Lock()
+        self.cursors: Dict[str, Any] = {}
+        self._seen: Dict[str, list] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                self.cursors = state.get('cursors', {})
+                self._seen = state.get('seen', {})
+            except (OSError, ValueError) as e:
+                logger.warning(f'Ignoring unreadable cursor file {path}: {e}')
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self.cursors.get(key, default)
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self.cursors[key] = value
+
+    def seen(self, key: str) -> set:
+        with self._lock:
+            return set(self._seen.get(key, []))
+
+    def add_seen(self, key: str, ids: Iterable[Any]):
+        with self._lock:
+            known = self._seen.setdefault(key, [])
+            current = set(known)
+            for i in map(str, ids):
+                if i not in current:
+                    current.add(i)
+                    known.append(i)
+            del known[:-self.max_seen_ids]
+
+    def save(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'cursors': self.cursors, 'seen': self._seen}, f)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,69 @@
+import os
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_thread_lock = threading.Lock()
+
+class LatestFileIndex:
+    def __init__(self, path: str = 'data/latest.json'):
+        self.path = path
+        self.root = os.path.abspath(os.path.dirname(path) or '.')
+
+    def tracks(self, file_path: str) -> bool:
+        return os.path.abspath(file_path).startswith(self.root + os.sep)
+
+    @contextmanager
+    def _locked(self):
+        with _thread_lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.root, exist_ok=True)
+            with open(f'{self.path}.lock', 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def version(self) -> int:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            logger.warning(f'Ignoring unreadable file index {self.path}: {e}')
+            return {}
+
+    def get(self, kind: str) -> Optional[Dict[str, Any]]:
+        return self.load().get(kind)
+
+    def record(self, kind: str, file_path: str):
+        if not self.tracks(file_path):
+            return
+        with self._locked():
+            entries = self.load()
+            entries[kind] = {'path': file_path, 'updated': datetime.now().isoformat()}
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, indent=2)
+            os.replace(tmp_path, self.path)
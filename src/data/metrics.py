@@ -0,0 +1,189 @@
+import os
+import io
+import time
+import pstats
+import logging
+import cProfile
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Iterator, Optional, Sequence, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+HELP = {
+    'stage_duration_seconds': 'Time spent in each pipeline stage (fetch, parse, infer, save).',
+    'stage_items_total': 'Items handled by each pipeline stage.',
+    'stage_errors_total': 'Exceptions raised inside each pipeline stage.',
+    'rate_limit_wait_seconds_total': 'Time spent blocked on a rate limiter.',
+    'rate_limit_waits_total': 'Rate limiter acquisitions that had to wait.',
+    'rate_limited_total': 'Upstream rate-limit responses (HTTP 429 / Retry-After).',
+    'cycle_duration_seconds': 'Duration of a full collection cycle.',
+    'service_request_seconds': 'Sentiment service latency from enqueue to result.',
+    'service_batch_size': 'Texts per micro-batch scored by the sentiment service.',
+    'service_rejected_total': 'Sentiment service requests rejected because the queue was full.',
+    'prefilter_skipped_total': 'Records that skipped model inference (language gate or duplicate of a scored text).'
+}
+Labels = Tuple[Tuple[str, str], ...]
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(str(value))}"' for key, value in pairs) + '}'
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class MetricsRegistry:
+    def __init__(self, namespace: str = 'cryptopulse', buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.namespace = namespace
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, list]] = {}
+
+    @staticmethod
+    def _labels(labels: Dict[str, Any]) -> Labels:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, amount: float = 1.0, **labels):
+        key = self._labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        key = self._labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            # Per-bucket (non-cumulative) counts plus sum and count; render() accumulates them.
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def stage(self, source: str, stage: str, items: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        # Callers that only learn the item count inside the block can set it on the yielded dict.
+        context = {'items': items}
+        start = time.perf_counter()
+        try:
+            yield context
+        except Exception:
+            self.inc('stage_errors_total', source=source, stage=stage)
+            raise
+        else:
+            if context['items']:
+                self.inc('stage_items_total', context['items'], source=source, stage=stage)
+        finally:
+            self.observe('stage_duration_seconds', time.perf_counter() - start, source=source, stage=stage)
+
+    def error(self, source: str, stage: str):
+        self.inc('stage_errors_total', source=source, stage=stage)
+
+    def rate_limit_wait(self, limiter: str, seconds: float):
+        if seconds > 0:
+            self.inc('rate_limit_wait_seconds_total', seconds, limiter=limiter or 'default')
+            self.inc('rate_limit_waits_total', limiter=limiter or 'default')
+
+    def snapshot(self) -> Dict[str, Dict[Labels, Any]]:
+        with self._lock:
+            result: Dict[str, Dict[Labels, Any]] = {name: dict(series) for name, series in self._counters.items()}
+            for name, series in self._histograms.items():
+                result[name] = {labels: {'count': state[2], 'sum': state[1]} for labels, state in series.items()}
+        return result
+
+    def stage_summary(self) -> Dict[str, Dict[str, float]]:
+        summary: Dict[str, Dict[str, float]] = {}
+        for labels, state in self.snapshot().get('stage_duration_seconds', {}).items():
+            values = dict(labels)
+            summary[f'{values.get("source")}.{values.get("stage")}'] = {'seconds': state['sum'], 'calls': state['count']}
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                metric = f'{self.namespace}_{name}'
+                lines.append(f'# HELP {metric} {HELP.get(name, name)}')
+                lines.append(f'# TYPE {metric} counter')
+                for labels, value in sorted(self._counters[name].items()):
+                    lines.append(f'{metric}{_format_labels(labels)} {_format_value(value)}')
+            for name in sorted(self._histograms):
+                metric = f'{self.namespace}_{name}'
+                lines.append(f'# HELP {metric} {HELP.get(name, name)}')
+                lines.append(f'# TYPE {metric} histogram')
+                for labels, (counts, total, count) in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                        cumulative += bucket_count
+                        lines.append(f'{metric}_bucket{_format_labels(labels, ("le", _format_value(bound)))} {cumulative}')
+                    lines.append(f'{metric}_sum{_format_labels(labels)} {_format_value(total)}')
+                    lines.append(f'{metric}_count{_format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path: str):
+        # Written atomically so a node_exporter textfile collector never scrapes a half-written file.
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def serve(self, port: int = 9108, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                payload = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True, name='metrics-http').start()
+        logger.info(f'Serving metrics on http://{host}:{server.server_address[1]}/metrics')
+        return server
+
+METRICS = MetricsRegistry()
+
+@contextmanager
+def profiled(path: Optional[str], top: int = 25) -> Iterator[Optional[cProfile.Profile]]:
+    if not path:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        profiler.dump_stats(path)
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(top)
+        logger.info(f'Saved profile to {path}; top {top} by cumulative time:\n{report.getvalue()}')
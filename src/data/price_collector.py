@@ -1,28 +1,89 @@
 import os
 import json
+import sys
+import math
 import time
+import random
 import logging
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Union, TYPE_CHECKING
 import requests
-import pandas as pd
+from requests.adapters import HTTPAdapter
+from src.data.coins import CRYPTOCURRENCIES
+from src.data.file_index import LatestFileIndex
+from src.data.metrics import METRICS
+from src.data.price_history import PriceHistoryStore
+from src.data.rate_limiter import TokenBucket, parse_retry_after
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from src.data.storage import DataStore
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
 class PriceCollector:
-    def __init__(self):
-        self.base_url = "https://api.coingecko.com/api/v3"
-        self.cryptocurrencies = {
-            'bitcoin': 'Bitcoin',
-            'ethereum': 'Ethereum',
-            'binancecoin': 'BNB',
-            'ripple': 'XRP',
-            'cardano': 'Cardano',
-            'dogecoin': 'Dogecoin'
-        }
+    def __init__(self, base_url: str = "https://api.coingecko.com/api/v3", rate_limiter: Optional[TokenBucket] = None,
+                 timeout: Union[float, Tuple[float, float]] = (5, 30), max_retries: int = 4,
+                 backoff_factor: float = 1.0, max_backoff: float = 60.0, pool_size: int = 10,
+                 session: Optional[requests.Session] = None, history: Optional[PriceHistoryStore] = None,
+                 store: Optional['DataStore'] = None):
+        self.base_url = base_url.rstrip('/')
+        self.rate_limiter = rate_limiter or TokenBucket(rate=10 / 60, capacity=3, name='coingecko')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.session = session or self._build_session(pool_size)
+        self.history = history or PriceHistoryStore()
+        self.history_days = 365
+        self.store = store
+        self.index = LatestFileIndex()
+        self.cryptocurrencies = dict(CRYPTOCURRENCIES)
         self.fiat_currencies = ['usd', 'eur', 'gbp', 'jpy']
 
+    @staticmethod
+    def _build_session(pool_size: int) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'Accept': 'application/json', 'User-Agent': 'CryptoPulse/1.0'})
+        return session
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
+
+    def _get(self, url: str, params: Dict[str, Any]) -> Optional[requests.Response]:
+        response = None
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            # Only the request itself is timed here; rate-limit sleeps are counted by the bucket. Failed attempts
+            # are counted as fetch_retry, and the caller counts one fetch error if the request fails for good.
+            with METRICS.stage('price', 'fetch'):
+                try:
+                    response = self.session.get(url, params=params, timeout=self.timeout)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    logger.warning(f"Request to {url} failed (attempt {attempt + 1}/{self.max_retries + 1}): {e}")
+                    response = None
+            if response is not None:
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                logger.warning(f"Request to {url} returned {response.status_code} (attempt {attempt + 1}/{self.max_retries + 1})")
+            if attempt == self.max_retries:
+                break
+            METRICS.error('price', 'fetch_retry')
+            delay = self._backoff(attempt)
+            if response is not None and response.status_code == 429:
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                # Penalizing the shared bucket pauses every caller, not just this retry loop.
+                self.rate_limiter.penalize(retry_after if retry_after is not None else max(delay, 1.0))
+            else:
+                time.sleep(delay)
+        return response
+
     def get_current_prices(self, vs_currencies: List[str] = None) -> Dict[str, Dict[str, float]]:
         if vs_currencies is None:
             vs_currencies = self.fiat_currencies
@@ -36,55 +97,93 @@ class PriceCollector:
             'include_24hr_vol': 'true',
             'include_market_cap': 'true'
         }
-        response = requests.get(url, params=params)
-        if response.status_code == 200:
-            return response.json()
-        logger.error(f"Failed to fetch current prices: {response.status_code}")
+        response = self._get(url, params)
+        if response is not None and response.status_code == 200:
+            with METRICS.stage('price', 'parse', items=1):
+                return response.json()
+        METRICS.error('price', 'fetch')
+        logger.error(f"Failed to fetch current prices: {response.status_code if response is not None else 'no response'}")
         return {}
 
-    def get_historical_prices(self, crypto_id: str, vs_currency: str = 'usd', days: int = 365) -> pd.DataFrame:
+    def get_historical_prices(self, crypto_id: str, vs_currency: str = 'usd', days: int = 365) -> 'pd.DataFrame':
+        # pandas is imported on first use so a current-prices-only process starts without it.
+        import pandas as pd
         url = f"{self.base_url}/coins/{crypto_id}/market_chart"
         params = {
             'vs_currency': vs_currency,
             'days': days,
             'interval': 'daily'
         }
-        response = requests.get(url, params=params)
-        if response.status_code != 200:
-            logger.error(f"Failed to fetch historical prices for {crypto_id}: {response.status_code}")
+        response = self._get(url, params)
+        if response is None or response.status_code != 200:
+            METRICS.error('price', 'fetch')
+            logger.error(f"Failed to fetch historical prices for {crypto_id}: {response.status_code if response is not None else 'no response'}")
             return pd.DataFrame()
-        data = response.json()
-        df = pd.DataFrame(data['prices'], columns=['timestamp', 'price'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        df.set_index('timestamp', inplace=True)
-        df['volume'] = [x[1] for x in data['total_volumes']]
-        df['market_cap'] = [x[1] for x in data['market_caps']]
+        with METRICS.stage('price', 'parse') as stage:
+            data = response.json()
+            df = pd.DataFrame(data['prices'], columns=['timestamp', 'price'])
+            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+            df.set_index('timestamp', inplace=True)
+            df['volume'] = [x[1] for x in data['total_volumes']]
+            df['market_cap'] = [x[1] for x in data['market_caps']]
+            stage['items'] = len(df)
         return df
 
-    def save_price_data(self, data: Any, data_type: str):
-        filename = f'data/prices_{data_type}_{datetime.now().strftime("%Y%m%d_%H%M%S")}'
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        if isinstance(data, pd.DataFrame):
-            data.to_csv(f"{filename}.csv")
-            logger.info(f"Saved {data_type} price data to {filename}.csv")
+    def sync_historical_prices(self, crypto_id: str, vs_currency: str = 'usd', full: bool = False) -> 'pd.DataFrame':
+        stored = self.history.load(crypto_id, vs_currency)
+        existing = stored.iloc[0:0] if full else stored
+        if existing.empty:
+            days = self.history_days
         else:
-            with open(f"{filename}.json", 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            logger.info(f"Saved {data_type} price data to {filename}.json")
+            age = datetime.utcnow() - existing.index.max().to_pydatetime()
+            days = min(self.history_days, max(1, math.ceil(age.total_seconds() / 86400) + 1))
+        logger.info(f"Fetching {days} day(s) of {crypto_id}/{vs_currency} history ({'full backfill' if existing.empty else 'incremental'})")
+        fresh = self.get_historical_prices(crypto_id, vs_currency, days=days)
+        if fresh.empty:
+            return existing
+        merged = self.history.merge(existing, fresh)
+        with METRICS.stage('price', 'save', items=len(fresh)):
+            self.history.save(merged, crypto_id, vs_currency)
+            # The fetch overlaps what is already stored (and a full backfill repeats all of it), so only rows from
+            # the last stored point on are appended. That point is a provisional intraday price; its refreshed value
+            # supersedes it for readers that dedup on timestamp (keep='last').
+            new_rows = fresh if stored.empty else fresh[fresh.index >= stored.index.max()]
+            if self.store is not None and not new_rows.empty:
+                self.store.append(f'prices_historical_{vs_currency}', new_rows.reset_index().assign(crypto_id=crypto_id))
+        return merged
+
+    def save_price_data(self, data: Any, data_type: str):
+        with METRICS.stage('price', 'save', items=len(data)):
+            if self.store is not None:
+                self._store_price_data(data, data_type)
+                return
+            filename = f'data/prices_{data_type}_{datetime.now().strftime("%Y%m%d_%H%M%S")}'
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            import pandas as pd
+            if isinstance(data, pd.DataFrame):
+                data.to_csv(f"{filename}.csv")
+                self.index.record(f'prices_{data_type}', f"{filename}.csv")
+                logger.info(f"Saved {data_type} price data to {filename}.csv")
+            else:
+                with open(f"{filename}.json", 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                self.index.record(f'prices_{data_type}', f"{filename}.json")
+                logger.info(f"Saved {data_type} price data to {filename}.json")
+
+    def _store_price_data(self, data: Dict[str, Dict[str, float]], data_type: str):
+        # Historical frames reach the store through sync_historical_prices, per currency; only snapshots come here.
+        timestamp = datetime.utcnow()
+        records = [dict(values, crypto_id=crypto_id, timestamp=timestamp) for crypto_id, values in data.items()]
+        self.store.append(f'prices_{data_type}', records)
 
-    def collect_all_data(self):
+    def collect_all_data(self, full_backfill: bool = False):
         current_prices = self.get_current_prices()
         if current_prices:
             self.save_price_data(current_prices, 'current')
-            time.sleep(2)
         for crypto_id in self.cryptocurrencies:
             logger.info(f"Collecting historical prices for {self.cryptocurrencies[crypto_id]}")
-            historical_prices = self.get_historical_prices(crypto_id)
-            if not historical_prices.empty:
-                self.save_price_data(historical_prices, f'historical_{crypto_id}')
-            logger.info("Waiting 10 seconds before next request...")
-            time.sleep(10)
+            self.sync_historical_prices(crypto_id, full=full_backfill)
 
 if __name__ == '__main__':
     collector = PriceCollector()
-    collector.collect_all_data() 
\ No newline at end of file
+    collector.collect_all_data(full_backfill='--full' in sys.argv) 
\ No newline at end of file
@@ -0,0 +1,49 @@
+import os
+import logging
+from typing import TYPE_CHECKING
+from src.data.file_index import LatestFileIndex
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class PriceHistoryStore:
+    def __init__(self, root: str = 'data/history'):
+        self.root = root
+        self.index = LatestFileIndex()
+
+    def path(self, crypto_id: str, vs_currency: str) -> str:
+        return os.path.join(self.root, f'{crypto_id}_{vs_currency}.csv')
+
+    def load(self, crypto_id: str, vs_currency: str = 'usd') -> 'pd.DataFrame':
+        import pandas as pd
+        path = self.path(crypto_id, vs_currency)
+        if not os.path.exists(path):
+            return pd.DataFrame()
+        return pd.read_csv(path, index_col='timestamp', parse_dates=['timestamp'])
+
+    @staticmethod
+    def merge(existing: 'pd.DataFrame', fresh: 'pd.DataFrame') -> 'pd.DataFrame':
+        import pandas as pd
+        if existing.empty:
+            merged = fresh
+        elif fresh.empty:
+            return existing
+        else:
+            # The newest point of a daily chart is a provisional intraday price; the fresh fetch supersedes
+            # everything it overlaps.
+            merged = pd.concat([existing[existing.index < fresh.index.min()], fresh])
+        merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+        merged.index.name = 'timestamp'
+        return merged
+
+    def save(self, df: 'pd.DataFrame', crypto_id: str, vs_currency: str = 'usd'):
+        path = self.path(crypto_id, vs_currency)
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        df.to_csv(tmp_path)
+        os.replace(tmp_path, path)
+        self.index.record(f'history_{crypto_id}_{vs_currency}', path)
+        logger.info(f'Saved {len(df)} rows of {crypto_id}/{vs_currency} history to {path}')
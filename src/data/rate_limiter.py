@@ -0,0 +1,67 @@
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from src.data.metrics import METRICS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = 1.0, name: str = ''):
+        self.rate = rate
+        self.capacity = capacity
+        self.name = name
+        self.tokens = capacity
+        self.total_wait = 0.0
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._blocked_until:
+                    delay = self._blocked_until - now
+                elif self.tokens >= tokens:
+                    self.tokens -= tokens
+                    self.total_wait += waited
+                    METRICS.rate_limit_wait(self.name, waited)
+                    return waited
+                else:
+                    delay = (tokens - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def penalize(self, retry_after: float):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = 0.0
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+        METRICS.inc('rate_limited_total', limiter=self.name or 'default')
+        logger.warning(f'Rate limited{" on " + self.name if self.name else ""}, pausing requests for {retry_after:.1f}s')
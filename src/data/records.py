@@ -0,0 +1,157 @@
+import os
+import io
+import gzip
+import json
+import logging
+import tempfile
+from typing import Dict, Any, Iterable, Iterator, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RECORD_SUFFIXES = ('.jsonl.gz', '.jsonl', '.json.gz', '.json')
+READ_CHUNK_SIZE = 1 << 16
+
+def record_suffix() -> str:
+    # New files default to plain NDJSON; CRYPTOPULSE_RECORD_FORMAT=jsonl.gz trades some CPU for much smaller files.
+    return '.' + os.getenv('CRYPTOPULSE_RECORD_FORMAT', 'jsonl').lstrip('.')
+
+def split_record_suffix(filename: str) -> Tuple[str, str]:
+    for suffix in RECORD_SUFFIXES:
+        if filename.endswith(suffix):
+            return filename[:-len(suffix)], suffix
+    return filename, ''
+
+def is_record_file(filename: str) -> bool:
+    name = os.path.basename(filename)
+    # Writers stage into hidden temp files, which must never be picked up half-written.
+    return not name.startswith('.') and split_record_suffix(name)[1] != ''
+
+def dumps(record: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        # Datetimes go through str() on both paths so the encoders produce the same text.
+        return orjson.dumps(record, default=str, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+def loads(line: bytes) -> Any:
+    return orjson.loads(line) if orjson is not None else json.loads(line)
+
+def _open_binary(path: str, mode: str):
+    return gzip.open(path, mode, compresslevel=6) if path.endswith('.gz') else open(path, mode)
+
+def _iter_json_array(f: io.TextIOBase) -> Iterator[Dict[str, Any]]:
+    # Legacy files are a single JSON array; decode one element at a time so memory stays bounded by the
+    # largest record rather than the whole file.
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    started = False
+    while True:
+        while pos < len(buffer) and (buffer[pos].isspace() or (started and buffer[pos] == ',')):
+            pos += 1
+        if pos >= len(buffer):
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                if started:
+                    raise ValueError('Unterminated JSON array')
+                return
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+        if not started:
+            if buffer[pos] != '[':
+                raise ValueError(f'Expected a JSON array, found {buffer[pos]!r}')
+            started = True
+            pos += 1
+            continue
+        if buffer[pos] == ']':
+            return
+        try:
+            record, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                raise
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+        yield record
+        pos = end
+        if pos > READ_CHUNK_SIZE:
+            buffer, pos = buffer[pos:], 0
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    with _open_binary(path, 'rb') as f:
+        head = f.peek(1)[:1]
+        while head.isspace():
+            f.read(1)
+            head = f.peek(1)[:1]
+        if head == b'[':
+            yield from _iter_json_array(io.TextIOWrapper(f, encoding='utf-8'))
+            return
+        for number, line in enumerate(f, 1):
+            if line.strip():
+                try:
+                    yield loads(line)
+                except ValueError as e:
+                    raise ValueError(f'{path}:{number}: invalid record: {e}') from e
+
+def read_records(path: str) -> list:
+    return list(iter_records(path))
+
+class RecordWriter:
+    # Records are written to a temp file next to the target and renamed on a clean close, so readers
+    # only ever see complete files. A .json target keeps the legacy array layout for existing consumers.
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._array = split_record_suffix(path)[1] in ('.json', '.json.gz')
+        self._raw = None
+        self._file = None
+        self._tmp_path: Optional[str] = None
+
+    def __enter__(self) -> 'RecordWriter':
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_', suffix=os.path.basename(self.path))
+        self._raw = os.fdopen(fd, 'wb')
+        self._file = gzip.GzipFile(fileobj=self._raw, mode='wb', compresslevel=6) if self.path.endswith('.gz') else self._raw
+        if self._array:
+            self._file.write(b'[')
+        return self
+
+    def write(self, record: Dict[str, Any]):
+        if self._array:
+            self._file.write(b',\n' if self.count else b'\n')
+            self._file.write(dumps(record))
+        else:
+            self._file.write(dumps(record) + b'\n')
+        self.count += 1
+
+    def write_many(self, records: Iterable[Dict[str, Any]]):
+        for record in records:
+            self.write(record)
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None and self._array:
+                self._file.write(b'\n]\n')
+            if self._file is not self._raw:
+                self._file.close()
+            if exc_type is None:
+                self._raw.flush()
+                os.fsync(self._raw.fileno())
+            self._raw.close()
+            if exc_type is None:
+                os.replace(self._tmp_path, self.path)
+        finally:
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+
+def write_records(path: str, records: Iterable[Dict[str, Any]]) -> int:
+    with RecordWriter(path) as writer:
+        writer.write_many(records)
+    return writer.count
@@ -1,46 +1,81 @@
 import os
-import json
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
 import praw
 from dotenv import load_dotenv
+from src.data.cursors import CursorStore
+from src.data.tagger import CoinTagger
+from src.data.file_index import LatestFileIndex
+from src.data.metrics import METRICS
+from src.data.rate_limiter import TokenBucket
+from src.data.records import record_suffix, write_records
+
+if TYPE_CHECKING:
+    from src.data.storage import DataStore
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class RedditCollector:
-    def __init__(self):
+    def __init__(self, rate_limiter=None, store: 'DataStore' = None):
         load_dotenv()
         self.client_id = os.getenv('REDDIT_CLIENT_ID')
         self.client_secret = os.getenv('REDDIT_CLIENT_SECRET')
         self.user_agent = os.getenv('REDDIT_USER_AGENT', 'CryptoPulse/1.0')
         if not all([self.client_id, self.client_secret, self.user_agent]):
             raise ValueError('Reddit API credentials not set in .env')
-        self.reddit = praw.Reddit(
-            client_id=self.client_id,
-            client_secret=self.client_secret,
-            user_agent=self.user_agent
-        )
+        self._local = threading.local()
+        self.rate_limiter = rate_limiter or TokenBucket(rate=100 / 60, capacity=10, name='reddit')
+        self.store = store
+        self.index = LatestFileIndex()
+        self.cursors = CursorStore('data/cursors/reddit.json')
+        self.tagger = CoinTagger.from_defaults()
         self.subreddits = ['CryptoCurrency', 'Bitcoin', 'Ethereum', 'CryptoMarkets', 'Cardano', 'dogecoin']
 
+    def _client(self):
+        # PRAW instances are not thread-safe, so each collection thread gets its own.
+        client = getattr(self._local, 'reddit', None)
+        if client is None:
+            client = praw.Reddit(
+                client_id=self.client_id,
+                client_secret=self.client_secret,
+                user_agent=self.user_agent
+            )
+            self._local.reddit = client
+        return client
+
     def collect_posts(self, subreddit_name, limit=50, days=1):
-        subreddit = self.reddit.subreddit(subreddit_name)
+        subreddit = self._client().subreddit(subreddit_name)
         posts = []
         since = datetime.utcnow() - timedelta(days=days)
-        for post in subreddit.new(limit=limit):
-            if datetime.utcfromtimestamp(post.created_utc) < since:
-                continue
-            post_data = {
-                'id': post.id,
-                'title': post.title,
-                'text': post.selftext,
-                'created_utc': post.created_utc,
-                'subreddit': subreddit_name,
-                'score': post.score,
-                'num_comments': post.num_comments,
-                'url': post.url
-            }
-            posts.append(post_data)
+        cursor = self.cursors.get(subreddit_name)
+        seen = self.cursors.seen(subreddit_name)
+        # PRAW pages lazily while the listing is iterated, so the fetch stage covers the whole loop.
+        with METRICS.stage('reddit', 'fetch') as stage:
+            for count, post in enumerate(subreddit.new(limit=limit)):
+                if count % 100 == 0:
+                    self.rate_limiter.acquire()
+                # new() is newest-first, so the first already-seen or too-old post ends the listing.
+                if post.id in seen or (cursor and post.created_utc < cursor['created_utc']):
+                    break
+                if datetime.utcfromtimestamp(post.created_utc) < since:
+                    break
+                posts.append({
+                    'id': post.id,
+                    'title': post.title,
+                    'text': post.selftext,
+                    'created_utc': post.created_utc,
+                    'subreddit': subreddit_name,
+                    'score': post.score,
+                    'num_comments': post.num_comments,
+                    'url': post.url
+                })
+            stage['items'] = len(posts)
+        with METRICS.stage('reddit', 'parse', items=len(posts)):
+            posts = [self.tagger.tag_record(post) for post in posts]
         logger.info(f'Collected {len(posts)} posts from r/{subreddit_name}')
         return posts
 
@@ -48,17 +83,41 @@ class RedditCollector:
         if not posts:
             logger.warning(f'No posts to save for r/{subreddit_name}')
             return
-        os.makedirs('data/reddit', exist_ok=True)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'data/reddit/posts_{subreddit_name}_{timestamp}.json'
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(posts, f, ensure_ascii=False, indent=2)
+        with METRICS.stage('reddit', 'save', items=len(posts)):
+            if self.store is not None:
+                self.store.append('reddit', posts, time_key='created_utc')
+                return
+            os.makedirs('data/reddit', exist_ok=True)
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f'data/reddit/posts_{subreddit_name}_{timestamp}{record_suffix()}'
+            write_records(filename, posts)
+            self.index.record(f'reddit_{subreddit_name}', filename)
         logger.info(f'Saved {len(posts)} posts to {filename}')
 
-    def collect_all(self, limit=50, days=1):
-        for subreddit in self.subreddits:
-            posts = self.collect_posts(subreddit, limit=limit, days=days)
-            self.save_posts(posts, subreddit)
+    def advance_cursor(self, subreddit_name, posts):
+        if not posts:
+            return
+        newest = max(posts, key=lambda post: post['created_utc'])
+        cursor = self.cursors.get(subreddit_name)
+        if cursor is None or newest['created_utc'] >= cursor['created_utc']:
+            self.cursors.set(subreddit_name, {'created_utc': newest['created_utc'], 'id': newest['id']})
+        self.cursors.add_seen(subreddit_name, [post['id'] for post in posts])
+
+    def collect_subreddit(self, subreddit_name, limit=50, days=1):
+        posts = self.collect_posts(subreddit_name, limit=limit, days=days)
+        self.save_posts(posts, subreddit_name)
+        self.advance_cursor(subreddit_name, posts)
+        return len(posts)
+
+    def collect_all(self, limit=50, days=1, max_workers=None):
+        with ThreadPoolExecutor(max_workers=max_workers or len(self.subreddits), thread_name_prefix='reddit') as executor:
+            futures = {executor.submit(self.collect_subreddit, subreddit, limit, days): subreddit for subreddit in self.subreddits}
+            for future, subreddit in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f'Error collecting r/{subreddit}: {e}')
+        self.cursors.save()
 
 if __name__ == '__main__':
     collector = RedditCollector()
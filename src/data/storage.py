@@ -0,0 +1,168 @@
+import os
+import time
+import uuid
+import logging
+from datetime import datetime, date, timedelta
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Union, Sequence, TYPE_CHECKING
+from src.data.file_index import LatestFileIndex
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# pandas and pyarrow.dataset each cost about half a second to import, so they are only loaded once a store is
+# actually read or written.
+@lru_cache(maxsize=None)
+def _partitioning() -> 'ds.Partitioning':
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    return ds.partitioning(pa.schema([('coin', pa.string()), ('date', pa.string())]), flavor='hive')
+
+TimeBound = Optional[Union[str, datetime, date, 'pd.Timestamp']]
+
+def _to_timestamp(value: TimeBound) -> Optional['pd.Timestamp']:
+    if value is None:
+        return None
+    import pandas as pd
+    ts = pd.Timestamp(value)
+    return ts.tz_convert(None) if ts.tzinfo is not None else ts
+
+class DataStore:
+    def __init__(self, root: str = 'data/store'):
+        self.root = root
+        self.index = LatestFileIndex()
+
+    def source_path(self, source: str) -> str:
+        return os.path.join(self.root, source)
+
+    def has_source(self, source: str) -> bool:
+        return os.path.isdir(self.source_path(source))
+
+    @staticmethod
+    def _timestamps(values: 'pd.Series') -> 'pd.Series':
+        import pandas as pd
+        if pd.api.types.is_numeric_dtype(values):
+            return pd.to_datetime(values, unit='s')
+        return pd.to_datetime(values, utc=True).dt.tz_convert(None)
+
+    def append(self, source: str, records: Union[List[Dict[str, Any]], 'pd.DataFrame'], time_key: str = 'timestamp',
+               coin_key: Optional[str] = 'crypto_id', default_coin: str = 'all') -> int:
+        import pandas as pd
+        import pyarrow as pa
+        df = records.copy() if isinstance(records, pd.DataFrame) else pd.DataFrame(records)
+        if df.empty:
+            return 0
+        df['timestamp'] = self._timestamps(df[time_key]).astype('datetime64[ms]')
+        coins = df[coin_key].fillna(default_coin).astype(str) if coin_key and coin_key in df else default_coin
+        partitions = df.assign(_coin=coins, _date=df['timestamp'].dt.strftime('%Y-%m-%d'))
+        written = 0
+        for (coin, day), part in partitions.groupby(['_coin', '_date'], sort=False):
+            directory = os.path.join(self.source_path(source), f'coin={coin}', f'date={day}')
+            self._write_file(directory, pa.Table.from_pandas(part.drop(columns=['_coin', '_date']), preserve_index=False))
+            written += len(part)
+        self.index.record(f'store_{source}', self.source_path(source))
+        logger.info(f'Appended {written} records to {source}')
+        return written
+
+    @staticmethod
+    def _write_file(directory: str, table: 'pa.Table') -> str:
+        import pyarrow.parquet as pq
+        os.makedirs(directory, exist_ok=True)
+        # Nanosecond prefix keeps part files in write order, which compaction and dedup_on rely on.
+        name = f'part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet'
+        tmp_path = os.path.join(directory, f'.{name}.tmp')
+        pq.write_table(table, tmp_path, compression='zstd')
+        path = os.path.join(directory, name)
+        os.replace(tmp_path, path)
+        return path
+
+    def _dataset(self, source: str) -> Optional['ds.Dataset']:
+        if not self.has_source(source):
+            return None
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        dataset = ds.dataset(self.source_path(source), format='parquet', partitioning=_partitioning(),
+                             exclude_invalid_files=True, ignore_prefixes=['.'])
+        schemas = [fragment.physical_schema for fragment in dataset.get_fragments()]
+        if len(schemas) > 1:
+            # Files written by different runs can add columns or narrow null-only columns; read them all
+            # against one unified schema.
+            unified = pa.unify_schemas(schemas + [_partitioning().schema], promote_options='permissive')
+            dataset = ds.dataset(self.source_path(source), format='parquet', partitioning=_partitioning(),
+                                 schema=unified, ignore_prefixes=['.'])
+        return dataset
+
+    @staticmethod
+    def _filter(coins: Optional[Sequence[str]], start: TimeBound, end: TimeBound) -> Optional['ds.Expression']:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        start, end = _to_timestamp(start), _to_timestamp(end)
+        expression = None
+        conditions = []
+        if coins is not None:
+            conditions.append(ds.field('coin').isin(list(coins)))
+        if start is not None:
+            conditions.append(ds.field('date') >= start.strftime('%Y-%m-%d'))
+            conditions.append(ds.field('timestamp') >= pa.scalar(start.to_pydatetime(), pa.timestamp('ms')))
+        if end is not None:
+            conditions.append(ds.field('date') <= end.strftime('%Y-%m-%d'))
+            conditions.append(ds.field('timestamp') <= pa.scalar(end.to_pydatetime(), pa.timestamp('ms')))
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def count(self, source: str, coins: Optional[Sequence[str]] = None, start: TimeBound = None,
+              end: TimeBound = None) -> int:
+        dataset = self._dataset(source)
+        if dataset is None:
+            return 0
+        return dataset.count_rows(filter=self._filter(coins, start, end))
+
+    def query(self, source: str, coins: Optional[Sequence[str]] = None, start: TimeBound = None, end: TimeBound = None,
+              columns: Optional[List[str]] = None, dedup_on: Optional[List[str]] = None) -> 'pd.DataFrame':
+        dataset = self._dataset(source)
+        if dataset is None:
+            import pandas as pd
+            return pd.DataFrame()
+        expression = self._filter(coins, start, end)
+        if columns is not None:
+            columns = list(dict.fromkeys(columns + ['timestamp'] + (dedup_on or [])))
+        df = dataset.to_table(columns=columns, filter=expression).to_pandas()
+        df = df.sort_values('timestamp', kind='stable')
+        if dedup_on:
+            df = df.drop_duplicates(subset=dedup_on, keep='last')
+        return df.reset_index(drop=True)
+
+    def latest(self, source: str, lookback_days: int = 7, **kwargs) -> 'pd.DataFrame':
+        df = self.query(source, start=datetime.utcnow() - timedelta(days=lookback_days), **kwargs)
+        if df.empty:
+            return df
+        return df[df['timestamp'] == df['timestamp'].max()].reset_index(drop=True)
+
+    def compact(self, source: str, min_files: int = 2, dedup_on: Optional[List[str]] = None) -> int:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        compacted = 0
+        for directory, _, filenames in os.walk(self.source_path(source)):
+            parts = sorted(f for f in filenames if f.endswith('.parquet') and not f.startswith('.'))
+            if len(parts) < min_files:
+                continue
+            paths = [os.path.join(directory, f) for f in parts]
+            tables = [pq.read_table(path, partitioning=None) for path in paths]
+            table = pa.concat_tables(tables, promote_options='permissive')
+            if dedup_on:
+                df = table.to_pandas().sort_values('timestamp', kind='stable').drop_duplicates(subset=dedup_on, keep='last')
+                table = pa.Table.from_pandas(df, preserve_index=False)
+            self._write_file(directory, table)
+            for path in paths:
+                os.remove(path)
+            compacted += len(paths)
+        if compacted:
+            self.index.record(f'store_{source}', self.source_path(source))
+        logger.info(f'Compacted {compacted} files in {source}')
+        return compacted
@@ -0,0 +1,86 @@
+import logging
+from collections import deque
+from typing import Dict, List, Optional, Iterable, Any
+from src.data.coins import build_alias_table
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == '_'
+
+class CoinTagger:
+    def __init__(self, aliases: Dict[str, Iterable[str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[tuple]] = [[]]
+        self.pattern_count = 0
+        for crypto_id, names in aliases.items():
+            for name in names:
+                self._add(name.lower(), crypto_id)
+        self._build_failure_links()
+
+    @classmethod
+    def from_defaults(cls, extra_path: Optional[str] = 'data/coin_aliases.json') -> 'CoinTagger':
+        return cls(build_alias_table(extra_path))
+
+    def _add(self, pattern: str, crypto_id: str):
+        if not pattern:
+            return
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            state = next_state
+        self._outputs[state].append((len(pattern), crypto_id))
+        self.pattern_count += 1
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                # Fold the suffix state's matches in so the scan never has to walk failure links for output.
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+
+    def tag(self, text: str) -> List[str]:
+        if not text:
+            return []
+        text = text.lower()
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        end = len(text)
+        found: List[str] = []
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if outputs[state]:
+                if i + 1 < end and _is_word_char(text[i + 1]):
+                    continue
+                for length, crypto_id in outputs[state]:
+                    start = i - length + 1
+                    if (start == 0 or not _is_word_char(text[start - 1])) and crypto_id not in found:
+                        found.append(crypto_id)
+        return found
+
+    def tag_record(self, record: Dict[str, Any], text_keys: Iterable[str] = ('title', 'text')) -> Dict[str, Any]:
+        text = ' \n '.join(record[key] for key in text_keys if isinstance(record.get(key), str))
+        coins = list(record.get('crypto_ids') or ([record['crypto_id']] if record.get('crypto_id') else []))
+        coins.extend(coin for coin in self.tag(text) if coin not in coins)
+        if coins:
+            record['crypto_ids'] = coins
+            if not record.get('crypto_id'):
+                record['crypto_id'] = coins[0]
+        return record
@@ -0,0 +1,193 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Any, Iterable, Iterator, Optional, Tuple, TYPE_CHECKING
+import numpy as np
+from src.data.metrics import METRICS
+from src.data.records import record_suffix, write_records
+
+if TYPE_CHECKING:
+    from src.data.price_collector import PriceCollector
+    from src.data.storage import DataStore
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tick fields and the CoinGecko /simple/price key each one is read from (formatted with the fiat currency).
+FIELDS = {
+    'price': '{currency}',
+    'volume': '{currency}_24h_vol',
+    'market_cap': '{currency}_market_cap',
+    'change_24h': '{currency}_24h_change'
+}
+
+class TickBuffer:
+    # Every (coin, currency) pair shares one column of fixed-size arrays. Each tick is written twice, at
+    # slot and slot + capacity, so the most recent n ticks are always one contiguous slice: appends are
+    # O(1) and windows are views into the buffer rather than copies.
+    def __init__(self, coins: Iterable[str], currencies: Iterable[str] = ('usd',), capacity: int = 4096):
+        self.coins = list(coins)
+        self.currencies = list(currencies)
+        self.capacity = capacity
+        self.pairs = {(coin, currency): i for i, (coin, currency) in
+                      enumerate((coin, currency) for coin in self.coins for currency in self.currencies)}
+        # (field, column, coin, snapshot key) for every cell, so appends and latest() are plain Python loops.
+        self._cells = [(field_index, column, coin, key.format(currency=currency))
+                       for (coin, currency), column in self.pairs.items()
+                       for field_index, key in enumerate(FIELDS.values())]
+        self._times = np.full(2 * capacity, np.nan)
+        self._values = np.full((len(FIELDS), len(self.pairs), 2 * capacity), np.nan)
+        self._lock = threading.Lock()
+        self._head = 0
+        self.count = 0
+        self.total = 0
+
+    def append(self, timestamp: float, snapshot: Dict[str, Dict[str, float]]):
+        row = np.full((len(FIELDS), len(self.pairs)), np.nan)
+        for field_index, column, coin, key in self._cells:
+            value = snapshot.get(coin, {}).get(key)
+            if value is not None:
+                row[field_index, column] = value
+        with self._lock:
+            head = self._head
+            self._times[head] = self._times[head + self.capacity] = timestamp
+            self._values[:, :, head] = row
+            self._values[:, :, head + self.capacity] = row
+            self._head = (head + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+            self.total += 1
+
+    def _bounds(self, n: Optional[int]) -> Tuple[int, int]:
+        n = self.count if n is None else max(0, min(n, self.count))
+        end = self._head + self.capacity
+        return end - n, end
+
+    def window(self, coin: str, currency: str = 'usd', field: str = 'price', n: Optional[int] = None,
+               since: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        # Views are read-only and live: later appends overwrite their oldest slots, so copy anything kept long.
+        column = self.pairs[(coin, currency)]
+        field_index = list(FIELDS).index(field)
+        with self._lock:
+            start, end = self._bounds(n)
+            times = self._times[start:end]
+            if since is not None:
+                start += int(np.searchsorted(times, since, side='left'))
+                times = self._times[start:end]
+            values = self._values[field_index, column, start:end]
+        times.flags.writeable = False
+        values.flags.writeable = False
+        return times, values
+
+    def latest(self) -> Dict[str, Dict[str, float]]:
+        # Same shape as PriceCollector.get_current_prices, so callers can use either interchangeably.
+        with self._lock:
+            if not self.count:
+                return {}
+            last = self._values[:, :, self._head + self.capacity - 1].tolist()
+        snapshot: Dict[str, Dict[str, float]] = {}
+        for field_index, column, coin, key in self._cells:
+            value = last[field_index][column]
+            if value == value:
+                snapshot.setdefault(coin, {})[key] = value
+        return snapshot
+
+    def since_total(self, total: int) -> Tuple[np.ndarray, np.ndarray, int]:
+        # Copies of every tick appended after the given running total; ticks already overwritten are skipped.
+        with self._lock:
+            pending = self.total - total
+            dropped = max(0, pending - self.capacity)
+            start, end = self._bounds(pending - dropped)
+            return self._times[start:end].copy(), self._values[:, :, start:end].copy(), dropped
+
+    def records(self, times: np.ndarray, values: np.ndarray) -> Iterator[Dict[str, Any]]:
+        for tick, timestamp in enumerate(times):
+            stamp = datetime.fromtimestamp(timestamp, tz=timezone.utc).replace(tzinfo=None).isoformat()
+            for (coin, currency), column in self.pairs.items():
+                record = {'crypto_id': coin, 'currency': currency, 'timestamp': stamp}
+                for field_index, field in enumerate(FIELDS):
+                    value = values[field_index, column, tick]
+                    record[field] = None if np.isnan(value) else float(value)
+                if record['price'] is not None:
+                    yield record
+
+class TickPoller:
+    def __init__(self, collector: 'PriceCollector', buffer: Optional[TickBuffer] = None, interval: float = 15.0,
+                 flush_interval: float = 300.0, flush_dir: Optional[str] = 'data/ticks',
+                 store: Optional['DataStore'] = None):
+        self.collector = collector
+        self.buffer = buffer or TickBuffer(collector.cryptocurrencies, collector.fiat_currencies)
+        self.interval = interval
+        self.flush_interval = flush_interval
+        self.flush_dir = flush_dir
+        self.store = store
+        self._flushed_total = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll_once(self) -> bool:
+        snapshot = self.collector.get_current_prices(self.buffer.currencies)
+        if not snapshot:
+            return False
+        self.buffer.append(time.time(), snapshot)
+        return True
+
+    def flush(self) -> int:
+        # One file (or store append) per flush interval instead of one per poll; the running tick total keeps
+        # names unique when flushes land in the same second.
+        times, values, dropped = self.buffer.since_total(self._flushed_total)
+        self._flushed_total += len(times) + dropped
+        if dropped:
+            logger.warning(f'{dropped} ticks were overwritten before they could be flushed; raise capacity or flush more often')
+        if not len(times) or (self.store is None and not self.flush_dir):
+            return 0
+        records = self.buffer.records(times, values)
+        with METRICS.stage('price', 'save') as stage:
+            if self.store is not None:
+                stage['items'] = self.store.append('prices_ticks', list(records))
+            else:
+                stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                stage['items'] = write_records(os.path.join(self.flush_dir, f'ticks_{stamp}_{self._flushed_total}{record_suffix()}'), records)
+        logger.info(f'Flushed {len(times)} ticks ({stage["items"]} rows)')
+        return len(times)
+
+    def run(self):
+        last_flush = time.monotonic()
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.error(f'Price poll failed: {e}')
+                METRICS.error('price', 'poll')
+            if time.monotonic() - last_flush >= self.flush_interval:
+                self.flush()
+                last_flush = time.monotonic()
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+        self.flush()
+
+    def start(self) -> 'TickPoller':
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, daemon=True, name='tick-poller')
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+if __name__ == '__main__':
+    from src.data.price_collector import PriceCollector
+    store = None
+    if os.getenv('CRYPTOPULSE_STORAGE') == 'parquet':
+        from src.data.storage import DataStore
+        store = DataStore()
+    poller = TickPoller(PriceCollector(), interval=float(os.getenv('CRYPTOPULSE_TICK_INTERVAL', '15')),
+                        flush_interval=float(os.getenv('CRYPTOPULSE_TICK_FLUSH', '300')), store=store)
+    try:
+        poller.run()
+    except KeyboardInterrupt:
+        poller.flush()
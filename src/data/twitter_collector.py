@@ -1,15 +1,26 @@
 import os
-import json
 import logging
 from datetime import datetime
+from functools import cached_property
+from typing import TYPE_CHECKING
 import tweepy
 from dotenv import load_dotenv
+from src.data.coins import CRYPTO_KEYWORDS
+from src.data.cursors import CursorStore
+from src.data.file_index import LatestFileIndex
+from src.data.metrics import METRICS
+from src.data.rate_limiter import TokenBucket
+from src.data.records import record_suffix, write_records
+from src.data.tagger import CoinTagger
+
+if TYPE_CHECKING:
+    from src.data.storage import DataStore
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class TwitterCollector:
-    def __init__(self):
+    def __init__(self, rate_limiter=None, store: 'DataStore' = None, max_results_per_run: int = None):
         load_dotenv()
         self.api_key = os.getenv('TWITTER_API_KEY')
         self.api_secret = os.getenv('TWITTER_API_SECRET')
@@ -17,72 +28,146 @@ class TwitterCollector:
         self.access_token_secret = os.getenv('TWITTER_ACCESS_TOKEN_SECRET')
         if not all([self.api_key, self.api_secret, self.access_token, self.access_token_secret]):
             raise ValueError('Twitter API credentials not set in .env')
-        self.client = tweepy.Client(
+        self.rate_limiter = rate_limiter or TokenBucket(rate=180 / 900, capacity=10, name='twitter')
+        self.store = store
+        self.index = LatestFileIndex()
+        self.cursors = CursorStore('data/cursors/twitter.json', max_seen_ids=20000)
+        # Tweets fetched per coin per run, split between new tweets and backfilling earlier gaps.
+        self.max_results_per_run = max_results_per_run or int(os.getenv('TWITTER_MAX_RESULTS', '100'))
+        self._pending_since_ids = {}
+        self.crypto_keywords = {crypto_id: list(keywords) for crypto_id, keywords in CRYPTO_KEYWORDS.items()}
+        self.tagger = CoinTagger.from_defaults()
+
+    @cached_property
+    def client(self):
+        return tweepy.Client(
             consumer_key=self.api_key,
             consumer_secret=self.api_secret,
             access_token=self.access_token,
             access_token_secret=self.access_token_secret,
             wait_on_rate_limit=True
         )
-        self.crypto_keywords = {
-            'bitcoin': ['bitcoin', 'btc', '#bitcoin', '#btc'],
-            'ethereum': ['ethereum', 'eth', '#ethereum', '#eth'],
-            'binancecoin': ['bnb', 'binance coin', '#bnb'],
-            'ripple': ['ripple', 'xrp', '#ripple', '#xrp'],
-            'cardano': ['cardano', 'ada', '#cardano', '#ada'],
-            'dogecoin': ['dogecoin', 'doge', '#dogecoin', '#doge']
+
+    def _search(self, query, limit, since_id=None, until_id=None):
+        # Returns the raw tweets and whether pagination reached the end of the (since_id, until_id) range.
+        tweets = []
+        next_token = None
+        try:
+            while len(tweets) < limit:
+                self.rate_limiter.acquire()
+                with METRICS.stage('twitter', 'fetch'):
+                    response = self.client.search_recent_tweets(
+                        query=query,
+                        max_results=max(10, min(100, limit - len(tweets))),
+                        since_id=since_id,
+                        until_id=until_id,
+                        next_token=next_token,
+                        tweet_fields=['created_at', 'lang', 'public_metrics']
+                    )
+                tweets.extend(response.data or [])
+                next_token = (response.meta or {}).get('next_token')
+                if not next_token:
+                    return tweets, True
+        except Exception as e:
+            logger.error(f'Error searching tweets for {query!r}: {str(e)}')
+        return tweets, False
+
+    def _tweet_record(self, tweet, crypto_id):
+        tweet_data = {
+            'id': tweet.id,
+            'text': tweet.text,
+            'created_at': tweet.created_at.isoformat(),
+            'lang': tweet.lang,
+            'likes': tweet.public_metrics['like_count'],
+            'retweets': tweet.public_metrics['retweet_count'],
+            'replies': tweet.public_metrics['reply_count'],
+            'crypto_id': crypto_id,
+            'crypto_ids': [crypto_id]
         }
+        return self.tagger.tag_record(tweet_data, text_keys=('text',))
 
-    def collect_tweets(self, crypto_id, max_results=100):
+    def collect_tweets(self, crypto_id, max_results=None):
         if crypto_id not in self.crypto_keywords:
             logger.error(f'Unknown cryptocurrency: {crypto_id}')
             return []
+        limit = max_results or self.max_results_per_run
         query = ' OR '.join(self.crypto_keywords[crypto_id])
-        tweets = []
-        try:
-            response = self.client.search_recent_tweets(
-                query=query,
-                max_results=max_results,
-                tweet_fields=['created_at', 'lang', 'public_metrics']
-            )
-            if not response.data:
-                logger.warning(f'No tweets found for {crypto_id}')
-                return []
-            for tweet in response.data:
-                tweet_data = {
-                    'id': tweet.id,
-                    'text': tweet.text,
-                    'created_at': tweet.created_at.isoformat(),
-                    'lang': tweet.lang,
-                    'likes': tweet.public_metrics['like_count'],
-                    'retweets': tweet.public_metrics['retweet_count'],
-                    'replies': tweet.public_metrics['reply_count'],
-                    'crypto_id': crypto_id
-                }
-                tweets.append(tweet_data)
-            logger.info(f'Collected {len(tweets)} tweets for {crypto_id}')
-            return tweets
-        except Exception as e:
-            logger.error(f'Error collecting tweets for {crypto_id}: {str(e)}')
+        since_id = self.cursors.get(crypto_id)
+        gap = self.cursors.get(f'{crypto_id}_backfill')
+        # Newest tweets first. since_id always moves to the newest tweet seen; if the run stops before reaching
+        # the old cursor, the unread range (since_id, oldest fetched) is kept as a backfill gap for later runs.
+        fetched, exhausted = self._search(query, limit, since_id=since_id)
+        newest_id = str(max(tweet.id for tweet in fetched)) if fetched else since_id
+        if fetched and not exhausted:
+            # A second gap is merged into the first; the tweets in between are fetched again and dropped as seen.
+            gap = {'since_id': gap['since_id'] if gap else since_id, 'until_id': str(min(tweet.id for tweet in fetched))}
+        elif exhausted and gap and len(fetched) < limit:
+            # Whatever budget is left goes to the gap, newest first, so it shrinks from the top.
+            backfill, closed = self._search(query, limit - len(fetched), since_id=gap['since_id'], until_id=gap['until_id'])
+            fetched.extend(backfill)
+            if closed:
+                gap = None
+            elif backfill:
+                gap = dict(gap, until_id=str(min(tweet.id for tweet in backfill)))
+        self._pending_since_ids[crypto_id] = (newest_id, gap)
+        if gap:
+            logger.info(f'{crypto_id}: tweets between {gap["since_id"]} and {gap["until_id"]} are left for backfill')
+        with METRICS.stage('twitter', 'parse', items=len(fetched)):
+            # Pages are sized to at least 10 tweets, so a run can go a few past the limit; those are kept.
+            tweets = [self._tweet_record(tweet, crypto_id) for tweet in fetched]
+        if not tweets:
+            logger.warning(f'No new tweets found for {crypto_id}')
             return []
+        logger.info(f'Collected {len(tweets)} tweets for {crypto_id}')
+        return tweets
+
+    def commit_cursors(self):
+        for crypto_id, (newest_id, gap) in self._pending_since_ids.items():
+            if newest_id is not None:
+                self.cursors.set(crypto_id, newest_id)
+            self.cursors.set(f'{crypto_id}_backfill', gap)
+        self._pending_since_ids.clear()
+        self.cursors.save()
 
     def save_tweets(self, tweets, crypto_id):
         if not tweets:
             logger.warning(f'No tweets to save for {crypto_id}')
             return
-        os.makedirs('data/tweets', exist_ok=True)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'data/tweets/tweets_{crypto_id}_{timestamp}.json'
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(tweets, f, ensure_ascii=False, indent=2)
+        with METRICS.stage('twitter', 'save', items=len(tweets)):
+            if self.store is not None:
+                self.store.append('tweets', tweets, time_key='created_at')
+                return
+            os.makedirs('data/tweets', exist_ok=True)
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f'data/tweets/tweets_{crypto_id}_{timestamp}{record_suffix()}'
+            write_records(filename, tweets)
+            self.index.record(f'tweets_{crypto_id}', filename)
         logger.info(f'Saved {len(tweets)} tweets to {filename}')
 
-    def collect_all_tweets(self, max_results_per_crypto=100):
+    def collect_all_tweets(self, max_results_per_crypto=None):
+        seen = self.cursors.seen('tweet_ids')
+        collected = {}
+        duplicates = 0
         for crypto_id in self.crypto_keywords:
             logger.info(f'Collecting tweets for {crypto_id}')
-            tweets = self.collect_tweets(crypto_id, max_results_per_crypto)
-            if tweets:
-                self.save_tweets(tweets, crypto_id)
+            for tweet in self.collect_tweets(crypto_id, max_results_per_crypto):
+                key = str(tweet['id'])
+                if key in collected:
+                    duplicates += 1
+                    if crypto_id not in collected[key]['crypto_ids']:
+                        collected[key]['crypto_ids'].append(crypto_id)
+                elif key in seen:
+                    duplicates += 1
+                else:
+                    collected[key] = tweet
+        by_crypto = {}
+        for tweet in collected.values():
+            by_crypto.setdefault(tweet['crypto_id'], []).append(tweet)
+        for crypto_id, tweets in by_crypto.items():
+            self.save_tweets(tweets, crypto_id)
+        self.cursors.add_seen('tweet_ids', collected)
+        self.commit_cursors()
+        logger.info(f'Stored {len(collected)} unique tweets ({duplicates} duplicates skipped)')
 
 if __name__ == '__main__':
     collector = TwitterCollector()
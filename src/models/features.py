@@ -0,0 +1,275 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+from typing import Dict, Any, Optional, Iterable, Iterator, List, Sequence, Tuple, Union
+import numpy as np
+import pandas as pd
+from src.data.storage import DataStore, TimeBound, _to_timestamp
+from src.sentiment.aggregator import POLARITY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FEATURE_VERSION = 1
+PriceInput = Union[pd.DataFrame, Dict[str, pd.DataFrame]]
+SentimentInput = Optional[Union[pd.DataFrame, Iterable[Dict[str, Any]]]]
+
+def _naive_utc(values: pd.Series, unit: Optional[str] = None) -> pd.Series:
+    if unit is not None or pd.api.types.is_numeric_dtype(values):
+        return pd.to_datetime(values, unit=unit or 's', errors='coerce')
+    if pd.api.types.is_datetime64_any_dtype(values) and getattr(values.dt, 'tz', None) is None:
+        return values.astype('datetime64[ns]')
+    return pd.to_datetime(values, utc=True, errors='coerce').dt.tz_convert(None)
+
+def normalize_prices(prices: PriceInput, crypto_id: str = 'all') -> pd.DataFrame:
+    if isinstance(prices, dict):
+        frames = [normalize_prices(df, coin) for coin, df in prices.items()]
+        return pd.concat(frames, ignore_index=True) if frames else normalize_prices(pd.DataFrame())
+    df = prices if 'timestamp' in prices.columns else prices.reset_index()
+    if df.empty or 'price' not in df:
+        return pd.DataFrame({'crypto_id': pd.Series(dtype=str), 'timestamp': pd.Series(dtype='datetime64[ns]'),
+                             'price': pd.Series(dtype=float), 'volume': pd.Series(dtype=float)})
+    df = pd.DataFrame({
+        'crypto_id': df['crypto_id'].astype(str) if 'crypto_id' in df else crypto_id,
+        'timestamp': _naive_utc(df['timestamp']),
+        'price': df['price'].astype(float),
+        'volume': df['volume'].astype(float) if 'volume' in df else np.nan
+    })
+    df = df.sort_values(['crypto_id', 'timestamp'], kind='stable')
+    return df.drop_duplicates(['crypto_id', 'timestamp'], keep='last').reset_index(drop=True)
+
+def normalize_sentiment(records: SentimentInput) -> pd.DataFrame:
+    df = records if isinstance(records, pd.DataFrame) else pd.DataFrame(list(records or []))
+    if df.empty:
+        return pd.DataFrame({'crypto_id': pd.Series(dtype=str), 'timestamp': pd.Series(dtype='datetime64[ns]'),
+                             'score': pd.Series(dtype=float)})
+    timestamps = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    for key, unit in [('created_utc', 's'), ('created_at', None), ('timestamp', None)]:
+        if key in df:
+            timestamps = timestamps.fillna(_naive_utc(df[key], unit))
+    if 'sentiment_score' in df:
+        scores = df['sentiment_score'].astype(float)
+    else:
+        analysis = df['sentiment_analysis']
+        polarity = analysis.str.get('sentiment').astype(str).str.lower().map(POLARITY).fillna(0.0)
+        scores = polarity * pd.to_numeric(analysis.str.get('confidence'), errors='coerce').fillna(0.0)
+    fallback = df['crypto_id'] if 'crypto_id' in df else pd.Series('all', index=df.index)
+    coins = df['crypto_ids'].where(df['crypto_ids'].notna(), fallback) if 'crypto_ids' in df else fallback
+    result = pd.DataFrame({'crypto_id': coins, 'timestamp': timestamps, 'score': scores}).explode('crypto_id')
+    result['crypto_id'] = result['crypto_id'].fillna('all').astype(str)
+    result = result.dropna(subset=['timestamp'])
+    return result.sort_values(['crypto_id', 'timestamp'], kind='stable').reset_index(drop=True)
+
+class FeatureBuilder:
+    def __init__(self, cache_dir: str = 'data/features', volatility_windows: Sequence[int] = (24, 168),
+                 volume_window: int = 24, sentiment_freq: str = '1h', sentiment_windows: Sequence[str] = ('6h', '24h'),
+                 sentiment_lags: Sequence[int] = (1, 6, 24), sentiment_tolerance: str = '24h',
+                 memory_budget_mb: float = 256.0):
+        self.cache_dir = cache_dir
+        self.volatility_windows = list(volatility_windows)
+        self.volume_window = volume_window
+        self.sentiment_freq = pd.Timedelta(sentiment_freq)
+        self.sentiment_windows = list(sentiment_windows)
+        self.sentiment_lags = list(sentiment_lags)
+        self.sentiment_tolerance = pd.Timedelta(sentiment_tolerance)
+        self.memory_budget_mb = memory_budget_mb
+        # Price bars kept from the previous chunk so rolling windows are exact across chunk boundaries.
+        self.warmup_rows = max(self.volatility_windows + [self.volume_window]) + 1
+        longest = max([pd.Timedelta(w) for w in self.sentiment_windows] + [self.sentiment_freq * max(self.sentiment_lags or [0])])
+        self.sentiment_lookback = longest + self.sentiment_tolerance + self.sentiment_freq
+
+    def settings(self) -> Dict[str, Any]:
+        return {
+            'version': FEATURE_VERSION,
+            'volatility_windows': self.volatility_windows,
+            'volume_window': self.volume_window,
+            'sentiment_freq': str(self.sentiment_freq),
+            'sentiment_windows': self.sentiment_windows,
+            'sentiment_lags': self.sentiment_lags,
+            'sentiment_tolerance': str(self.sentiment_tolerance)
+        }
+
+    @property
+    def feature_columns(self) -> List[str]:
+        columns = ['return', 'log_return']
+        columns += [f'volatility_{w}' for w in self.volatility_windows]
+        columns += ['volume_zscore', 'sentiment_count', 'sentiment_mean', 'sentiment_age_seconds']
+        for window in self.sentiment_windows:
+            columns += [f'sentiment_count_{window}', f'sentiment_mean_{window}']
+        columns += [f'sentiment_mean_lag{lag}' for lag in self.sentiment_lags]
+        return columns
+
+    @property
+    def chunk_rows(self) -> int:
+        # Rolling windows and as-of joins hold a few float64 copies of every column while a chunk is built.
+        bytes_per_row = 8 * (len(self.feature_columns) + 4) * 6
+        return max(4 * self.warmup_rows, int(self.memory_budget_mb * 1024 * 1024 // bytes_per_row))
+
+    def sentiment_buckets(self, sentiment: pd.DataFrame) -> pd.DataFrame:
+        if sentiment.empty:
+            columns = ['crypto_id', 'available_at', 'sentiment_count', 'sentiment_mean']
+            for window in self.sentiment_windows:
+                columns += [f'sentiment_count_{window}', f'sentiment_mean_{window}']
+            return pd.DataFrame(columns=columns).astype({'crypto_id': str, 'available_at': 'datetime64[ns]'})
+        buckets = (sentiment.assign(bucket=sentiment['timestamp'].dt.floor(self.sentiment_freq))
+                   .groupby(['crypto_id', 'bucket'], sort=True)['score'].agg(['count', 'sum']).reset_index())
+        # A bucket is only known once it closes, so it joins onto bars from its end onwards.
+        buckets['available_at'] = buckets['bucket'] + self.sentiment_freq
+        result = pd.DataFrame({'crypto_id': buckets['crypto_id'], 'available_at': buckets['available_at'],
+                               'sentiment_count': buckets['count'], 'sentiment_mean': buckets['sum'] / buckets['count']})
+        grouped = buckets.groupby('crypto_id', sort=False)
+        for window in self.sentiment_windows:
+            # Buckets are already sorted by coin, so the grouped rolling output lines up with them row for row.
+            rolled = grouped.rolling(window, on='available_at')[['count', 'sum']].sum()
+            result[f'sentiment_count_{window}'] = rolled['count'].to_numpy()
+            result[f'sentiment_mean_{window}'] = (rolled['sum'] / rolled['count']).to_numpy()
+        return result
+
+    def _asof(self, bars: pd.DataFrame, buckets: pd.DataFrame, on: pd.Series, columns: List[str]) -> pd.DataFrame:
+        left = pd.DataFrame({'crypto_id': bars['crypto_id'], '_on': on, '_row': np.arange(len(bars))}).sort_values('_on', kind='stable')
+        right = buckets[['crypto_id', 'available_at'] + columns].sort_values('available_at', kind='stable')
+        joined = pd.merge_asof(left, right, left_on='_on', right_on='available_at', by='crypto_id',
+                               direction='backward', tolerance=self.sentiment_tolerance)
+        return joined.sort_values('_row').reset_index(drop=True)
+
+    def compute(self, prices: pd.DataFrame, sentiment: pd.DataFrame) -> pd.DataFrame:
+        df = prices.sort_values(['crypto_id', 'timestamp'], kind='stable').reset_index(drop=True)
+        new_coin = df['crypto_id'].ne(df['crypto_id'].shift())
+        df['return'] = (df['price'] / df['price'].shift() - 1).mask(new_coin)
+        df['log_return'] = np.log(df['price']).diff().mask(new_coin)
+        grouped = df.groupby('crypto_id', sort=False)
+        for window in self.volatility_windows:
+            df[f'volatility_{window}'] = (grouped['log_return'].rolling(window, min_periods=window).std()
+                                          .reset_index(level=0, drop=True))
+        volume = grouped['volume'].rolling(self.volume_window, min_periods=self.volume_window)
+        mean = volume.mean().reset_index(level=0, drop=True)
+        std = volume.std().reset_index(level=0, drop=True)
+        df['volume_zscore'] = (df['volume'] - mean) / std.replace(0.0, np.nan)
+        buckets = self.sentiment_buckets(sentiment)
+        current = [c for c in buckets.columns if c not in ('crypto_id', 'available_at')]
+        joined = self._asof(df, buckets, df['timestamp'], current)
+        for column in current:
+            df[column] = joined[column].to_numpy()
+        df['sentiment_age_seconds'] = (df['timestamp'] - joined['available_at'].to_numpy()).dt.total_seconds().to_numpy()
+        for lag in self.sentiment_lags:
+            lagged = self._asof(df, buckets, df['timestamp'] - self.sentiment_freq * lag, ['sentiment_mean'])
+            df[f'sentiment_mean_lag{lag}'] = lagged['sentiment_mean'].to_numpy()
+        df['sentiment_count'] = df['sentiment_count'].fillna(0)
+        return df[['crypto_id', 'timestamp', 'price', 'volume'] + self.feature_columns]
+
+    def _compute_chunks(self, windows: Iterable[Tuple[pd.DataFrame, pd.DataFrame]], output_dir: str) -> int:
+        tmp_dir = f'{output_dir}.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        carry = None
+        rows = 0
+        for part, (prices, sentiment) in enumerate(windows):
+            if prices.empty:
+                continue
+            fresh = prices
+            if carry is not None:
+                prices = pd.concat([carry[carry['crypto_id'].isin(fresh['crypto_id'].unique())], fresh], ignore_index=True)
+            features = self.compute(prices, sentiment)
+            # Warm-up rows sort ahead of each coin's fresh rows; drop them by timestamp per coin.
+            first_new = fresh.groupby('crypto_id')['timestamp'].min()
+            features = features[features['timestamp'] >= features['crypto_id'].map(first_new)]
+            features.to_parquet(os.path.join(tmp_dir, f'part-{part:05d}.parquet'), index=False)
+            rows += len(features)
+            carry = pd.concat([carry, fresh], ignore_index=True) if carry is not None else fresh
+            carry = carry.sort_values(['crypto_id', 'timestamp'], kind='stable').groupby('crypto_id').tail(self.warmup_rows)
+        shutil.rmtree(output_dir, ignore_errors=True)
+        os.replace(tmp_dir, output_dir)
+        return rows
+
+    def _cache_path(self, fingerprint: Dict[str, Any]) -> str:
+        payload = json.dumps({'settings': self.settings(), 'inputs': fingerprint}, sort_keys=True, default=str)
+        return os.path.join(self.cache_dir, hashlib.sha256(payload.encode('utf-8')).hexdigest()[:24])
+
+    @staticmethod
+    def _frame_digest(df: pd.DataFrame) -> str:
+        return hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+
+    def _frame_windows(self, prices: pd.DataFrame, sentiment: pd.DataFrame) -> Iterator[Tuple[pd.DataFrame, pd.DataFrame]]:
+        by_time = prices.sort_values('timestamp', kind='stable')
+        sentiment = sentiment.sort_values('timestamp', kind='stable')
+        sentiment_times = sentiment['timestamp'].to_numpy()
+        boundaries = list(by_time['timestamp'].iloc[::self.chunk_rows])
+        for i, start in enumerate(boundaries):
+            end = boundaries[i + 1] if i + 1 < len(boundaries) else None
+            mask = by_time['timestamp'] >= start if end is None else by_time['timestamp'].between(start, end, inclusive='left')
+            lo = np.searchsorted(sentiment_times, (start - self.sentiment_lookback).to_datetime64(), side='left')
+            hi = len(sentiment_times) if end is None else np.searchsorted(sentiment_times, end.to_datetime64(), side='left')
+            yield by_time[mask], sentiment.iloc[lo:hi]
+
+    def build(self, prices: PriceInput, sentiment: SentimentInput = None, use_cache: bool = True) -> pd.DataFrame:
+        prices = normalize_prices(prices)
+        sentiment = normalize_sentiment(sentiment)
+        output_dir = self._cache_path({'prices': self._frame_digest(prices), 'sentiment': self._frame_digest(sentiment)})
+        if use_cache and os.path.isdir(output_dir):
+            logger.info(f'Loaded cached features from {output_dir}')
+        else:
+            rows = self._compute_chunks(self._frame_windows(prices, sentiment), output_dir)
+            logger.info(f'Built {rows} feature rows in {output_dir}')
+        return self.load(output_dir)
+
+    def _store_windows(self, store: DataStore, coins: Optional[Sequence[str]], start: pd.Timestamp, end: pd.Timestamp,
+                       price_source: str, sentiment_source: str) -> Iterator[Tuple[pd.DataFrame, pd.DataFrame]]:
+        total = store.count(price_source, coins, start, end)
+        days = max(1.0, (end - start) / pd.Timedelta(days=1))
+        step = pd.Timedelta(days=max(1.0, self.chunk_rows / max(1.0, total / days))).ceil('ms')
+        window_start = start
+        while window_start <= end:
+            window_end = min(window_start + step, end + pd.Timedelta(milliseconds=1))
+            prices = store.query(price_source, coins=coins, start=window_start, end=window_end)
+            prices = normalize_prices(prices[prices['timestamp'] < window_end] if not prices.empty else prices)
+            # Sentiment rows live under their primary coin, so read every coin and filter after exploding crypto_ids.
+            sentiment = normalize_sentiment(store.query(sentiment_source, start=window_start - self.sentiment_lookback,
+                                                        end=window_end))
+            sentiment = sentiment[sentiment['timestamp'] < window_end]
+            if coins is not None:
+                sentiment = sentiment[sentiment['crypto_id'].isin(coins)]
+            yield prices, sentiment
+            window_start = window_end
+
+    def build_from_store(self, store: DataStore, coins: Optional[Sequence[str]] = None, start: TimeBound = None,
+                         end: TimeBound = None, price_source: str = 'prices_historical_usd',
+                         sentiment_source: str = 'sentiment_tweets', use_cache: bool = True) -> str:
+        start, end = _to_timestamp(start), _to_timestamp(end)
+        if start is None or end is None:
+            # Default to the stored range rather than "now" so repeated runs hit the cache.
+            stored = store.query(price_source, coins=coins, columns=['timestamp'])
+            if stored.empty:
+                raise ValueError(f'No {price_source} data in store')
+            start = stored['timestamp'].min() if start is None else start
+            end = stored['timestamp'].max() if end is None else end
+        files = []
+        for source in (price_source, sentiment_source):
+            for directory, _, filenames in os.walk(store.source_path(source)):
+                for filename in filenames:
+                    if filename.endswith('.parquet') and not filename.startswith('.'):
+                        stat = os.stat(os.path.join(directory, filename))
+                        files.append((os.path.relpath(os.path.join(directory, filename), store.root), stat.st_size, stat.st_mtime_ns))
+        output_dir = self._cache_path({'store': sorted(files), 'coins': sorted(coins) if coins else None,
+                                       'start': start, 'end': end})
+        if use_cache and os.path.isdir(output_dir):
+            logger.info(f'Reusing cached features in {output_dir}')
+            return output_dir
+        rows = self._compute_chunks(self._store_windows(store, coins, start, end, price_source, sentiment_source), output_dir)
+        logger.info(f'Built {rows} feature rows in {output_dir}')
+        return output_dir
+
+    @staticmethod
+    def load(path: str, coins: Optional[Sequence[str]] = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        filters = [('crypto_id', 'in', list(coins))] if coins is not None else None
+        parts = [name for name in os.listdir(path) if name.endswith('.parquet')]
+        if not parts:
+            return pd.DataFrame(columns=columns or [])
+        df = pd.read_parquet(path, columns=columns, filters=filters)
+        return df.sort_values(['crypto_id', 'timestamp'], kind='stable').reset_index(drop=True)
+
+if __name__ == '__main__':
+    builder = FeatureBuilder()
+    path = builder.build_from_store(DataStore())
+    print(FeatureBuilder.load(path).tail())
@@ -0,0 +1,248 @@
+import os
+import json
+import math
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Iterable, List, Tuple
+import numpy as np
+from src.data.records import iter_records, is_record_file
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+POLARITY = {
+    'pos': 1.0, 'positive': 1.0,
+    'neu': 0.0, 'neutral': 0.0,
+    'neg': -1.0, 'negative': -1.0
+}
+
+def sentiment_score(analysis: Dict[str, Any]) -> float:
+    return POLARITY.get(str(analysis.get('sentiment', '')).lower(), 0.0) * float(analysis.get('confidence', 0.0))
+
+def record_timestamp(record: Dict[str, Any]) -> Optional[float]:
+    if record.get('created_utc') is not None:
+        return float(record['created_utc'])
+    value = record.get('created_at', record.get('timestamp'))
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+class RollingSentimentAggregator:
+    def __init__(self, windows: Optional[Dict[str, int]] = None, bucket_seconds: int = 60,
+                 ewma_halflife: float = 3600.0, allowed_lateness: float = 900.0):
+        self.windows = windows or {'1h': 3600, '24h': 86400}
+        self.bucket_seconds = bucket_seconds
+        self.ewma_halflife = ewma_halflife
+        self.allowed_lateness = allowed_lateness
+        self.window_names = list(self.windows)
+        self.window_buckets = np.array([max(1, seconds // bucket_seconds) for seconds in self.windows.values()], dtype=np.int64)
+        self.ring_size = int(self.window_buckets.max())
+        self.coins: Dict[str, int] = {}
+        self.ingested_files: set = set()
+        self.dropped_late = 0
+        self._allocate(8)
+
+    def _allocate(self, capacity: int):
+        windows = len(self.window_names)
+        self.bucket_ids = np.full((capacity, self.ring_size), -1, dtype=np.int64)
+        self.bucket_counts = np.zeros((capacity, self.ring_size), dtype=np.int64)
+        self.bucket_sums = np.zeros((capacity, self.ring_size), dtype=np.float64)
+        self.window_counts = np.zeros((capacity, windows), dtype=np.int64)
+        self.window_sums = np.zeros((capacity, windows), dtype=np.float64)
+        self.head = np.full(capacity, -1, dtype=np.int64)
+        self.max_time = np.full(capacity, -np.inf)
+        self.ewma_num = np.zeros(capacity)
+        self.ewma_den = np.zeros(capacity)
+
+    def _grow(self):
+        arrays = ['bucket_ids', 'bucket_counts', 'bucket_sums', 'window_counts', 'window_sums',
+                  'head', 'max_time', 'ewma_num', 'ewma_den']
+        old = {name: getattr(self, name) for name in arrays}
+        self._allocate(2 * len(self.head))
+        for name, values in old.items():
+            getattr(self, name)[:len(values)] = values
+
+    def _row(self, coin: str) -> int:
+        row = self.coins.get(coin)
+        if row is None:
+            row = len(self.coins)
+            if row == len(self.head):
+                self._grow()
+            self.coins[coin] = row
+        return row
+
+    def _advance(self, row: int, bucket: int):
+        head = self.head[row]
+        if head < 0 or bucket - head >= self.ring_size:
+            self.bucket_ids[row] = -1
+            self.bucket_counts[row] = 0
+            self.bucket_sums[row] = 0.0
+            self.window_counts[row] = 0
+            self.window_sums[row] = 0.0
+        else:
+            ids = self.bucket_ids[row]
+            for step in range(head + 1, bucket + 1):
+                # Drop each bucket from every window it just left, then recycle the slot for the new bucket.
+                leaving = step - self.window_buckets
+                slots = leaving % self.ring_size
+                present = ids[slots] == leaving
+                self.window_counts[row, present] -= self.bucket_counts[row, slots[present]]
+                self.window_sums[row, present] -= self.bucket_sums[row, slots[present]]
+                slot = step % self.ring_size
+                ids[slot] = -1
+                self.bucket_counts[row, slot] = 0
+                self.bucket_sums[row, slot] = 0.0
+        self.head[row] = bucket
+
+    def ingest(self, coin: str, timestamp: float, score: float) -> bool:
+        row = self._row(coin)
+        if timestamp < self.max_time[row] - self.allowed_lateness:
+            self.dropped_late += 1
+            return False
+        bucket = int(timestamp // self.bucket_seconds)
+        if bucket > self.head[row]:
+            self._advance(row, bucket)
+        if bucket > self.head[row] - self.ring_size:
+            slot = bucket % self.ring_size
+            if self.bucket_ids[row, slot] != bucket:
+                self.bucket_ids[row, slot] = bucket
+                self.bucket_counts[row, slot] = 0
+                self.bucket_sums[row, slot] = 0.0
+            self.bucket_counts[row, slot] += 1
+            self.bucket_sums[row, slot] += score
+            in_window = bucket > self.head[row] - self.window_buckets
+            self.window_counts[row, in_window] += 1
+            self.window_sums[row, in_window] += score
+        decay_rate = math.log(2) / self.ewma_halflife
+        if timestamp >= self.max_time[row]:
+            if np.isfinite(self.max_time[row]):
+                decay = math.exp(-decay_rate * (timestamp - self.max_time[row]))
+                self.ewma_num[row] *= decay
+                self.ewma_den[row] *= decay
+            self.ewma_num[row] += score
+            self.ewma_den[row] += 1.0
+            self.max_time[row] = timestamp
+        else:
+            # A late record is weighted as if it had arrived in order; the running sums stay exact.
+            weight = math.exp(-decay_rate * (self.max_time[row] - timestamp))
+            self.ewma_num[row] += score * weight
+            self.ewma_den[row] += weight
+        return True
+
+    @staticmethod
+    def scored_entries(records: Iterable[Dict[str, Any]]) -> List[Tuple[float, str, float]]:
+        entries = []
+        for record in records:
+            analysis = record.get('sentiment_analysis')
+            timestamp = record_timestamp(record)
+            if analysis is None or timestamp is None:
+                continue
+            score = sentiment_score(analysis)
+            # Records read back from the store carry crypto_ids as arrays, so test the length, not truthiness.
+            coins = record.get('crypto_ids')
+            if coins is None or not len(coins):
+                coins = [record.get('crypto_id') or 'all']
+            entries.extend((timestamp, coin, score) for coin in coins)
+        return entries
+
+    def ingest_entries(self, entries: List[Tuple[float, str, float]]) -> int:
+        # Collectors write newest-first and files overlap in time, so entries are replayed in time order;
+        # otherwise most of a batch would fall behind the lateness bound set by its newest record.
+        entries.sort(key=lambda entry: entry[0])
+        return sum(self.ingest(coin, timestamp, score) for timestamp, coin, score in entries)
+
+    def ingest_record(self, record: Dict[str, Any]) -> int:
+        return self.ingest_entries(self.scored_entries([record]))
+
+    def ingest_records(self, records: Iterable[Dict[str, Any]]) -> int:
+        return self.ingest_entries(self.scored_entries(records))
+
+    def ingest_file(self, path: str) -> int:
+        return self.ingest_records(iter_records(path))
+
+    def ingest_paths(self, paths: Iterable[str]) -> int:
+        # Only the (timestamp, coin, score) triples are held, so a whole batch of files can be ordered together.
+        # Files are recorded by name, the same way ingest_directory skips them, so a later directory scan does
+        # not count them again.
+        entries = []
+        for path in paths:
+            entries.extend(self.scored_entries(iter_records(path)))
+            self.ingested_files.add(os.path.basename(path))
+        return self.ingest_entries(entries)
+
+    def ingest_directory(self, input_dir: str) -> int:
+        filenames = [filename for filename in sorted(os.listdir(input_dir))
+                     if is_record_file(filename) and filename not in self.ingested_files]
+        return self.ingest_paths(os.path.join(input_dir, filename) for filename in filenames)
+
+    def snapshot(self, coin: str) -> Optional[Dict[str, Any]]:
+        row = self.coins.get(coin)
+        if row is None:
+            return None
+        result = {'ewma': float(self.ewma_num[row] / self.ewma_den[row]) if self.ewma_den[row] else 0.0,
+                  'as_of': float(self.max_time[row])}
+        for i, name in enumerate(self.window_names):
+            count = int(self.window_counts[row, i])
+            result[name] = {'count': count, 'mean': float(self.window_sums[row, i]) / count if count else 0.0}
+        return result
+
+    def snapshots(self) -> Dict[str, Dict[str, Any]]:
+        return {coin: self.snapshot(coin) for coin in self.coins}
+
+    def checkpoint(self, path: str):
+        rows = len(self.coins)
+        meta = {
+            'windows': self.windows,
+            'bucket_seconds': self.bucket_seconds,
+            'ewma_halflife': self.ewma_halflife,
+            'allowed_lateness': self.allowed_lateness,
+            'coins': list(self.coins),
+            'ingested_files': sorted(self.ingested_files),
+            'dropped_late': self.dropped_late
+        }
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f'{path}.tmp.npz'
+        np.savez_compressed(
+            tmp_path,
+            meta=np.array(json.dumps(meta)),
+            bucket_ids=self.bucket_ids[:rows], bucket_counts=self.bucket_counts[:rows],
+            bucket_sums=self.bucket_sums[:rows], window_counts=self.window_counts[:rows],
+            window_sums=self.window_sums[:rows], head=self.head[:rows], max_time=self.max_time[:rows],
+            ewma_num=self.ewma_num[:rows], ewma_den=self.ewma_den[:rows]
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'RollingSentimentAggregator':
+        with np.load(path) as state:
+            meta = json.loads(str(state['meta']))
+            aggregator = cls(meta['windows'], meta['bucket_seconds'], meta['ewma_halflife'], meta['allowed_lateness'])
+            rows = len(meta['coins'])
+            aggregator._allocate(max(8, rows))
+            for name in ['bucket_ids', 'bucket_counts', 'bucket_sums', 'window_counts', 'window_sums',
+                         'head', 'max_time', 'ewma_num', 'ewma_den']:
+                getattr(aggregator, name)[:rows] = state[name]
+        aggregator.coins = {coin: row for row, coin in enumerate(meta['coins'])}
+        aggregator.ingested_files = set(meta['ingested_files'])
+        aggregator.dropped_late = meta['dropped_late']
+        return aggregator
+
+    @classmethod
+    def load_or_create(cls, path: str, **kwargs) -> 'RollingSentimentAggregator':
+        if os.path.exists(path):
+            return cls.load(path)
+        return cls(**kwargs)
+
+if __name__ == '__main__':
+    checkpoint_path = 'data/sentiment/aggregator_state.npz'
+    aggregator = RollingSentimentAggregator.load_or_create(checkpoint_path)
+    for directory in ['data/sentiment/reddit', 'data/sentiment/tweets']:
+        if os.path.isdir(directory):
+            logger.info(f'Ingested {aggregator.ingest_directory(directory)} records from {directory}')
+    aggregator.checkpoint(checkpoint_path)
+    print(json.dumps(aggregator.snapshots(), indent=2))
@@ -1,51 +1,313 @@
 import os
-import json
+import time
 import logging
-from datetime import datetime
-from typing import List, Dict, Any
-from transformers import pipeline
+import threading
+from contextlib import ExitStack
+from itertools import islice
+from typing import List, Dict, Any, Optional, Tuple, TYPE_CHECKING
 from dotenv import load_dotenv
+from src.data.file_index import LatestFileIndex
+from src.data.metrics import METRICS
+from src.data.records import RecordWriter, iter_records, is_record_file
+from src.sentiment.backends import load_pipeline
+from src.sentiment.cache import SentimentCache
+from src.sentiment.manifest import ProcessedManifest, write_json_atomic
+from src.sentiment.prefilter import PreInferenceFilter
+
+if TYPE_CHECKING:
+    from src.data.storage import DataStore
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+MANIFEST_FILENAME = '.manifest.json'
+NEUTRAL_RESULT = {'sentiment': 'neutral', 'confidence': 0.0}
+
 class SentimentAnalyzer:
-    def __init__(self, model_name='finiteautomata/bertweet-base-sentiment-analysis'):
+    def __init__(self, model_name='finiteautomata/bertweet-base-sentiment-analysis', cache: Optional[SentimentCache] = None,
+                 backend: str = 'torch', model_cache_dir: str = 'data/models', service_url: Optional[str] = None):
         load_dotenv()
         self.model_name = model_name
-        self.analyzer = pipeline('sentiment-analysis', model=model_name)
+        self.backend = backend
+        self.model_cache_dir = model_cache_dir
+        self.service_url = service_url
+        self._pipeline = None
+        self._pipeline_lock = threading.Lock()
+        self.cache = cache
+        self.index = LatestFileIndex()
+        self.aggregator = None
+        self.prefilter: Optional[PreInferenceFilter] = None
+        self.last_throughput = 0.0
 
-    def analyze_text(self, text: str) -> Dict[str, Any]:
+    @property
+    def analyzer(self):
+        # The model is loaded on first use so that importing or constructing the analyzer stays cheap.
+        if self._pipeline is None:
+            with self._pipeline_lock:
+                if self._pipeline is None and self.service_url:
+                    from src.sentiment.service import SentimentClient
+                    client = SentimentClient(self.service_url)
+                    # Fail fast: an unreachable service would otherwise turn every batch into neutral fallbacks.
+                    client.health()
+                    self._pipeline = client
+                elif self._pipeline is None:
+                    self._pipeline = load_pipeline(self.model_name, backend=self.backend, cache_dir=self.model_cache_dir)
+        return self._pipeline
+
+    @analyzer.setter
+    def analyzer(self, pipeline):
+        self._pipeline = pipeline
+
+    @staticmethod
+    def _format_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        return {'sentiment': result['label'].lower(), 'confidence': float(result['score'])}
+
+    @property
+    def model_id(self) -> str:
+        return self.model_name if self.backend == 'torch' else f'{self.model_name}:{self.backend}'
+
+    def _active_cache(self) -> Optional[SentimentCache]:
+        if self.cache is not None:
+            self.cache.set_model(self.model_id)
+        return self.cache
+
+    def _infer_text(self, text: str) -> Optional[Dict[str, Any]]:
         try:
-            result = self.analyzer(text)[0]
-            sentiment = result['label'].lower()
-            confidence = float(result['score'])
-            return {'sentiment': sentiment, 'confidence': confidence}
+            with METRICS.stage('sentiment', 'infer', items=1):
+                return self._format_result(self.analyzer(text)[0])
         except Exception as e:
             logger.error(f'Error analyzing text: {e}')
-            return {'sentiment': 'neutral', 'confidence': 0.0}
-
-    def analyze_file(self, input_path: str, output_path: str, text_key: str = 'text'):
-        with open(input_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        for item in data:
-            text = item.get(text_key, '')
-            item['sentiment_analysis'] = self.analyze_text(text)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+            return None
+
+    def analyze_text(self, text: str) -> Dict[str, Any]:
+        cache = self._active_cache()
+        if cache is not None:
+            cached = cache.get(text)
+            if cached is not None:
+                return cached
+        result = self._infer_text(text)
+        if result is None:
+            return dict(NEUTRAL_RESULT)
+        if cache is not None:
+            cache.put(text, result)
+        return result
+
+    def _token_lengths(self, texts: List[str]) -> List[int]:
+        tokenizer = getattr(self.analyzer, 'tokenizer', None)
+        if tokenizer is not None:
+            try:
+                encoded = tokenizer([t if isinstance(t, str) else '' for t in texts], truncation=True)
+                return [len(ids) for ids in encoded['input_ids']]
+            except Exception as e:
+                logger.warning(f'Tokenizer length lookup failed, using word counts: {e}')
+        return [len(t.split()) if isinstance(t, str) else 0 for t in texts]
+
+    def _analyze_batch(self, texts: List[str]) -> List[Optional[Dict[str, Any]]]:
+        try:
+            with METRICS.stage('sentiment', 'infer', items=len(texts)):
+                outputs = self.analyzer(texts, batch_size=len(texts), truncation=True)
+                return [self._format_result(output) for output in outputs]
+        except Exception as e:
+            logger.error(f'Error analyzing batch of {len(texts)} texts, falling back to per-item: {e}')
+            return [self._infer_text(text) for text in texts]
+
+    def analyze_texts(self, texts: List[str], batch_size: int = 32) -> List[Dict[str, Any]]:
+        results: List[Dict[str, Any]] = [None] * len(texts)
+        if not texts:
+            return results
+        start = time.perf_counter()
+        cache = self._active_cache()
+        pending = list(range(len(texts)))
+        if cache is not None:
+            for index, cached in enumerate(cache.get_many(texts)):
+                results[index] = cached
+            pending = [i for i in pending if results[i] is None]
+        lengths = self._token_lengths([texts[i] for i in pending])
+        # Sorting by token length keeps similarly sized texts together, so each batch pads very little.
+        order = [pending[j] for j in sorted(range(len(pending)), key=lambda j: lengths[j])]
+        scored = []
+        for offset in range(0, len(order), batch_size):
+            batch = order[offset:offset + batch_size]
+            for index, result in zip(batch, self._analyze_batch([texts[i] for i in batch])):
+                if result is None:
+                    results[index] = dict(NEUTRAL_RESULT)
+                else:
+                    results[index] = result
+                    scored.append((texts[index], result))
+        if cache is not None and scored:
+            cache.put_many(scored)
+        elapsed = time.perf_counter() - start
+        self.last_throughput = len(texts) / elapsed if elapsed > 0 else float('inf')
+        logger.info(f'Analyzed {len(texts)} texts ({len(pending)} inferred) in {elapsed:.2f}s ({self.last_throughput:.1f} items/sec, batch_size={batch_size})')
+        return results
+
+    def _score_texts(self, texts: List[str], batch_size: int) -> List[Dict[str, Any]]:
+        if self.prefilter is None:
+            return self.analyze_texts(texts, batch_size=batch_size)
+        # Only one text per duplicate cluster reaches the model; the rest reuse its result.
+        return self.prefilter.score(texts, lambda pending: self.analyze_texts(pending, batch_size=batch_size))
+
+    def _score_records(self, records: List[Dict[str, Any]], text_key: str,
+                       batch_size: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        rejected = []
+        if self.prefilter is not None:
+            records, rejected = self.prefilter.gate(records)
+        results = self._score_texts([item.get(text_key, '') for item in records], batch_size)
+        for item, result in zip(records, results):
+            item['sentiment_analysis'] = result
+        return records, rejected
+
+    def analyze_file(self, input_path: str, output_path: str, text_key: str = 'text', batch_size: int = 32,
+                     chunk_size: int = 2048, aggregate: bool = True):
+        # Records stream through in chunks, so memory is bounded by chunk_size rather than the file size.
+        records = iter_records(input_path)
+        entries = []
+        with ExitStack() as stack:
+            writer = stack.enter_context(RecordWriter(output_path))
+            routed = None
+            while True:
+                with METRICS.stage('sentiment', 'parse') as stage:
+                    chunk = list(islice(records, chunk_size))
+                    stage['items'] = len(chunk)
+                if not chunk:
+                    break
+                chunk, rejected = self._score_records(chunk, text_key, batch_size)
+                if aggregate and self.aggregator is not None:
+                    entries.extend(self.aggregator.scored_entries(chunk))
+                with METRICS.stage('sentiment', 'save', items=len(chunk)):
+                    writer.write_many(chunk)
+                    if rejected and self.prefilter.language_action == 'route':
+                        if routed is None:
+                            routed = stack.enter_context(RecordWriter(self.routed_path(output_path)))
+                        routed.write_many(rejected)
+        if entries:
+            # Ingested once the whole file is scored, so newest-first input is replayed in time order.
+            self.aggregator.ingest_entries(entries)
+        if aggregate and self.aggregator is not None:
+            self.aggregator.ingested_files.add(os.path.basename(output_path))
+        self.index.record(f'sentiment_{os.path.basename(os.path.dirname(os.path.abspath(output_path)))}', output_path)
         logger.info(f'Sentiment analysis complete. Results saved to {output_path}')
 
-    def analyze_directory(self, input_dir: str, output_dir: str, text_key: str = 'text'):
+    def analyze_store(self, store: 'DataStore', source: str, text_key: str = 'text', start=None, end=None,
+                      batch_size: int = 32) -> int:
+        from src.data.storage import _to_timestamp
+        output_source = f'sentiment_{source}'
+        last_scored = None
+        if store.has_source(output_source):
+            scored = store.query(output_source, columns=['timestamp'])
+            if not scored.empty:
+                last_scored = scored['timestamp'].max()
+                # An explicit start is clipped to the high-water mark too, so nothing is scored and appended twice.
+                if start is None or _to_timestamp(start) < last_scored:
+                    start = last_scored
+        records = store.query(source, start=start, end=end)
+        if last_scored is not None:
+            records = records[records['timestamp'] > last_scored]
+        if records.empty:
+            logger.info(f'No new {source} records to analyze')
+            return 0
+        records = records.drop(columns=['coin', 'date'])
+        rejected = records.iloc[0:0]
+        if self.prefilter is not None and 'lang' in records:
+            mask = self.prefilter.language_mask(None if lang != lang else lang for lang in records['lang'])
+            rejected = records[[not keep for keep in mask]]
+            records = records[mask]
+        texts = [text if isinstance(text, str) else '' for text in records[text_key]]
+        records = records.assign(sentiment_analysis=self._score_texts(texts, batch_size))
+        if self.aggregator is not None:
+            self.aggregator.ingest_records(records.to_dict('records'))
+        with METRICS.stage('sentiment', 'save', items=len(records)):
+            if not records.empty:
+                store.append(output_source, records)
+            if not rejected.empty and self.prefilter.language_action == 'route':
+                store.append(f'routed_{source}', rejected)
+        return len(records)
+
+    @staticmethod
+    def routed_path(output_path: str) -> str:
+        return os.path.join(os.path.dirname(output_path), 'routed', os.path.basename(output_path))
+
+    def analyze_directory(self, input_dir: str, output_dir: str, text_key: str = 'text', batch_size: int = 32,
+                          incremental: bool = False, workers: int = 1):
         os.makedirs(output_dir, exist_ok=True)
-        for filename in os.listdir(input_dir):
-            if filename.endswith('.json'):
+        manifest = ProcessedManifest(os.path.join(output_dir, MANIFEST_FILENAME)) if incremental else None
+        settings = {'model_name': self.model_id, 'text_key': text_key}
+        tasks = []
+        skipped = 0
+        for filename in sorted(os.listdir(input_dir)):
+            if is_record_file(filename):
                 input_path = os.path.join(input_dir, filename)
                 output_path = os.path.join(output_dir, f'sentiment_{filename}')
-                self.analyze_file(input_path, output_path, text_key=text_key)
+                if manifest is not None and manifest.is_current(filename, input_path, output_path, settings):
+                    skipped += 1
+                    continue
+                fingerprint = manifest.fingerprint(input_path) if manifest is not None else None
+                tasks.append((filename, input_path, output_path, fingerprint))
+
+        completed = []
+
+        def mark_done(task):
+            completed.append(task[2])
+            if manifest is not None:
+                manifest.mark_done(task[0], task[3], task[2], settings)
+
+        # A remote service already batches across callers, so worker processes would only add overhead, and
+        # duplicate suppression needs one shared index, so a prefiltered run also stays in-process.
+        if workers > 1 and len(tasks) > 1 and not self.service_url and self.prefilter is None:
+            from src.sentiment.parallel import analyze_files_parallel
+            failures = analyze_files_parallel(self, tasks, workers, text_key=text_key, batch_size=batch_size,
+                                              on_done=mark_done)
+        else:
+            failures = []
+            for task in tasks:
+                self.analyze_file(task[1], task[2], text_key=text_key, batch_size=batch_size, aggregate=False)
+                mark_done(task)
+        if self.aggregator is not None and completed:
+            # Worker processes cannot reach this aggregator, so every run feeds it from the finished output
+            # files, ordered across files rather than file by file.
+            self.aggregator.ingest_paths(completed)
+        if manifest is not None:
+            logger.info(f'Skipped {skipped} unchanged files in {input_dir}')
+        if failures:
+            # Same outcome as the serial path: the run fails, and the failed files stay out of the manifest.
+            failed = ', '.join(task[0] for task, _ in failures)
+            raise RuntimeError(f'{len(failures)} of {len(tasks)} files failed in {input_dir}: {failed}') from failures[0][1]
 
 if __name__ == '__main__':
-    analyzer = SentimentAnalyzer()
-    # Example: analyze Reddit posts
-    analyzer.analyze_directory('data/reddit', 'data/sentiment/reddit', text_key='text')
-    # Example: analyze Tweets
-    analyzer.analyze_directory('data/tweets', 'data/sentiment/tweets', text_key='text') 
\ No newline at end of file
+    model_name = 'finiteautomata/bertweet-base-sentiment-analysis'
+    backend = os.getenv('SENTIMENT_BACKEND', 'torch')
+    # With SENTIMENT_SERVICE_URL set, inference (and its cache) is delegated to a running sentiment service.
+    service_url = os.getenv('SENTIMENT_SERVICE_URL')
+    analyzer = SentimentAnalyzer(model_name, backend=backend, service_url=service_url)
+    if not service_url:
+        analyzer.cache = SentimentCache(analyzer.model_id)
+    workers = int(os.getenv('SENTIMENT_WORKERS', '1'))
+    # Rolling per-coin sentiment is updated from this run's results and checkpointed for the next one.
+    from src.sentiment.aggregator import RollingSentimentAggregator
+    aggregator_path = os.getenv('SENTIMENT_AGGREGATOR_STATE', 'data/sentiment/aggregator_state.npz')
+    analyzer.aggregator = RollingSentimentAggregator.load_or_create(aggregator_path)
+    if os.getenv('SENTIMENT_PREFILTER', '1') != '0':
+        analyzer.prefilter = PreInferenceFilter(
+            languages=[lang for lang in os.getenv('SENTIMENT_LANGUAGES', 'en').split(',') if lang],
+            language_action=os.getenv('SENTIMENT_LANGUAGE_ACTION', 'drop')
+        )
+    if os.getenv('CRYPTOPULSE_STORAGE') == 'parquet':
+        from src.data.storage import DataStore
+        store = DataStore()
+        analyzer.analyze_store(store, 'reddit')
+        analyzer.analyze_store(store, 'tweets')
+    else:
+        # Example: analyze Reddit posts
+        analyzer.analyze_directory('data/reddit', 'data/sentiment/reddit', text_key='text', incremental=True, workers=workers)
+        # Example: analyze Tweets
+        analyzer.analyze_directory('data/tweets', 'data/sentiment/tweets', text_key='text', incremental=True, workers=workers)
+    analyzer.aggregator.checkpoint(aggregator_path)
+    if analyzer.cache is not None:
+        logger.info(f'Sentiment cache stats: {analyzer.cache.stats()}')
+    if analyzer.prefilter is not None:
+        report = analyzer.prefilter.report()
+        write_json_atomic('data/sentiment/prefilter_report.json', report)
+        logger.info(f'Prefilter avoided {report["inference_avoided"]} of {report["records"]} inferences '
+                    f'({report["avoided_fraction"]:.1%}): {report}')
+    if os.getenv('CRYPTOPULSE_METRICS_FILE'):
+        METRICS.write_textfile(os.getenv('CRYPTOPULSE_METRICS_FILE'))
\ No newline at end of file
@@ -0,0 +1,100 @@
+import os
+import glob
+import json
+import time
+import logging
+from typing import List, Dict, Any, Sequence
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('torch', 'torch-int8', 'onnx')
+
+def pipeline(*args, **kwargs):
+    # transformers (and torch behind it) takes seconds to import, so it is only loaded when a model is.
+    from transformers import pipeline as transformers_pipeline
+    return transformers_pipeline(*args, **kwargs)
+
+def _artifact_dir(cache_dir: str, backend: str, model_name: str) -> str:
+    return os.path.join(cache_dir, backend, model_name.replace('/', '__'))
+
+def _load_int8_model(model_name: str, artifact_dir: str):
+    import torch
+    from transformers import AutoModelForSequenceClassification
+    model_path = os.path.join(artifact_dir, 'model_int8.pt')
+    if os.path.exists(model_path):
+        logger.info(f'Loading cached int8 model from {model_path}')
+        return torch.load(model_path, weights_only=False)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.eval()
+    quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    os.makedirs(artifact_dir, exist_ok=True)
+    torch.save(quantized, model_path)
+    logger.info(f'Saved int8 model to {model_path}')
+    return quantized
+
+def _load_onnx_model(model_name: str, artifact_dir: str):
+    try:
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+    except ImportError as e:
+        raise ImportError("The 'onnx' backend requires optimum[onnxruntime]: pip install 'optimum[onnxruntime]'") from e
+    if os.path.exists(os.path.join(artifact_dir, 'model.onnx')):
+        logger.info(f'Loading cached ONNX model from {artifact_dir}')
+        return ORTModelForSequenceClassification.from_pretrained(artifact_dir)
+    model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+    model.save_pretrained(artifact_dir)
+    logger.info(f'Exported ONNX model to {artifact_dir}')
+    return model
+
+def load_pipeline(model_name: str, backend: str = 'torch', cache_dir: str = 'data/models'):
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown backend: {backend}. Expected one of {BACKENDS}')
+    if backend == 'torch':
+        return pipeline('sentiment-analysis', model=model_name)
+    from transformers import AutoTokenizer
+    artifact_dir = _artifact_dir(cache_dir, backend, model_name)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if backend == 'torch-int8':
+        model = _load_int8_model(model_name, artifact_dir)
+    else:
+        model = _load_onnx_model(model_name, artifact_dir)
+    return pipeline('sentiment-analysis', model=model, tokenizer=tokenizer)
+
+def compare_backends(texts: List[str], model_name: str = 'finiteautomata/bertweet-base-sentiment-analysis',
+                     backends: Sequence[str] = BACKENDS, batch_size: int = 32,
+                     cache_dir: str = 'data/models') -> Dict[str, Dict[str, Any]]:
+    from src.sentiment.analyzer import SentimentAnalyzer
+    report = {}
+    reference = None
+    for backend in ['torch'] + [b for b in backends if b != 'torch']:
+        analyzer = SentimentAnalyzer(model_name, backend=backend, model_cache_dir=cache_dir)
+        analyzer.analyze_texts(texts[:batch_size], batch_size=batch_size)
+        start = time.perf_counter()
+        results = analyzer.analyze_texts(texts, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = results
+        agreement = sum(r['sentiment'] == ref['sentiment'] for r, ref in zip(results, reference)) / len(texts) if texts else 1.0
+        confidence_delta = sum(abs(r['confidence'] - ref['confidence']) for r, ref in zip(results, reference)) / len(texts) if texts else 0.0
+        report[backend] = {
+            'items_per_sec': len(texts) / elapsed if elapsed > 0 else float('inf'),
+            'label_agreement': agreement,
+            'mean_confidence_delta': confidence_delta
+        }
+        logger.info(f'{backend}: {report[backend]}')
+    baseline = report['torch']['items_per_sec']
+    for backend, stats in report.items():
+        stats['speedup'] = stats['items_per_sec'] / baseline if baseline else 0.0
+    return report
+
+if __name__ == '__main__':
+    texts = []
+    from src.data.records import iter_records, is_record_file
+    for path in sorted(p for p in glob.glob('data/tweets/*') if is_record_file(p)):
+        texts.extend(item.get('text', '') for item in iter_records(path))
+        if len(texts) >= 1000:
+            break
+    if not texts:
+        logger.error('No tweets found under data/tweets to compare backends with')
+    else:
+        print(json.dumps(compare_backends(texts[:1000]), indent=2))
@@ -0,0 +1,143 @@
+import os
+import re
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_RETWEET_PREFIX = re.compile(r'^RT @\w+:\s*')
+_WHITESPACE = re.compile(r'\s+')
+
+class SentimentCache:
+    def __init__(self, model_name: str, db_path: Optional[str] = 'data/cache/sentiment_cache.sqlite', max_size: int = 100000,
+                 busy_timeout: float = 30.0):
+        self.model_name = model_name
+        self.db_path = db_path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._memory: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if db_path:
+            os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+            # Parallel workers each open their own connection to this file, so a writer waits for the lock
+            # instead of failing with "database is locked".
+            self._conn = sqlite3.connect(db_path, timeout=busy_timeout, check_same_thread=False)
+            self._conn.execute(f'PRAGMA busy_timeout={int(busy_timeout * 1000)}')
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS sentiment (key TEXT PRIMARY KEY, sentiment TEXT, confidence REAL)')
+            self._conn.commit()
+        self._check_model()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        text = _WHITESPACE.sub(' ', text).strip()
+        return _RETWEET_PREFIX.sub('', text)
+
+    def key(self, text: Any) -> Optional[str]:
+        if not isinstance(text, str):
+            return None
+        payload = f'{self.model_name}\0{self.normalize(text)}'
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _check_model(self):
+        if self._conn is None:
+            return
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'model_name'").fetchone()
+        if row is not None and row[0] == self.model_name:
+            return
+        if row is not None:
+            logger.info(f'Sentiment cache model changed from {row[0]} to {self.model_name}, clearing {self.db_path}')
+        self._conn.execute('DELETE FROM sentiment')
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('model_name', ?)", (self.model_name,))
+        self._conn.commit()
+
+    def set_model(self, model_name: str):
+        with self._lock:
+            if model_name == self.model_name:
+                return
+            self.model_name = model_name
+            self._memory.clear()
+            self._check_model()
+
+    def _remember(self, key: str, result: Dict[str, Any]):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def get(self, text: str) -> Optional[Dict[str, Any]]:
+        return self.get_many([text])[0]
+
+    def get_many(self, texts: List[str]) -> List[Optional[Dict[str, Any]]]:
+        keys = [self.key(text) for text in texts]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        with self._lock:
+            missing = {}
+            for index, key in enumerate(keys):
+                if key is None:
+                    continue
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    results[index] = dict(self._memory[key])
+                else:
+                    missing.setdefault(key, []).append(index)
+            if missing and self._conn is not None:
+                pending = list(missing)
+                for offset in range(0, len(pending), 500):
+                    chunk = pending[offset:offset + 500]
+                    placeholders = ','.join('?' * len(chunk))
+                    rows = self._conn.execute(
+                        f'SELECT key, sentiment, confidence FROM sentiment WHERE key IN ({placeholders})', chunk
+                    ).fetchall()
+                    for key, sentiment, confidence in rows:
+                        result = {'sentiment': sentiment, 'confidence': confidence}
+                        self._remember(key, result)
+                        self.disk_hits += len(missing[key])
+                        for index in missing[key]:
+                            results[index] = dict(result)
+            found = sum(1 for result in results if result is not None)
+            self.hits += found
+            self.misses += len(texts) - found
+        return results
+
+    def put(self, text: str, result: Dict[str, Any]):
+        self.put_many([(text, result)])
+
+    def put_many(self, items: Iterable[Tuple[str, Dict[str, Any]]]):
+        rows = []
+        with self._lock:
+            for text, result in items:
+                key = self.key(text)
+                if key is None:
+                    continue
+                entry = {'sentiment': result['sentiment'], 'confidence': float(result['confidence'])}
+                self._remember(key, entry)
+                rows.append((key, entry['sentiment'], entry['confidence']))
+            if rows and self._conn is not None:
+                self._conn.executemany('INSERT OR REPLACE INTO sentiment (key, sentiment, confidence) VALUES (?, ?, ?)', rows)
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'disk_hits': self.disk_hits,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'memory_entries': len(self._memory)
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,73 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def write_json_atomic(path: str, data: Any, indent: Optional[int] = 2):
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ProcessedManifest:
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f).get('files', {})
+            except (OSError, ValueError) as e:
+                logger.warning(f'Ignoring unreadable manifest {path}: {e}')
+
+    def is_current(self, filename: str, input_path: str, output_path: str, settings: Dict[str, Any]) -> bool:
+        entry = self.entries.get(filename)
+        if entry is None or entry.get('settings') != settings or not os.path.exists(output_path):
+            return False
+        stat = os.stat(input_path)
+        if entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+            return True
+        if entry['size'] != stat.st_size or entry['sha256'] != file_sha256(input_path):
+            return False
+        # Touched but unchanged: refresh the stat fields so the next run takes the fast path.
+        entry['mtime'] = stat.st_mtime
+        return True
+
+    @staticmethod
+    def fingerprint(input_path: str) -> Dict[str, Any]:
+        stat = os.stat(input_path)
+        return {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': file_sha256(input_path)}
+
+    def mark_done(self, filename: str, fingerprint: Dict[str, Any], output_path: str, settings: Dict[str, Any]):
+        self.entries[filename] = dict(
+            fingerprint,
+            output=output_path,
+            settings=settings,
+            processed_at=datetime.now().isoformat()
+        )
+        self.save()
+
+    def save(self):
+        write_json_atomic(self.path, {'files': self.entries})
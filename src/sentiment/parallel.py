@@ -0,0 +1,113 @@
+import os
+import time
+import random
+import logging
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, Optional, Callable, Tuple
+from src.data.records import write_records
+from src.sentiment.analyzer import SentimentAnalyzer
+from src.sentiment.cache import SentimentCache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FileTask = Tuple[str, str, str, Optional[Dict[str, Any]]]
+
+_worker_analyzer: Optional[SentimentAnalyzer] = None
+
+def _init_worker(model_name: str, backend: str, model_cache_dir: str, threads: int,
+                 cache_path: Optional[str], cache_size: int):
+    global _worker_analyzer
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+    except (ImportError, RuntimeError) as e:
+        logger.debug(f'Could not configure torch threads in worker: {e}')
+    _worker_analyzer = SentimentAnalyzer(model_name, backend=backend, model_cache_dir=model_cache_dir)
+    # Load the model while the pool starts up rather than inside the first task.
+    _worker_analyzer.analyzer
+    if cache_path:
+        _worker_analyzer.cache = SentimentCache(_worker_analyzer.model_id, db_path=cache_path, max_size=cache_size)
+
+def _analyze_file_task(input_path: str, output_path: str, text_key: str, batch_size: int) -> str:
+    _worker_analyzer.analyze_file(input_path, output_path, text_key=text_key, batch_size=batch_size)
+    return input_path
+
+def threads_per_worker(workers: int) -> int:
+    return max(1, (os.cpu_count() or 1) // workers)
+
+def analyze_files_parallel(analyzer: SentimentAnalyzer, tasks: List[FileTask], workers: int,
+                           text_key: str = 'text', batch_size: int = 32, max_pending: Optional[int] = None,
+                           on_done: Optional[Callable[[FileTask], None]] = None,
+                           mp_context=None) -> List[Tuple[FileTask, BaseException]]:
+    # A failed file does not stop the other workers; failures are returned so the caller can raise once the
+    # finished files have been recorded.
+    cache = analyzer.cache
+    initargs = (
+        analyzer.model_name,
+        analyzer.backend,
+        analyzer.model_cache_dir,
+        threads_per_worker(workers),
+        cache.db_path if cache is not None else None,
+        cache.max_size if cache is not None else 0
+    )
+    max_pending = max_pending or workers * 2
+    queue = iter(tasks)
+    start = time.perf_counter()
+    failures = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context,
+                             initializer=_init_worker, initargs=initargs) as executor:
+        pending = {}
+
+        def submit_next() -> bool:
+            task = next(queue, None)
+            if task is None:
+                return False
+            future = executor.submit(_analyze_file_task, task[1], task[2], text_key, batch_size)
+            pending[future] = task
+            return True
+
+        while len(pending) < max_pending and submit_next():
+            pass
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = pending.pop(future)
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f'Worker failed on {task[1]}: {e}')
+                    failures.append((task, e))
+                else:
+                    if on_done is not None:
+                        on_done(task)
+                submit_next()
+    logger.info(f'Processed {len(tasks) - len(failures)} of {len(tasks)} files with {workers} workers '
+                f'in {time.perf_counter() - start:.2f}s')
+    return failures
+
+def benchmark_scaling(analyzer: SentimentAnalyzer, worker_counts: List[int], files: int = 64,
+                      items_per_file: int = 200, batch_size: int = 32) -> Dict[int, float]:
+    words = ['btc', 'moon', 'dump', 'hodl', 'bullish', 'bearish', 'rekt', 'pump', 'eth', 'great', 'terrible', 'today']
+    rng = random.Random(0)
+    timings = {}
+    with tempfile.TemporaryDirectory() as root:
+        input_dir = os.path.join(root, 'input')
+        os.makedirs(input_dir)
+        for index in range(files):
+            items = ({'text': ' '.join(rng.choices(words, k=rng.randint(5, 40)))} for _ in range(items_per_file))
+            write_records(os.path.join(input_dir, f'synthetic_{index:04d}.jsonl'), items)
+        for workers in worker_counts:
+            output_dir = os.path.join(root, f'output_{workers}')
+            start = time.perf_counter()
+            analyzer.analyze_directory(input_dir, output_dir, batch_size=batch_size, workers=workers)
+            timings[workers] = time.perf_counter() - start
+            logger.info(f'{workers} workers: {timings[workers]:.2f}s ({timings[worker_counts[0]] / timings[workers]:.2f}x)')
+    return timings
+
+if __name__ == '__main__':
+    cores = os.cpu_count() or 1
+    counts = sorted({1, 2, max(1, cores // 2), cores})
+    benchmark_scaling(SentimentAnalyzer(), counts)
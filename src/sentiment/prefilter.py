@@ -0,0 +1,236 @@
+import re
+import logging
+from collections import OrderedDict, Counter
+from typing import Dict, Any, Callable, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from src.data.metrics import METRICS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+UNKNOWN_LANGUAGES = {None, '', 'und', 'zxx', 'qme', 'qam', 'qct', 'qht', 'qst'}
+
+_URL = re.compile(r'https?://\S+|www\.\S+')
+_MENTION = re.compile(r'@\w+')
+_RETWEET = re.compile(r'^(rt\s+)+')
+_NON_WORD = re.compile(r'[^\w$#]+')
+
+def normalize_text(text: Optional[str]) -> str:
+    # Bot copies usually differ only in links, mentions, emoji or punctuation, so all of those are dropped.
+    if not isinstance(text, str):
+        return ''
+    text = _MENTION.sub(' ', _URL.sub(' ', text.lower()))
+    return _RETWEET.sub('', ' '.join(_NON_WORD.sub(' ', text).split()))
+
+class MinHashLSH:
+    def __init__(self, num_perm: int = 64, bands: int = 8, shingle_size: int = 5, threshold: float = 0.8,
+                 max_entries: int = 200000, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError(f'num_perm ({num_perm}) must be divisible by bands ({bands})')
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+        self.max_entries = max_entries
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing: wrapping uint64 arithmetic and a shift instead of a modulo keeps this vectorized.
+        self._a = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)
+        self._weights = np.array([pow(257, shingle_size - 1 - j, 1 << 64) for j in range(shingle_size)], dtype=np.uint64)
+        self._signatures: 'OrderedDict[int, np.ndarray]' = OrderedDict()
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+
+    def signatures(self, texts: Sequence[str], block_shingles: int = 1 << 15) -> np.ndarray:
+        # All texts are hashed together and split per text with reduceat; blocks bound the
+        # (shingles x num_perm) intermediate to a few tens of MB.
+        k = self.shingle_size
+        encoded = [text.encode('utf-8').ljust(k, b'\0') for text in texts]
+        result = np.empty((len(encoded), self.num_perm), dtype=np.uint64)
+        begin = 0
+        while begin < len(encoded):
+            end, total = begin, 0
+            while end < len(encoded) and (end == begin or total + len(encoded[end]) <= block_shingles):
+                total += len(encoded[end])
+                end += 1
+            result[begin:end] = self._block_signatures(encoded[begin:end])
+            begin = end
+        return result
+
+    def _block_signatures(self, encoded: List[bytes]) -> np.ndarray:
+        k = self.shingle_size
+        lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+        data = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.uint64)
+        counts = lengths - k + 1
+        offsets = np.cumsum(counts) - counts
+        starts = np.cumsum(lengths) - lengths
+        # Byte k-gram shingles that do not straddle two texts: a polynomial over the window, mixed by a
+        # golden-ratio multiply, keeping the top 32 bits.
+        index = np.repeat(starts - offsets, counts) + np.arange(counts.sum())
+        shingles = (sliding_window_view(data, k)[index] @ self._weights) * GOLDEN >> np.uint64(32)
+        # Permutations along the first axis keep each text's shingles contiguous for the reduction.
+        values = (self._a[:, None] * shingles[None, :] + self._b[:, None]) >> np.uint64(32)
+        return np.minimum.reduceat(values, offsets, axis=1).T
+
+    def signature(self, normalized: str) -> np.ndarray:
+        return self.signatures([normalized])[0]
+
+    def band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [(band, rows.tobytes()) for band, rows in enumerate(signature.reshape(self.bands, self.rows))]
+
+    def query(self, signature: np.ndarray, band_keys: Optional[List[Tuple[int, bytes]]] = None) -> Optional[int]:
+        best, best_similarity = None, self.threshold
+        seen = set()
+        for key in band_keys or self.band_keys(signature):
+            for candidate in self._buckets.get(key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                # Band collisions only nominate candidates; the signature agreement estimates the real Jaccard.
+                similarity = float(np.mean(self._signatures[candidate] == signature))
+                if similarity >= best_similarity:
+                    best, best_similarity = candidate, similarity
+        return best
+
+    def add(self, key: int, signature: np.ndarray, band_keys: Optional[List[Tuple[int, bytes]]] = None):
+        self._signatures[key] = signature
+        for band_key in band_keys or self.band_keys(signature):
+            self._buckets.setdefault(band_key, []).append(key)
+        while len(self._signatures) > self.max_entries:
+            self._evict(*self._signatures.popitem(last=False))
+
+    def _evict(self, key: int, signature: np.ndarray):
+        for band_key in self.band_keys(signature):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.remove(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+class PreInferenceFilter:
+    def __init__(self, languages: Optional[Sequence[str]] = ('en',), language_action: str = 'drop',
+                 keep_unknown_language: bool = True, dedup: bool = True, threshold: float = 0.8,
+                 num_perm: int = 64, bands: int = 8, shingle_size: int = 5, max_entries: int = 200000):
+        if language_action not in ('drop', 'route'):
+            raise ValueError(f'Unknown language action: {language_action}. Expected drop or route')
+        self.languages = set(languages) if languages else None
+        self.language_action = language_action
+        self.keep_unknown_language = keep_unknown_language
+        self.dedup = dedup
+        self.max_entries = max_entries
+        self.lsh = MinHashLSH(num_perm, bands, shingle_size, threshold, max_entries)
+        # Cluster representatives: normalized text -> id, and id -> scored result once inference has run.
+        self._exact: 'OrderedDict[str, int]' = OrderedDict()
+        self._results: 'OrderedDict[int, Dict[str, Any]]' = OrderedDict()
+        self._next_id = 0
+        self.counts = Counter()
+        self.rejected_languages = Counter()
+
+    def accepts_language(self, lang: Optional[str]) -> bool:
+        if self.languages is None:
+            return True
+        if lang in UNKNOWN_LANGUAGES:
+            return self.keep_unknown_language
+        return lang in self.languages
+
+    def language_mask(self, languages: Iterable[Optional[str]]) -> List[bool]:
+        mask = []
+        for lang in languages:
+            accepted = self.accepts_language(lang)
+            if not accepted:
+                self.rejected_languages[lang] += 1
+            mask.append(accepted)
+        rejected = mask.count(False)
+        self.counts['records'] += len(mask)
+        if rejected:
+            reason = 'language_dropped' if self.language_action == 'drop' else 'language_routed'
+            self.counts[reason] += rejected
+            METRICS.inc('prefilter_skipped_total', rejected, reason=reason)
+        return mask
+
+    def gate(self, records: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        mask = self.language_mask(record.get('lang') for record in records)
+        return ([r for r, keep in zip(records, mask) if keep], [r for r, keep in zip(records, mask) if not keep])
+
+    def _remember(self, normalized: str, cluster: int):
+        self._exact[normalized] = cluster
+        if len(self._exact) > self.max_entries:
+            self._exact.popitem(last=False)
+
+    def _cluster(self, normalized: str, signature: np.ndarray, batch_clusters: set) -> Tuple[int, Optional[str]]:
+        cluster = self._exact.get(normalized)
+        if cluster is not None and (cluster in self._results or cluster in batch_clusters):
+            self._exact.move_to_end(normalized)
+            return cluster, 'exact'
+        band_keys = self.lsh.band_keys(signature)
+        cluster = self.lsh.query(signature, band_keys)
+        if cluster is not None and (cluster in self._results or cluster in batch_clusters):
+            self._remember(normalized, cluster)
+            return cluster, 'near'
+        cluster = self._next_id
+        self._next_id += 1
+        self.lsh.add(cluster, signature, band_keys)
+        self._remember(normalized, cluster)
+        return cluster, None
+
+    def score(self, texts: List[str], infer: Callable[[List[str]], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        if not self.dedup:
+            self.counts['inferred'] += len(texts)
+            return infer(texts)
+        clusters: List[Optional[int]] = []
+        representatives: Dict[int, int] = {}
+        normalized = [normalize_text(text) for text in texts]
+        signatures = self.lsh.signatures([text for text in normalized if text])
+        position = 0
+        for index, text in enumerate(normalized):
+            if not text:
+                clusters.append(None)
+                continue
+            cluster, match = self._cluster(text, signatures[position], representatives.keys())
+            position += 1
+            clusters.append(cluster)
+            if match is None:
+                representatives[cluster] = index
+            else:
+                self.counts[f'{match}_duplicates'] += 1
+        pending = [i for i, cluster in enumerate(clusters) if cluster is None or representatives.get(cluster) == i]
+        scored = dict(zip(pending, infer([texts[i] for i in pending]))) if pending else {}
+        self.counts['inferred'] += len(pending)
+        for cluster, index in representatives.items():
+            self._results[cluster] = scored[index]
+        results = []
+        for i in range(len(texts)):
+            if i in scored:
+                results.append(scored[i])
+            else:
+                self._results.move_to_end(clusters[i])
+                results.append(dict(self._results[clusters[i]]))
+        # Trimmed only after this batch has read its results, so a hit on the oldest cluster cannot be evicted
+        # before it is used; hits move to the end, so eviction is least recently used.
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+        avoided = len(texts) - len(pending)
+        if avoided:
+            METRICS.inc('prefilter_skipped_total', avoided, reason='duplicate')
+        return results
+
+    def report(self) -> Dict[str, Any]:
+        records = self.counts['records'] or self.counts['inferred'] + self.counts['exact_duplicates'] + self.counts['near_duplicates']
+        avoided = records - self.counts['inferred']
+        return {
+            'records': records,
+            'inferred': self.counts['inferred'],
+            'inference_avoided': avoided,
+            'avoided_fraction': avoided / records if records else 0.0,
+            'language_dropped': self.counts['language_dropped'],
+            'language_routed': self.counts['language_routed'],
+            'rejected_languages': dict(self.rejected_languages.most_common()),
+            'exact_duplicates': self.counts['exact_duplicates'],
+            'near_duplicates': self.counts['near_duplicates'],
+            'clusters_tracked': len(self.lsh)
+        }
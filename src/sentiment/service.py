@@ -0,0 +1,317 @@
+import os
+import json
+import time
+import socket
+import logging
+import threading
+import http.client
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingUnixStreamServer
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
+from urllib.parse import urlparse
+from src.data.metrics import METRICS
+from src.data.rate_limiter import parse_retry_after
+
+if TYPE_CHECKING:
+    from src.sentiment.analyzer import SentimentAnalyzer
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_URL = 'http://127.0.0.1:8765'
+
+class ServiceOverloaded(RuntimeError):
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class _Request:
+    __slots__ = ('results', 'remaining', 'enqueued', 'done')
+
+    def __init__(self, size: int):
+        self.results: List[Optional[Dict[str, Any]]] = [None] * size
+        self.remaining = size
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+
+class SentimentService:
+    def __init__(self, analyzer: 'SentimentAnalyzer', max_batch_size: int = 32, max_wait_ms: float = 10.0,
+                 max_queue: int = 4096, request_timeout: float = 60.0, latency_window: int = 10000):
+        self.analyzer = analyzer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self.request_timeout = request_timeout
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._latencies = deque(maxlen=latency_window)
+        self._items_per_sec = 0.0
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self.requests = 0
+        self.texts = 0
+        self.batches = 0
+        self.scored = 0
+        self.rejected = 0
+
+    def start(self) -> 'SentimentService':
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, daemon=True, name='sentiment-batcher')
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _retry_after(self) -> float:
+        if not self._items_per_sec:
+            return max(self.max_wait, 0.1)
+        return max(self.max_wait, len(self._queue) / self._items_per_sec)
+
+    def submit(self, texts: List[str]) -> _Request:
+        request = _Request(len(texts))
+        if not texts:
+            request.done.set()
+            return request
+        with self._cond:
+            if self._stopping:
+                raise RuntimeError('Sentiment service is stopped')
+            # Rejecting up front keeps queueing delay bounded; callers retry after the advertised delay.
+            if len(self._queue) + len(texts) > self.max_queue:
+                self.rejected += 1
+                METRICS.inc('service_rejected_total')
+                raise ServiceOverloaded(f'Sentiment queue full ({len(self._queue)}/{self.max_queue} texts pending)',
+                                        retry_after=self._retry_after())
+            self.requests += 1
+            self.texts += len(texts)
+            self._queue.extend((request, index, text) for index, text in enumerate(texts))
+            self._cond.notify_all()
+        return request
+
+    def analyze_texts(self, texts: List[str], timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        request = self.submit(list(texts))
+        if not request.done.wait(timeout):
+            raise TimeoutError(f'Sentiment request for {len(texts)} texts timed out')
+        return request.results
+
+    def analyze_text(self, text: str) -> Dict[str, Any]:
+        return self.analyze_texts([text], timeout=self.request_timeout)[0]
+
+    def _next_batch(self) -> Optional[list]:
+        with self._cond:
+            while not self._queue and not self._stopping:
+                self._cond.wait()
+            if not self._queue:
+                return None
+            # The oldest item waits at most max_wait for concurrent callers to fill its batch.
+            deadline = self._queue[0][0].enqueued + self.max_wait
+            while len(self._queue) < self.max_batch_size and not self._stopping:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return [self._queue.popleft() for _ in range(min(self.max_batch_size, len(self._queue)))]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            start = time.perf_counter()
+            try:
+                results = self.analyzer.analyze_texts([text if isinstance(text, str) else '' for _, _, text in batch],
+                                                      batch_size=len(batch))
+            except Exception as e:
+                logger.error(f'Sentiment batch of {len(batch)} texts failed: {e}')
+                from src.sentiment.analyzer import NEUTRAL_RESULT
+                results = [dict(NEUTRAL_RESULT) for _ in batch]
+            finished = time.perf_counter()
+            completed = []
+            with self._cond:
+                self.batches += 1
+                self.scored += len(batch)
+                self._items_per_sec = len(batch) / max(finished - start, 1e-6)
+                for (request, index, _), result in zip(batch, results):
+                    request.results[index] = result
+                    request.remaining -= 1
+                    if request.remaining == 0:
+                        self._latencies.append(finished - request.enqueued)
+                        completed.append(request)
+            METRICS.observe('service_batch_size', len(batch))
+            for request in completed:
+                METRICS.observe('service_request_seconds', finished - request.enqueued)
+                request.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            latencies = sorted(self._latencies)
+            stats = {
+                'queue_depth': len(self._queue),
+                'max_queue': self.max_queue,
+                'requests': self.requests,
+                'texts': self.texts,
+                'batches': self.batches,
+                'rejected': self.rejected,
+                'mean_batch_size': self.scored / self.batches if self.batches else 0.0
+            }
+        stats['latency_ms'] = {
+            f'p{q}': latencies[min(len(latencies) - 1, int(q / 100 * len(latencies)))] * 1000 if latencies else None
+            for q in (50, 95, 99)
+        }
+        return stats
+
+class _UnixHTTPServer(ThreadingUnixStreamServer):
+    daemon_threads = True
+
+def make_server(service: SentimentService, url: str = DEFAULT_URL):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body, content_type: str = 'application/json', headers: Optional[Dict[str, str]] = None):
+            payload = (body if isinstance(body, str) else json.dumps(body)).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            path = self.path.split('?')[0]
+            if path == '/health':
+                self._send(200, {'status': 'ok', 'model': service.analyzer.model_id})
+            elif path == '/stats':
+                self._send(200, service.stats())
+            elif path == '/metrics':
+                self._send(200, METRICS.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+            else:
+                self._send(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path.split('?')[0] != '/analyze':
+                self._send(404, {'error': 'not found'})
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                texts = body['texts'] if 'texts' in body else [body['text']]
+                if not isinstance(texts, list):
+                    raise ValueError('texts must be a list')
+            except (KeyError, TypeError, ValueError) as e:
+                self._send(400, {'error': f'Invalid request: {e}'})
+                return
+            try:
+                results = service.analyze_texts(texts, timeout=service.request_timeout)
+            except ServiceOverloaded as e:
+                self._send(503, {'error': str(e)}, headers={'Retry-After': f'{e.retry_after:.3f}'})
+                return
+            except TimeoutError as e:
+                self._send(504, {'error': str(e)})
+                return
+            self._send(200, {'results': results})
+
+        def log_message(self, format, *args):
+            pass
+
+    parsed = urlparse(url)
+    if parsed.scheme == 'unix':
+        if os.path.exists(parsed.path):
+            os.remove(parsed.path)
+        return _UnixHTTPServer(parsed.path, Handler)
+    return ThreadingHTTPServer((parsed.hostname or '127.0.0.1', parsed.port or 8765), Handler)
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+class SentimentClient:
+    # Only the standard library is used here, so importing the client costs nothing next to loading a model.
+    def __init__(self, url: str = DEFAULT_URL, timeout: float = 60.0, max_retries: int = 5, chunk_size: int = 256):
+        self.url = url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.chunk_size = chunk_size
+        self._parsed = urlparse(url)
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._parsed.scheme == 'unix':
+            return _UnixHTTPConnection(self._parsed.path, self.timeout)
+        return http.client.HTTPConnection(self._parsed.hostname or '127.0.0.1', self._parsed.port or 8765, timeout=self.timeout)
+
+    def _request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Any:
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+        headers = {'Content-Type': 'application/json'} if payload is not None else {}
+        for attempt in range(self.max_retries + 1):
+            connection = self._connection()
+            try:
+                connection.request(method, path, body=payload, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+            finally:
+                connection.close()
+            if response.status == 503:
+                retry_after = parse_retry_after(response.getheader('Retry-After'))
+                if attempt == self.max_retries:
+                    raise ServiceOverloaded(f'Sentiment service overloaded after {attempt + 1} attempts', retry_after)
+                time.sleep(min(retry_after if retry_after is not None else 0.05 * 2 ** attempt, 5.0))
+                continue
+            if response.status != 200:
+                raise RuntimeError(f'Sentiment service returned {response.status}: {data[:200].decode("utf-8", "replace")}')
+            return json.loads(data)
+
+    def health(self) -> Dict[str, Any]:
+        return self._request('GET', '/health')
+
+    def stats(self) -> Dict[str, Any]:
+        return self._request('GET', '/stats')
+
+    def analyze_texts(self, texts: List[str], batch_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        # batch_size is accepted for parity with SentimentAnalyzer; the service decides the real batching.
+        results = []
+        for offset in range(0, len(texts), self.chunk_size):
+            results.extend(self._request('POST', '/analyze', {'texts': list(texts[offset:offset + self.chunk_size])})['results'])
+        return results
+
+    def analyze_text(self, text: str) -> Dict[str, Any]:
+        return self.analyze_texts([text])[0]
+
+    def __call__(self, inputs, **kwargs) -> List[Dict[str, Any]]:
+        # Pipeline-shaped so a SentimentAnalyzer can hand inference to the service and keep its file/store logic.
+        batch = [inputs] if isinstance(inputs, str) else list(inputs)
+        return [{'label': r['sentiment'], 'score': r['confidence']} for r in self.analyze_texts(batch)]
+
+if __name__ == '__main__':
+    # Imported here so SentimentClient stays stdlib-only for the processes that just call the service.
+    from src.sentiment.analyzer import SentimentAnalyzer
+    analyzer = SentimentAnalyzer(backend=os.getenv('SENTIMENT_BACKEND', 'torch'))
+    if os.getenv('SENTIMENT_CACHE', '1') != '0':
+        from src.sentiment.cache import SentimentCache
+        analyzer.cache = SentimentCache(analyzer.model_id)
+    service = SentimentService(
+        analyzer,
+        max_batch_size=int(os.getenv('SENTIMENT_MAX_BATCH', '32')),
+        max_wait_ms=float(os.getenv('SENTIMENT_MAX_WAIT_MS', '10')),
+        max_queue=int(os.getenv('SENTIMENT_MAX_QUEUE', '4096'))
+    )
+    url = os.getenv('SENTIMENT_SERVICE_URL', DEFAULT_URL)
+    # Load the model before accepting connections so the first callers do not time out.
+    analyzer.analyzer
+    server = make_server(service.start(), url)
+    logger.info(f'Sentiment service for {analyzer.model_id} listening on {url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
@@ -0,0 +1,46 @@
+import numpy as np
+
+def lttb_indices(x, y, threshold: int) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    # Interior points are split into threshold - 2 buckets; the first and last points are always kept.
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            avg_x = x[edges[i + 1]:edges[i + 2]].mean()
+            avg_y = y[edges[i + 1]:edges[i + 2]].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+def minmax_indices(y, buckets: int) -> np.ndarray:
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if 2 * buckets >= n:
+        return np.arange(n)
+    bucket = np.arange(n) * buckets // n
+    order = np.lexsort((y, bucket))
+    boundaries = np.flatnonzero(np.diff(bucket[order])) + 1
+    firsts = np.concatenate(([0], boundaries))
+    lasts = np.concatenate((boundaries - 1, [n - 1]))
+    return np.unique(np.concatenate((order[firsts], order[lasts])))
+
+def downsample_frame(df, x_column: str, y_column: str, max_points: int, method: str = 'lttb'):
+    if len(df) <= max_points:
+        return df
+    if method == 'minmax':
+        return df.iloc[minmax_indices(df[y_column].to_numpy(), max_points // 2)]
+    x = df[x_column].to_numpy()
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype('datetime64[ns]').astype(np.int64)
+    return df.iloc[lttb_indices(x, df[y_column].to_numpy(), max_points)]
@@ -0,0 +1,63 @@
+import numpy as np
+from src.data.records import write_records
+from src.sentiment.aggregator import RollingSentimentAggregator
+
+def _record(ts, sentiment, coin='bitcoin', confidence=1.0):
+    return {'created_utc': ts, 'crypto_id': coin, 'sentiment_analysis': {'sentiment': sentiment, 'confidence': confidence}}
+
+def test_rolling_windows_match_brute_force():
+    rng = np.random.default_rng(1)
+    aggregator = RollingSentimentAggregator(windows={'10m': 600, '1h': 3600}, bucket_seconds=60, allowed_lateness=0)
+    times = np.sort(rng.uniform(0, 20000, size=2000))
+    scores = rng.choice([-1.0, 0.0, 1.0], size=2000)
+    for t, s in zip(times, scores):
+        aggregator.ingest('bitcoin', float(t), float(s))
+    head = int(times[-1] // 60)
+    snapshot = aggregator.snapshot('bitcoin')
+    for name, seconds in [('10m', 600), ('1h', 3600)]:
+        mask = (times // 60) > head - seconds // 60
+        assert snapshot[name]['count'] == int(mask.sum())
+        assert np.isclose(snapshot[name]['mean'], scores[mask].mean())
+
+def test_late_records_within_bound_are_counted():
+    aggregator = RollingSentimentAggregator(windows={'1h': 3600}, allowed_lateness=300)
+    aggregator.ingest_record(_record(10000.0, 'pos'))
+    assert aggregator.ingest_record(_record(9800.0, 'neg')) == 1
+    assert aggregator.ingest_record(_record(9000.0, 'neg')) == 0
+    assert aggregator.dropped_late == 1
+    snapshot = aggregator.snapshot('bitcoin')
+    assert snapshot['1h']['count'] == 2
+    assert -1.0 < snapshot['ewma'] < 1.0
+
+def test_checkpoint_round_trip(tmp_path):
+    aggregator = RollingSentimentAggregator()
+    for i in range(50):
+        aggregator.ingest_record(_record(1000.0 + i * 30, 'pos' if i % 2 else 'neu', coin=f'coin{i % 12}'))
+    path = str(tmp_path / 'state.npz')
+    aggregator.checkpoint(path)
+    restored = RollingSentimentAggregator.load(path)
+    assert restored.snapshots() == aggregator.snapshots()
+    restored.ingest_record(_record(3000.0, 'neg', coin='coin0'))
+    assert restored.snapshot('coin0')['24h']['count'] == aggregator.snapshot('coin0')['24h']['count'] + 1
+
+def test_newest_first_files_are_replayed_in_time_order(tmp_path):
+    # Collectors write newest-first, and a later file can start before an earlier one ends.
+    times = [1_700_000_000.0 + i * 120 for i in range(180)]
+    write_records(str(tmp_path / 'posts_b.jsonl'), [_record(t, 'pos') for t in reversed(times[:120])])
+    write_records(str(tmp_path / 'posts_a.jsonl'), [_record(t, 'neg') for t in reversed(times[90:])])
+    aggregator = RollingSentimentAggregator(windows={'24h': 86400})
+    assert aggregator.ingest_directory(str(tmp_path)) == 210
+    assert aggregator.dropped_late == 0
+    assert aggregator.snapshot('bitcoin')['24h']['count'] == 210
+    assert aggregator.ingest_records([_record(t, 'pos', coin='ether') for t in reversed(times)]) == 180
+
+def test_ingested_paths_are_not_counted_again_by_directory_scans(tmp_path):
+    times = [1_700_000_000.0 + i * 60 for i in range(10)]
+    write_records(str(tmp_path / 'posts_a.jsonl'), [_record(t, 'pos') for t in times[:5]])
+    write_records(str(tmp_path / 'posts_b.jsonl'), [_record(t, 'neg') for t in times[5:]])
+    aggregator = RollingSentimentAggregator()
+    assert aggregator.ingest_paths([str(tmp_path / 'posts_a.jsonl')]) == 5
+    assert aggregator.ingested_files == {'posts_a.jsonl'}
+    assert aggregator.ingest_directory(str(tmp_path)) == 5
+    assert aggregator.ingest_directory(str(tmp_path)) == 0
+    assert aggregator.snapshot('bitcoin')['24h']['count'] == 10
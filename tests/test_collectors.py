@@ -1,8 +1,25 @@
 import pytest
 import os
+import glob
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import datetime, timezone
+from types import SimpleNamespace
+import pandas as pd
 from src.data.twitter_collector import TwitterCollector
+from src.data import reddit_collector
 from src.data.reddit_collector import RedditCollector
 from src.data.price_collector import PriceCollector
+from src.data.collector import DataCollector
+from src.data.cursors import CursorStore
+from src.data.file_index import LatestFileIndex
+from src.data.metrics import METRICS, MetricsRegistry
+from src.data.price_history import PriceHistoryStore
+from src.data.records import read_records
+from src.data.storage import DataStore
+from src.data.rate_limiter import TokenBucket, parse_retry_after
 
 def test_twitter_collector_init():
     try:
@@ -20,4 +37,250 @@ def test_price_collector_current_prices():
     collector = PriceCollector()
     prices = collector.get_current_prices()
     assert isinstance(prices, dict)
-    assert 'bitcoin' in prices 
\ No newline at end of file
+    assert 'bitcoin' in prices
+
+def test_token_bucket_paces_requests():
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.monotonic()
+    for _ in range(4):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.05
+    assert bucket.total_wait > 0
+
+def test_token_bucket_honors_retry_after():
+    bucket = TokenBucket(rate=1000, capacity=5)
+    bucket.penalize(parse_retry_after('0.1'))
+    assert bucket.acquire() >= 0.09
+
+def test_data_collector_isolates_source_failures():
+    def fail():
+        raise RuntimeError('api down')
+    collector = DataCollector(metrics=MetricsRegistry())
+    collector.twitter = SimpleNamespace(collect_all_tweets=fail)
+    collector.reddit = SimpleNamespace(collect_all=lambda: time.sleep(0.1))
+    collector.price = SimpleNamespace(collect_all_data=lambda: time.sleep(0.1))
+    start = time.monotonic()
+    report = collector.collect_all()
+    assert time.monotonic() - start < 0.19
+    assert report['Twitter']['status'] == 'error'
+    assert report['Reddit']['status'] == 'ok'
+    assert report['Price']['duration'] >= 0.1
+    assert collector.metrics.snapshot()['stage_errors_total'][(('source', 'twitter'), ('stage', 'collect'))] == 1
+    assert DataCollector(metrics=MetricsRegistry(), sources=[]).collect_all() == {}
+
+class StubCoinGeckoHandler(BaseHTTPRequestHandler):
+    responses = []
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append(self.path)
+        status, body = self.responses.pop(0) if self.responses else (200, {'bitcoin': {'usd': 1.0}})
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        if status == 429:
+            self.send_header('Retry-After', '0')
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def coingecko_stub():
+    StubCoinGeckoHandler.responses = []
+    StubCoinGeckoHandler.requests_seen = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubCoinGeckoHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/api/v3', StubCoinGeckoHandler
+    server.shutdown()
+    server.server_close()
+
+def test_price_collector_retries_transient_errors(coingecko_stub):
+    base_url, handler = coingecko_stub
+    handler.responses = [(503, {}), (429, {}), (200, {'bitcoin': {'usd': 42.0}})]
+    collector = PriceCollector(base_url=base_url, rate_limiter=TokenBucket(rate=1000, capacity=10), backoff_factor=0.01)
+    prices = collector.get_current_prices()
+    assert prices == {'bitcoin': {'usd': 42.0}}
+    assert len(handler.requests_seen) == 3
+
+def test_price_collector_gives_up_after_max_retries(coingecko_stub):
+    base_url, handler = coingecko_stub
+    handler.responses = [(500, {})] * 3
+    collector = PriceCollector(base_url=base_url, rate_limiter=TokenBucket(rate=1000, capacity=10),
+                               max_retries=2, backoff_factor=0.01)
+    errors = METRICS.snapshot().get('stage_errors_total', {})
+    before = {stage: errors.get((('source', 'price'), ('stage', stage)), 0) for stage in ('fetch', 'fetch_retry')}
+    assert collector.get_current_prices() == {}
+    assert len(handler.requests_seen) == 3
+    errors = METRICS.snapshot()['stage_errors_total']
+    assert errors[(('source', 'price'), ('stage', 'fetch'))] - before['fetch'] == 1
+    assert errors[(('source', 'price'), ('stage', 'fetch_retry'))] - before['fetch_retry'] == 2
+
+def _market_chart(start_ms, days):
+    points = [start_ms + i * 86400000 for i in range(days)]
+    return {
+        'prices': [[t, float(i)] for i, t in enumerate(points)],
+        'total_volumes': [[t, 10.0 * i] for i, t in enumerate(points)],
+        'market_caps': [[t, 100.0 * i] for i, t in enumerate(points)]
+    }
+
+def test_incremental_history_sync_fetches_only_missing_days(coingecko_stub, tmp_path):
+    base_url, handler = coingecko_stub
+    today = pd.Timestamp.now('UTC').tz_localize(None).normalize()
+    handler.responses = [
+        (200, _market_chart(int((today - pd.Timedelta(days=9)).timestamp() * 1000), 8)),
+        (200, _market_chart(int((today - pd.Timedelta(days=2)).timestamp() * 1000), 3))
+    ]
+    store = DataStore(str(tmp_path / 'store'))
+    collector = PriceCollector(base_url=base_url, rate_limiter=TokenBucket(rate=1000, capacity=10),
+                               history=PriceHistoryStore(str(tmp_path)), store=store)
+    first = collector.sync_historical_prices('bitcoin')
+    assert len(first) == 8
+    assert 'days=365' in handler.requests_seen[0]
+    second = collector.sync_historical_prices('bitcoin')
+    assert 'days=4' in handler.requests_seen[1]
+    assert len(second) == 10
+    assert second.index.is_unique and second.index.is_monotonic_increasing
+    assert list(second.columns) == ['price', 'volume', 'market_cap']
+    assert second.index.name == 'timestamp'
+    stored = store.query('prices_historical_usd', coins=['bitcoin'])
+    assert len(stored) == 11
+    stored = store.query('prices_historical_usd', coins=['bitcoin'], dedup_on=['timestamp'])
+    assert len(stored) == 10 and stored['timestamp'].is_unique
+    # The overlapping day carries the refreshed value, not the provisional one from the first sync.
+    assert stored.set_index('timestamp')['price'].tolist() == second['price'].tolist()
+    assert stored.loc[stored['timestamp'] == today - pd.Timedelta(days=2), 'price'].item() == 0.0
+
+def test_latest_file_index_tracks_only_files_under_its_root(tmp_path):
+    index = LatestFileIndex(str(tmp_path / 'data' / 'latest.json'))
+    assert index.version() == 0
+    index.record('prices_current', str(tmp_path / 'data' / 'prices_current_1.json'))
+    index.record('outside', str(tmp_path / 'elsewhere.json'))
+    assert index.version() > 0
+    assert index.get('prices_current')['path'].endswith('prices_current_1.json')
+    assert index.get('outside') is None
+
+class FakeSubreddit:
+    def __init__(self, posts):
+        self.posts = posts
+        self.yielded = 0
+
+    def new(self, limit=None):
+        for post in sorted(self.posts, key=lambda p: -p.created_utc)[:limit]:
+            self.yielded += 1
+            yield post
+
+class FakeReddit:
+    subreddits = {}
+
+    def __init__(self, **kwargs):
+        pass
+
+    def subreddit(self, name):
+        return self.subreddits[name]
+
+def _fake_post(post_id, created_utc):
+    return SimpleNamespace(id=post_id, title=f'title {post_id}', selftext='', created_utc=created_utc,
+                           score=1, num_comments=0, url='')
+
+def test_cursor_store_dedupes_seen_ids_within_one_call(tmp_path):
+    cursors = CursorStore(str(tmp_path / 'cursors.json'), max_seen_ids=3)
+    cursors.add_seen('ids', ['a', 'b', 'a', 1, '1'])
+    cursors.add_seen('ids', ['b', 'c', 'c'])
+    cursors.save()
+    assert CursorStore(str(tmp_path / 'cursors.json'))._seen['ids'] == ['b', '1', 'c']
+
+def test_reddit_cursor_stops_at_seen_posts(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('REDDIT_CLIENT_ID', 'id')
+    monkeypatch.setenv('REDDIT_CLIENT_SECRET', 'secret')
+    monkeypatch.setattr(reddit_collector.praw, 'Reddit', FakeReddit)
+    now = time.time()
+    subreddit = FakeSubreddit([_fake_post(f'p{i}', now - 600 * i) for i in range(5)])
+    FakeReddit.subreddits = {'Bitcoin': subreddit}
+    collector = RedditCollector(rate_limiter=TokenBucket(rate=1000, capacity=10))
+    collector.subreddits = ['Bitcoin']
+    collector.collect_all()
+    assert len(read_records(glob.glob('data/reddit/posts_Bitcoin_*.jsonl')[0])) == 5
+    subreddit.posts.append(_fake_post('p-new', now + 60))
+    subreddit.yielded = 0
+    restarted = RedditCollector(rate_limiter=TokenBucket(rate=1000, capacity=10))
+    posts = restarted.collect_posts('Bitcoin')
+    assert [p['id'] for p in posts] == ['p-new']
+    assert subreddit.yielded == 2
+
+class FakeTwitterClient:
+    def __init__(self, tweets_by_query):
+        self.tweets_by_query = tweets_by_query
+        self.calls = []
+
+    def search_recent_tweets(self, query, max_results, since_id=None, until_id=None, next_token=None, tweet_fields=None):
+        self.calls.append({'query': query, 'since_id': since_id, 'until_id': until_id, 'next_token': next_token})
+        tweets = [t for t in self.tweets_by_query.get(query, [])
+                  if (since_id is None or t.id > int(since_id)) and (until_id is None or t.id < int(until_id))]
+        offset = int(next_token or 0)
+        page = tweets[offset:offset + max_results]
+        meta = {'newest_id': str(tweets[0].id)} if tweets else {}
+        if offset + max_results < len(tweets):
+            meta['next_token'] = str(offset + max_results)
+        return SimpleNamespace(data=page or None, meta=meta)
+
+def _fake_tweet(tweet_id):
+    return SimpleNamespace(id=tweet_id, text=f'tweet {tweet_id}', lang='en',
+                           created_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+                           public_metrics={'like_count': 0, 'retweet_count': 0, 'reply_count': 0})
+
+def test_twitter_paginates_dedups_and_resumes_from_since_id(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    for name in ['TWITTER_API_KEY', 'TWITTER_API_SECRET', 'TWITTER_ACCESS_TOKEN', 'TWITTER_ACCESS_TOKEN_SECRET']:
+        monkeypatch.setenv(name, 'x')
+    collector = TwitterCollector(rate_limiter=TokenBucket(rate=1000, capacity=10))
+    collector.crypto_keywords = {'bitcoin': ['btc'], 'ethereum': ['eth']}
+    btc = [_fake_tweet(i) for i in range(250, 100, -1)]
+    eth = [_fake_tweet(i) for i in range(300, 240, -1)]
+    collector.client = FakeTwitterClient({'btc': btc, 'eth': eth})
+    collector.collect_all_tweets(max_results_per_crypto=500)
+    assert sum(1 for c in collector.client.calls if c['query'] == 'btc') == 2
+    saved = [t for path in glob.glob('data/tweets/*.jsonl') for t in read_records(path)]
+    assert len(saved) == len({t['id'] for t in saved}) == 200
+    shared = next(t for t in saved if t['id'] == 245)
+    assert sorted(shared['crypto_ids']) == ['bitcoin', 'ethereum']
+    collector.client.calls.clear()
+    assert collector.collect_tweets('bitcoin') == []
+    assert collector.client.calls[0]['since_id'] == '250'
+
+class FailingPageTwitterClient(FakeTwitterClient):
+    def search_recent_tweets(self, query, max_results, since_id=None, until_id=None, next_token=None, tweet_fields=None):
+        if next_token is not None:
+            raise RuntimeError('503 Service Unavailable')
+        return super().search_recent_tweets(query, max_results, since_id, until_id, next_token, tweet_fields)
+
+def test_twitter_cursor_advances_and_backfills_the_gap(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    for name in ['TWITTER_API_KEY', 'TWITTER_API_SECRET', 'TWITTER_ACCESS_TOKEN', 'TWITTER_ACCESS_TOKEN_SECRET']:
+        monkeypatch.setenv(name, 'x')
+    collector = TwitterCollector(rate_limiter=TokenBucket(rate=1000, capacity=10), max_results_per_run=107)
+    collector.crypto_keywords = {'bitcoin': ['btc']}
+    collector.cursors.set('bitcoin', '100')
+    tweets = [_fake_tweet(i) for i in range(400, 100, -1)]
+    collector.client = FailingPageTwitterClient({'btc': tweets})
+    assert len(collector.collect_tweets('bitcoin')) == 100
+    collector.commit_cursors()
+    assert collector.cursors.get('bitcoin') == '400'
+    assert collector.cursors.get('bitcoin_backfill') == {'since_id': '100', 'until_id': '301'}
+    collector.client = FakeTwitterClient({'btc': tweets + [_fake_tweet(i) for i in range(405, 400, -1)]})
+    collector.client.tweets_by_query['btc'].sort(key=lambda t: -t.id)
+    # 5 new tweets, then the remaining budget of 102 backfills from 300 down; the last page is sized to the
+    # API minimum of 10, so 8 extra tweets come back and are kept.
+    batch = collector.collect_tweets('bitcoin')
+    assert len(batch) == 115 and max(t['id'] for t in batch) == 405
+    collector.commit_cursors()
+    assert collector.cursors.get('bitcoin') == '405'
+    assert collector.cursors.get('bitcoin_backfill') == {'since_id': '100', 'until_id': '191'}
+    assert sorted(t['id'] for t in collector.collect_tweets('bitcoin')) == list(range(101, 191))
+    collector.commit_cursors()
+    assert collector.cursors.get('bitcoin_backfill') is None
+    assert collector.cursors.get('bitcoin') == '405'
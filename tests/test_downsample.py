@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+from src.visualization.downsample import lttb_indices, minmax_indices, downsample_frame
+
+def test_lttb_keeps_endpoints_and_spikes():
+    x = np.arange(10000)
+    y = np.sin(x / 100.0)
+    y[4321] = 50.0
+    indices = lttb_indices(x, y, 500)
+    assert len(indices) == 500
+    assert indices[0] == 0 and indices[-1] == 9999
+    assert 4321 in indices
+    assert np.all(np.diff(indices) > 0)
+
+def test_minmax_keeps_extremes_per_bucket():
+    y = np.random.default_rng(0).normal(size=10000)
+    y[777] = -40.0
+    indices = minmax_indices(y, 100)
+    assert len(indices) <= 200
+    assert 777 in indices and int(np.argmax(y)) in indices
+
+def test_downsample_frame_is_noop_below_cap():
+    df = pd.DataFrame({'timestamp': pd.date_range('2024-01-01', periods=10, freq='D'), 'price': np.arange(10.0)})
+    assert downsample_frame(df, 'timestamp', 'price', 100) is df
+    assert len(downsample_frame(df, 'timestamp', 'price', 5)) == 5
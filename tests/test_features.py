@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+from src.data.storage import DataStore
+from src.models.features import FeatureBuilder
+
+def _prices(periods=600, coins=('bitcoin', 'ethereum')):
+    rng = np.random.default_rng(0)
+    index = pd.Index(pd.date_range('2024-01-01', periods=periods, freq='1h'), name='timestamp')
+    return {coin: pd.DataFrame({'price': 100 * np.exp(np.cumsum(rng.normal(0, 0.01, periods))),
+                                'volume': rng.uniform(1, 10, periods)}, index=index) for coin in coins}
+
+def _sentiment(count=2000):
+    rng = np.random.default_rng(1)
+    start = pd.Timestamp('2024-01-01')
+    return [{'created_at': (start + pd.Timedelta(minutes=int(minute))).isoformat() + 'Z',
+             'crypto_id': coin, 'crypto_ids': [coin] if i % 4 else ['bitcoin', 'ethereum'],
+             'sentiment_analysis': {'sentiment': ['POS', 'NEG', 'NEU'][i % 3], 'confidence': 0.8}}
+            for i, (minute, coin) in enumerate(zip(rng.integers(0, 36000, count), rng.choice(['bitcoin', 'ethereum'], count)))]
+
+def test_sentiment_joins_only_after_its_bucket_closes(tmp_path):
+    index = pd.Index(pd.date_range('2024-01-01', periods=4, freq='1h'), name='timestamp')
+    prices = pd.DataFrame({'price': [1.0, 2.0, 4.0, 2.0], 'volume': 1.0}, index=index)
+    records = [{'created_utc': pd.Timestamp('2024-01-01 01:30').timestamp(), 'crypto_id': 'bitcoin',
+                'sentiment_analysis': {'sentiment': 'POS', 'confidence': 0.5}}]
+    builder = FeatureBuilder(cache_dir=str(tmp_path), volatility_windows=[2], volume_window=2,
+                             sentiment_windows=['2h'], sentiment_lags=[1])
+    features = builder.build({'bitcoin': prices}, records)
+    assert features['sentiment_count'].tolist() == [0, 0, 1, 1]
+    assert features['sentiment_age_seconds'].tolist()[2:] == [0.0, 3600.0]
+    assert features['sentiment_mean'].iloc[2] == 0.5
+    assert features['sentiment_mean_lag1'].iloc[3] == 0.5
+    assert np.allclose(features['return'].iloc[1:], [1.0, 1.0, -0.5])
+
+def test_chunked_build_matches_single_pass_and_is_cached(tmp_path):
+    prices, records = _prices(), _sentiment()
+    whole = FeatureBuilder(cache_dir=str(tmp_path / 'whole'), volatility_windows=[24, 48]).build(prices, records)
+    chunked = FeatureBuilder(cache_dir=str(tmp_path / 'chunked'), volatility_windows=[24, 48], memory_budget_mb=0.05)
+    assert chunked.chunk_rows < 600
+    pd.testing.assert_frame_equal(whole, chunked.build(prices, records))
+    assert len(whole) == 1200
+    assert whole['volatility_48'].notna().sum() == 2 * (600 - 48)
+    cached = FeatureBuilder(cache_dir=str(tmp_path / 'whole'), volatility_windows=[24, 48])
+    cached.compute = None
+    pd.testing.assert_frame_equal(whole, cached.build(prices, records))
+
+def test_build_from_store_matches_in_memory_build(tmp_path):
+    prices, records = _prices(), _sentiment()
+    store = DataStore(str(tmp_path / 'store'))
+    for coin, df in prices.items():
+        store.append('prices_historical_usd', df.reset_index().assign(crypto_id=coin))
+    store.append('sentiment_tweets', records, time_key='created_at')
+    builder = FeatureBuilder(cache_dir=str(tmp_path / 'features'), memory_budget_mb=0.05)
+    path = builder.build_from_store(store)
+    expected = FeatureBuilder(cache_dir=str(tmp_path / 'memory')).build(prices, records)
+    pd.testing.assert_frame_equal(expected, FeatureBuilder.load(path), check_dtype=False)
+    assert builder.build_from_store(store) == path
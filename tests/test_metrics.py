@@ -0,0 +1,58 @@
+import pstats
+import pytest
+import urllib.request
+from src.data.metrics import MetricsRegistry, METRICS, profiled
+from src.data.rate_limiter import TokenBucket
+
+def test_stage_records_latency_items_and_errors():
+    metrics = MetricsRegistry(buckets=(0.1, 1.0))
+    with metrics.stage('price', 'fetch', items=3):
+        pass
+    with pytest.raises(ValueError):
+        with metrics.stage('price', 'fetch', items=5):
+            raise ValueError('bad payload')
+    with metrics.stage('reddit', 'fetch') as stage:
+        stage['items'] = 7
+    snapshot = metrics.snapshot()
+    price = (('source', 'price'), ('stage', 'fetch'))
+    assert snapshot['stage_duration_seconds'][price]['count'] == 2
+    assert snapshot['stage_items_total'][price] == 3
+    assert snapshot['stage_errors_total'][price] == 1
+    assert snapshot['stage_items_total'][(('source', 'reddit'), ('stage', 'fetch'))] == 7
+    assert set(metrics.stage_summary()) == {'price.fetch', 'reddit.fetch'}
+
+def test_render_prometheus_text_format(tmp_path):
+    metrics = MetricsRegistry(buckets=(0.1, 1.0))
+    metrics.observe('stage_duration_seconds', 0.05, source='twitter', stage='save')
+    metrics.observe('stage_duration_seconds', 0.5, source='twitter', stage='save')
+    metrics.observe('stage_duration_seconds', 5.0, source='twitter', stage='save')
+    metrics.inc('rate_limited_total', limiter='co"in')
+    text = metrics.render()
+    assert '# TYPE cryptopulse_stage_duration_seconds histogram' in text
+    assert 'cryptopulse_stage_duration_seconds_bucket{source="twitter",stage="save",le="0.1"} 1' in text
+    assert 'cryptopulse_stage_duration_seconds_bucket{source="twitter",stage="save",le="1"} 2' in text
+    assert 'cryptopulse_stage_duration_seconds_bucket{source="twitter",stage="save",le="+Inf"} 3' in text
+    assert 'cryptopulse_stage_duration_seconds_count{source="twitter",stage="save"} 3' in text
+    assert 'cryptopulse_rate_limited_total{limiter="co\\"in"} 1' in text
+    path = tmp_path / 'metrics' / 'cryptopulse.prom'
+    metrics.write_textfile(str(path))
+    assert path.read_text() == text
+    server = metrics.serve(port=0)
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{server.server_address[1]}/metrics') as response:
+            assert response.read().decode('utf-8') == text
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_rate_limit_waits_are_exported_and_cycle_can_be_profiled(tmp_path):
+    METRICS.reset()
+    bucket = TokenBucket(rate=100, capacity=1, name='bench')
+    path = tmp_path / 'cycle.prof'
+    with profiled(str(path)):
+        for _ in range(3):
+            bucket.acquire()
+    waits = METRICS.snapshot()['rate_limit_wait_seconds_total'][(('limiter', 'bench'),)]
+    assert waits == pytest.approx(bucket.total_wait)
+    assert waits > 0
+    assert pstats.Stats(str(path)).total_calls > 0
@@ -0,0 +1,87 @@
+import pytest
+from src.sentiment import backends
+from src.sentiment.analyzer import SentimentAnalyzer
+from src.sentiment.prefilter import PreInferenceFilter, MinHashLSH, normalize_text
+from src.data.records import read_records, write_records
+
+class CountingPipeline:
+    def __init__(self):
+        self.texts = []
+
+    def __call__(self, inputs, **kwargs):
+        batch = [inputs] if isinstance(inputs, str) else list(inputs)
+        self.texts.extend(batch)
+        return [{'label': 'POS' if 'moon' in text else 'NEG', 'score': 0.9} for text in batch]
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    monkeypatch.setattr(backends, 'pipeline', lambda *args, **kwargs: CountingPipeline())
+    return SentimentAnalyzer()
+
+def test_normalization_and_minhash_similarity():
+    assert normalize_text('RT @bot: $BTC to the MOON 🚀🚀 https://t.co/x1') == '$btc to the moon'
+    lsh = MinHashLSH(threshold=0.8)
+    base = 'bitcoin breaks out above resistance as whales keep accumulating before the halving'
+    lsh.add(0, lsh.signature(base))
+    assert lsh.query(lsh.signature(base + ' today')) == 0
+    assert lsh.query(lsh.signature('ethereum fees spike while the merge upgrade stalls on testnet')) is None
+
+def test_duplicate_clusters_share_one_inference(analyzer):
+    analyzer.prefilter = PreInferenceFilter()
+    texts = ['Bitcoin to the moon, buy now before the halving! https://t.co/a',
+             'Bitcoin to the moon, buy now before the halving!! 🚀 https://t.co/b',
+             'bitcoin to the moon buy now before the halving today',
+             'ETH looks terrible, dumping my bags',
+             '']
+    results = analyzer._score_texts(texts, batch_size=8)
+    assert len(analyzer.analyzer.texts) == 3
+    assert [r['sentiment'] for r in results[:4]] == ['pos', 'pos', 'pos', 'neg']
+    assert analyzer._score_texts(['@alice Bitcoin to the moon, buy now before the halving'], 8)[0]['sentiment'] == 'pos'
+    assert len(analyzer.analyzer.texts) == 3
+    report = analyzer.prefilter.report()
+    assert report['exact_duplicates'] == 2 and report['near_duplicates'] == 1
+    assert report['inference_avoided'] == 3
+
+def test_result_cache_evicts_least_recently_used_after_the_batch():
+    prefilter = PreInferenceFilter(max_entries=3)
+    inferred = []
+
+    def infer(texts):
+        inferred.extend(texts)
+        return [{'sentiment': 'pos', 'confidence': 0.9, 'text': text} for text in texts]
+
+    first = ['alpha coin pumps hard today', 'beta token dumps after listing', 'gamma chain halts block production']
+    prefilter.score(first, infer)
+    batch = [first[0], 'delta swap launches new pool', 'epsilon dao passes vote', 'zeta bridge exploited again']
+    assert [r['text'] for r in prefilter.score(batch, infer)] == [first[0]] + batch[1:]
+    assert len(inferred) == 6
+    prefilter = PreInferenceFilter(max_entries=3)
+    prefilter.score(first, infer)
+    prefilter.score([first[0], batch[1]], infer)
+    # alpha was just reused, so the trim pushes out beta rather than alpha.
+    prefilter.score([first[0]], infer)
+    assert len(inferred) == 10
+    prefilter.score([first[1]], infer)
+    assert inferred[-1] == first[1] and len(inferred) == 11
+
+@pytest.mark.parametrize('action', ['drop', 'route'])
+def test_language_gate_drops_or_routes_before_inference(analyzer, tmp_path, action):
+    analyzer.prefilter = PreInferenceFilter(languages=['en'], language_action=action)
+    input_path = str(tmp_path / 'tweets.jsonl')
+    write_records(input_path, [{'id': 1, 'text': 'to the moon', 'lang': 'en'},
+                               {'id': 2, 'text': 'zum mond', 'lang': 'de'},
+                               {'id': 3, 'text': '🚀🚀', 'lang': 'und'},
+                               {'id': 4, 'text': 'al la luna', 'lang': 'es'}])
+    output_path = str(tmp_path / 'out' / 'sentiment_tweets.jsonl')
+    analyzer.analyze_file(input_path, output_path)
+    assert [r['id'] for r in read_records(output_path)] == [1, 3]
+    assert sorted(analyzer.analyzer.texts) == ['to the moon', '🚀🚀']
+    routed = SentimentAnalyzer.routed_path(output_path)
+    if action == 'route':
+        assert [r['id'] for r in read_records(routed)] == [2, 4]
+    else:
+        assert not (tmp_path / 'out' / 'routed').exists()
+    report = analyzer.prefilter.report()
+    assert report['language_dropped' if action == 'drop' else 'language_routed'] == 2
+    assert report['rejected_languages'] == {'de': 1, 'es': 1}
+    assert report['inference_avoided'] == 2
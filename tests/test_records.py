@@ -0,0 +1,47 @@
+import gzip
+import json
+import tracemalloc
+import pytest
+from src.data import records
+from src.data.records import RecordWriter, iter_records, read_records, write_records, is_record_file
+
+ROWS = [{'id': i, 'text': f'bitcoin "to" the moon ]}} {i} ünïcode', 'crypto_ids': ['bitcoin']} for i in range(500)]
+
+@pytest.mark.parametrize('suffix', ['.jsonl', '.jsonl.gz', '.json'])
+def test_round_trip_in_every_format(tmp_path, suffix):
+    path = str(tmp_path / f'posts{suffix}')
+    assert write_records(path, iter(ROWS)) == len(ROWS)
+    assert read_records(path) == ROWS
+    assert [p.name for p in tmp_path.iterdir()] == [f'posts{suffix}']
+    if suffix == '.jsonl.gz':
+        assert gzip.open(path).readline().startswith(b'{"id":0,')
+    assert is_record_file(path) and not is_record_file(str(tmp_path / '.tmp_posts.jsonl'))
+
+def test_legacy_indented_arrays_stream_and_encoders_agree(tmp_path, monkeypatch):
+    legacy = tmp_path / 'posts.json'
+    legacy.write_text(json.dumps(ROWS, indent=2, ensure_ascii=False), encoding='utf-8')
+    assert list(iter_records(str(legacy))) == ROWS
+    (tmp_path / 'empty.json').write_text(' [ ]\n', encoding='utf-8')
+    assert read_records(str(tmp_path / 'empty.json')) == []
+    fast = records.dumps(ROWS[3])
+    monkeypatch.setattr(records, 'orjson', None)
+    assert records.dumps(ROWS[3]) == fast
+    with pytest.raises(RuntimeError):
+        with RecordWriter(str(tmp_path / 'broken.jsonl')) as writer:
+            writer.write(ROWS[0])
+            raise RuntimeError('collector crashed')
+    assert not (tmp_path / 'broken.jsonl').exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['empty.json', 'posts.json']
+
+def test_memory_stays_flat_as_files_grow(tmp_path):
+    def peak(count):
+        path = str(tmp_path / f'{count}.jsonl')
+        write_records(path, ({'id': i, 'text': 'x' * 200} for i in range(count)))
+        tracemalloc.start()
+        for _ in iter_records(path):
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+    small, large = peak(2000), peak(50000)
+    assert large < small * 2 + 100_000
@@ -0,0 +1,221 @@
+import os
+import json
+import threading
+import pytest
+from types import SimpleNamespace
+from src.sentiment import analyzer as analyzer_module, backends
+from src.sentiment.analyzer import SentimentAnalyzer
+from src.sentiment.cache import SentimentCache
+from src.data.records import read_records, write_records
+from src.data.storage import DataStore
+from src.sentiment.aggregator import RollingSentimentAggregator
+
+class FakePipeline:
+    def __init__(self):
+        self.calls = []
+
+    def _score(self, text):
+        if 'boom' in text:
+            raise RuntimeError('model failure')
+        if 'good' in text:
+            return {'label': 'POS', 'score': 0.9}
+        if 'bad' in text:
+            return {'label': 'NEG', 'score': 0.8}
+        return {'label': 'NEU', 'score': 0.7}
+
+    def __call__(self, inputs, **kwargs):
+        batch = [inputs] if isinstance(inputs, str) else list(inputs)
+        self.calls.append(batch)
+        return [self._score(text) for text in batch]
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    monkeypatch.setattr(backends, 'pipeline', lambda *args, **kwargs: FakePipeline())
+    return SentimentAnalyzer()
+
+def test_analyze_texts_preserves_order(analyzer):
+    texts = ['a good day', 'bad', 'nothing much to say here at all', 'good']
+    results = analyzer.analyze_texts(texts, batch_size=2)
+    assert [r['sentiment'] for r in results] == ['pos', 'neg', 'neu', 'pos']
+    assert len(analyzer.analyzer.calls) == 2
+    assert analyzer.last_throughput > 0
+
+def test_analyze_texts_falls_back_to_neutral_per_item(analyzer):
+    results = analyzer.analyze_texts(['good', 'boom', 'bad'], batch_size=8)
+    assert results[0]['sentiment'] == 'pos'
+    assert results[1] == {'sentiment': 'neutral', 'confidence': 0.0}
+    assert results[2]['sentiment'] == 'neg'
+
+def test_analyze_file(analyzer, tmp_path):
+    input_path = tmp_path / 'posts.json'
+    output_path = tmp_path / 'sentiment_posts.json'
+    input_path.write_text(json.dumps([{'text': 'good'}, {'text': 'bad'}]), encoding='utf-8')
+    analyzer.analyze_file(str(input_path), str(output_path))
+    data = json.loads(output_path.read_text(encoding='utf-8'))
+    assert [item['sentiment_analysis']['sentiment'] for item in data] == ['pos', 'neg']
+
+def test_analyze_file_streams_ndjson_in_chunks(analyzer, tmp_path):
+    input_path = str(tmp_path / 'posts.jsonl.gz')
+    output_path = str(tmp_path / 'sentiment_posts.jsonl.gz')
+    write_records(input_path, ({'id': i, 'text': 'good' if i % 2 else 'bad'} for i in range(10)))
+    analyzer.analyze_file(input_path, output_path, chunk_size=4)
+    assert [len(batch) for batch in analyzer.analyzer.calls] == [4, 4, 2]
+    data = read_records(output_path)
+    assert [item['id'] for item in data] == list(range(10))
+    assert [item['sentiment_analysis']['sentiment'] for item in data[:2]] == ['neg', 'pos']
+
+def test_cache_skips_inference_across_instances(monkeypatch, tmp_path):
+    monkeypatch.setattr(backends, 'pipeline', lambda *args, **kwargs: FakePipeline())
+    db_path = str(tmp_path / 'cache.sqlite')
+    first = SentimentAnalyzer('model-a', cache=SentimentCache('model-a', db_path=db_path))
+    first.analyze_texts(['good', 'bad'])
+    first.cache.close()
+    second = SentimentAnalyzer('model-a', cache=SentimentCache('model-a', db_path=db_path))
+    results = second.analyze_texts(['good', 'RT @someone: good', 'bad'])
+    assert [r['sentiment'] for r in results] == ['pos', 'pos', 'neg']
+    assert second.analyzer.calls == []
+    assert second.cache.stats()['hits'] == 3
+
+def test_cache_invalidates_on_model_change(tmp_path):
+    db_path = str(tmp_path / 'cache.sqlite')
+    cache = SentimentCache('model-a', db_path=db_path)
+    cache.put('good', {'sentiment': 'pos', 'confidence': 0.9})
+    cache.close()
+    cache = SentimentCache('model-b', db_path=db_path)
+    assert cache.get('good') is None
+    assert cache.stats()['misses'] == 1
+
+def test_incremental_directory_only_processes_new_or_changed(analyzer, tmp_path):
+    input_dir = tmp_path / 'tweets'
+    output_dir = tmp_path / 'sentiment'
+    input_dir.mkdir()
+    (input_dir / 'a.json').write_text(json.dumps([{'text': 'good'}]), encoding='utf-8')
+    (input_dir / 'b.json').write_text(json.dumps([{'text': 'bad'}]), encoding='utf-8')
+    analyzer.analyze_directory(str(input_dir), str(output_dir), incremental=True)
+    assert len(analyzer.analyzer.calls) == 2
+    analyzer.analyze_directory(str(input_dir), str(output_dir), incremental=True)
+    assert len(analyzer.analyzer.calls) == 2
+    (input_dir / 'b.json').write_text(json.dumps([{'text': 'good'}, {'text': 'bad'}]), encoding='utf-8')
+    analyzer.analyze_directory(str(input_dir), str(output_dir), incremental=True)
+    assert len(analyzer.analyzer.calls) == 3
+    data = json.loads((output_dir / 'sentiment_b.json').read_text(encoding='utf-8'))
+    assert len(data) == 2
+    assert sorted(os.listdir(output_dir)) == ['.manifest.json', 'sentiment_a.json', 'sentiment_b.json']
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        backends.load_pipeline('model-a', backend='tpu')
+
+def test_compare_backends_reports_agreement_confidence_delta_and_speedup(monkeypatch):
+    # int8 keeps every label at a lower confidence; onnx turns negatives neutral.
+    outputs = {
+        'torch': {'POS': ('POS', 0.9), 'NEG': ('NEG', 0.8)},
+        'torch-int8': {'POS': ('POS', 0.8), 'NEG': ('NEG', 0.7)},
+        'onnx': {'POS': ('POS', 0.9), 'NEG': ('NEU', 0.6)}
+    }
+    loaded = []
+
+    def load_pipeline(model_name, backend='torch', cache_dir=None):
+        loaded.append(backend)
+        labels = outputs[backend]
+        return lambda texts, **kwargs: [dict(zip(('label', 'score'), labels['POS' if 'good' in t else 'NEG']))
+                                        for t in ([texts] if isinstance(texts, str) else texts)]
+
+    monkeypatch.setattr(analyzer_module, 'load_pipeline', load_pipeline)
+    # Each backend is timed between two perf_counter calls: 2s for torch, 1s for onnx, 0.5s for int8.
+    ticks = iter([0.0, 2.0, 10.0, 11.0, 20.0, 20.5])
+    monkeypatch.setattr(backends, 'time', SimpleNamespace(perf_counter=lambda: next(ticks)))
+    report = backends.compare_backends(['good', 'bad', 'good', 'bad'], backends=('onnx', 'torch-int8', 'torch'))
+    assert loaded == ['torch', 'onnx', 'torch-int8']
+    assert report['torch'] == {'items_per_sec': 2.0, 'label_agreement': 1.0, 'mean_confidence_delta': 0.0, 'speedup': 1.0}
+    assert report['onnx']['label_agreement'] == 0.5
+    assert report['onnx']['mean_confidence_delta'] == pytest.approx(0.1)
+    assert report['onnx']['speedup'] == pytest.approx(2.0)
+    assert report['torch-int8']['label_agreement'] == 1.0
+    assert report['torch-int8']['mean_confidence_delta'] == pytest.approx(0.1)
+    assert report['torch-int8']['speedup'] == pytest.approx(4.0)
+
+def test_parallel_directory_matches_serial(analyzer, tmp_path):
+    input_dir = tmp_path / 'reddit'
+    input_dir.mkdir()
+    for index in range(4):
+        items = [{'text': 'good' if (index + i) % 3 == 0 else 'bad' if (index + i) % 3 == 1 else 'meh'} for i in range(5)]
+        (input_dir / f'posts_{index}.json').write_text(json.dumps(items), encoding='utf-8')
+    analyzer.analyze_directory(str(input_dir), str(tmp_path / 'serial'))
+    analyzer.analyze_directory(str(input_dir), str(tmp_path / 'parallel'), workers=2, incremental=True)
+    for index in range(4):
+        name = f'sentiment_posts_{index}.json'
+        assert (tmp_path / 'serial' / name).read_bytes() == (tmp_path / 'parallel' / name).read_bytes()
+    manifest = json.loads((tmp_path / 'parallel' / '.manifest.json').read_text(encoding='utf-8'))
+    assert len(manifest['files']) == 4
+
+def test_parallel_directory_raises_on_worker_failure_like_serial(analyzer, tmp_path):
+    input_dir = tmp_path / 'reddit'
+    input_dir.mkdir()
+    for index in range(3):
+        (input_dir / f'posts_{index}.json').write_text(json.dumps([{'text': 'good'}]), encoding='utf-8')
+    (input_dir / 'posts_broken.json').write_text('[{"text": ', encoding='utf-8')
+    with pytest.raises(ValueError):
+        analyzer.analyze_directory(str(input_dir), str(tmp_path / 'serial'))
+    with pytest.raises(RuntimeError, match='posts_broken.json'):
+        analyzer.analyze_directory(str(input_dir), str(tmp_path / 'parallel'), workers=2, incremental=True)
+    manifest = json.loads((tmp_path / 'parallel' / '.manifest.json').read_text(encoding='utf-8'))
+    assert sorted(manifest['files']) == ['posts_0.json', 'posts_1.json', 'posts_2.json']
+
+def test_cache_connections_wait_for_a_locked_database(tmp_path):
+    db_path = str(tmp_path / 'cache.sqlite')
+    first = SentimentCache('model-a', db_path=db_path)
+    second = SentimentCache('model-a', db_path=db_path, busy_timeout=5.0)
+    assert second._conn.execute('PRAGMA busy_timeout').fetchone()[0] == 5000
+    first._conn.execute('BEGIN IMMEDIATE')
+    threading.Timer(0.2, first._conn.commit).start()
+    second.put_many([('good', {'sentiment': 'pos', 'confidence': 0.9})])
+    assert SentimentCache('model-a', db_path=db_path).get_many(['good']) == [{'sentiment': 'pos', 'confidence': 0.9}]
+
+def test_analyze_store_scores_only_new_records(analyzer, tmp_path):
+    store = DataStore(str(tmp_path))
+    store.append('reddit', [{'id': 'a', 'text': 'good', 'created_utc': 1704103200.0}], time_key='created_utc')
+    assert analyzer.analyze_store(store, 'reddit') == 1
+    store.append('reddit', [{'id': 'b', 'text': 'bad', 'created_utc': 1704106800.0}], time_key='created_utc')
+    assert analyzer.analyze_store(store, 'reddit') == 1
+    assert analyzer.analyze_store(store, 'reddit', start='2024-01-01') == 0
+    scored = store.query('sentiment_reddit')
+    assert scored['id'].tolist() == ['a', 'b']
+    assert [s['sentiment'] for s in scored['sentiment_analysis']] == ['pos', 'neg']
+
+def test_analyze_store_feeds_aggregator(analyzer, tmp_path):
+    store = DataStore(str(tmp_path))
+    store.append('tweets', [
+        {'id': '1', 'text': 'good', 'created_at': '2024-01-01T10:00:00+00:00', 'crypto_id': 'bitcoin',
+         'crypto_ids': ['bitcoin', 'ethereum']},
+        {'id': '2', 'text': 'bad', 'created_at': '2024-01-01T10:01:00+00:00', 'crypto_id': 'bitcoin',
+         'crypto_ids': ['bitcoin']}
+    ], time_key='created_at')
+    analyzer.aggregator = RollingSentimentAggregator()
+    assert analyzer.analyze_store(store, 'tweets') == 2
+    assert analyzer.aggregator.snapshot('bitcoin')['1h']['count'] == 2
+    assert analyzer.aggregator.snapshot('ethereum')['1h'] == {'count': 1, 'mean': 0.9}
+
+def test_analyze_file_feeds_aggregator(analyzer, tmp_path):
+    analyzer.aggregator = RollingSentimentAggregator()
+    input_path = tmp_path / 'tweets.json'
+    input_path.write_text(json.dumps([
+        {'text': 'good', 'created_at': '2024-01-01T10:00:00+00:00', 'crypto_id': 'bitcoin'},
+        {'text': 'bad', 'created_at': '2024-01-01T10:01:00+00:00', 'crypto_id': 'bitcoin'}
+    ]), encoding='utf-8')
+    analyzer.analyze_file(str(input_path), str(tmp_path / 'out.json'))
+    assert analyzer.aggregator.snapshot('bitcoin')['1h']['count'] == 2
+    assert analyzer.aggregator.ingest_directory(str(tmp_path)) == 0
+
+def test_parallel_directory_feeds_aggregator_in_time_order(analyzer, tmp_path):
+    input_dir = tmp_path / 'tweets'
+    input_dir.mkdir()
+    for index in range(3):
+        items = [{'text': 'good', 'crypto_id': 'bitcoin', 'created_utc': 1_700_000_000.0 + (index * 60 + i) * 120}
+                 for i in range(60)]
+        write_records(str(input_dir / f'tweets_{index}.jsonl'), reversed(items))
+    analyzer.aggregator = RollingSentimentAggregator(windows={'24h': 86400})
+    analyzer.analyze_directory(str(input_dir), str(tmp_path / 'sentiment'), workers=2)
+    assert analyzer.aggregator.dropped_late == 0
+    assert analyzer.aggregator.snapshot('bitcoin')['24h']['count'] == 180
+    assert analyzer.aggregator.ingest_directory(str(tmp_path / 'sentiment')) == 0
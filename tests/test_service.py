@@ -0,0 +1,85 @@
+import time
+import threading
+import pytest
+from src.sentiment import backends
+from src.sentiment.analyzer import SentimentAnalyzer
+from src.sentiment.service import SentimentService, SentimentClient, ServiceOverloaded, make_server
+
+class FakePipeline:
+    def __init__(self, gate=None):
+        self.calls = []
+        self.gate = gate
+
+    def __call__(self, inputs, **kwargs):
+        batch = [inputs] if isinstance(inputs, str) else list(inputs)
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.calls.append(batch)
+        return [{'label': 'POS' if 'good' in text else 'NEG', 'score': 0.9} for text in batch]
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    monkeypatch.setattr(backends, 'pipeline', lambda *args, **kwargs: FakePipeline())
+    return SentimentAnalyzer()
+
+def test_concurrent_requests_are_coalesced_into_micro_batches(analyzer):
+    service = SentimentService(analyzer, max_batch_size=8, max_wait_ms=200).start()
+    texts = [f'{"good" if i % 2 else "bad"} post {i}' for i in range(16)]
+    results = [None] * len(texts)
+
+    def call(i):
+        results[i] = service.analyze_text(texts[i])
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(texts))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    service.stop()
+    assert [r['sentiment'] for r in results] == ['neg', 'pos'] * 8
+    assert sum(len(batch) for batch in analyzer.analyzer.calls) == 16
+    assert len(analyzer.analyzer.calls) <= 4
+    stats = service.stats()
+    assert stats['requests'] == 16 and stats['queue_depth'] == 0
+    assert stats['mean_batch_size'] >= 4
+    assert stats['latency_ms']['p50'] <= stats['latency_ms']['p99']
+
+def test_full_queue_rejects_with_retry_hint():
+    gate = threading.Event()
+    analyzer = SentimentAnalyzer()
+    analyzer.analyzer = FakePipeline(gate)
+    service = SentimentService(analyzer, max_batch_size=1, max_wait_ms=0, max_queue=2).start()
+    first = service.submit(['good first'])
+    while service.stats()['queue_depth']:
+        time.sleep(0.001)
+    queued = service.submit(['a', 'b'])
+    with pytest.raises(ServiceOverloaded) as error:
+        service.submit(['c'])
+    assert error.value.retry_after > 0
+    assert service.stats()['rejected'] == 1
+    gate.set()
+    assert first.done.wait(5) and queued.done.wait(5)
+    assert [r['sentiment'] for r in queued.results] == ['neg', 'neg']
+    service.stop()
+
+@pytest.mark.parametrize('transport', ['http', 'unix'])
+def test_client_round_trip_and_analyzer_delegation(analyzer, tmp_path, transport):
+    service = SentimentService(analyzer, max_wait_ms=1).start()
+    url = 'http://127.0.0.1:0' if transport == 'http' else f'unix://{tmp_path}/sentiment.sock'
+    server = make_server(service, url)
+    if transport == 'http':
+        url = f'http://127.0.0.1:{server.server_address[1]}'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = SentimentClient(url, chunk_size=3)
+        assert client.analyze_text('good coin') == {'sentiment': 'pos', 'confidence': 0.9}
+        assert [r['sentiment'] for r in client.analyze_texts(['good', 'bad', 'good', 'bad'])] == ['pos', 'neg', 'pos', 'neg']
+        remote = SentimentAnalyzer(service_url=url)
+        assert [r['sentiment'] for r in remote.analyze_texts(['bad day', 'good day'])] == ['neg', 'pos']
+        assert client.stats()['texts'] == 7
+        service.max_queue = 0
+        with pytest.raises(ServiceOverloaded):
+            SentimentClient(url, max_retries=1).analyze_text('good')
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.stop()
@@ -0,0 +1,46 @@
+import os
+import sys
+import json
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ['tweepy', 'praw', 'transformers', 'torch', 'pandas', 'pyarrow']
+CREDENTIALS = ['TWITTER_API_KEY', 'TWITTER_API_SECRET', 'TWITTER_ACCESS_TOKEN', 'TWITTER_ACCESS_TOKEN_SECRET',
+               'REDDIT_CLIENT_ID', 'REDDIT_CLIENT_SECRET']
+
+def _loaded_after(snippet, tmp_path):
+    env = {name: value for name, value in os.environ.items() if name not in CREDENTIALS}
+    env['PYTHONPATH'] = REPO_ROOT
+    probe = f'{snippet}\nimport sys, json; print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))'
+    result = subprocess.run([sys.executable, '-c', probe], cwd=tmp_path, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_importing_entry_points_defers_heavy_dependencies(tmp_path):
+    assert _loaded_after('import src.data.collector', tmp_path) == []
+    assert _loaded_after('import src.sentiment.analyzer; import src.data.storage', tmp_path) == []
+
+def test_sentiment_client_import_skips_the_analyzer(tmp_path):
+    snippet = ('import sys\n'
+               'from src.sentiment.service import SentimentClient\n'
+               'assert not {"src.sentiment.analyzer", "numpy"} & set(sys.modules), sorted(sys.modules)')
+    assert _loaded_after(snippet, tmp_path) == []
+
+def test_prices_only_collector_needs_no_social_credentials(tmp_path):
+    snippet = ('from src.data.collector import DataCollector\n'
+               'collector = DataCollector(sources=["price"])\n'
+               'assert collector.sources == ("price",)\n'
+               'collector.price')
+    assert _loaded_after(snippet, tmp_path) == []
+
+def test_analyzer_loads_model_on_first_use(monkeypatch):
+    from src.sentiment import backends
+    from src.sentiment.analyzer import SentimentAnalyzer
+    loads = []
+    monkeypatch.setattr(backends, 'pipeline', lambda *args, **kwargs: loads.append(args) or (lambda texts, **kw: [
+        {'label': 'POS', 'score': 0.9} for _ in ([texts] if isinstance(texts, str) else texts)]))
+    analyzer = SentimentAnalyzer()
+    assert loads == []
+    analyzer.analyze_texts(['btc to the moon', 'eth fees'])
+    analyzer.analyze_texts(['doge'])
+    assert len(loads) == 1
@@ -0,0 +1,35 @@
+import os
+from src.data.storage import DataStore
+
+TWEETS = [
+    {'id': 1, 'text': 'btc up', 'created_at': '2024-01-01T10:00:00+00:00', 'crypto_id': 'bitcoin'},
+    {'id': 2, 'text': 'eth down', 'created_at': '2024-01-02T10:00:00+00:00', 'crypto_id': 'ethereum'},
+    {'id': 3, 'text': 'btc flat', 'created_at': '2024-01-02T11:00:00+00:00', 'crypto_id': 'bitcoin'}
+]
+
+def _parquet_files(root):
+    return [f for _, _, files in os.walk(root) for f in files if f.endswith('.parquet')]
+
+def test_append_partitions_by_coin_and_date(tmp_path):
+    store = DataStore(str(tmp_path))
+    assert store.append('tweets', TWEETS, time_key='created_at') == 3
+    assert os.path.isdir(tmp_path / 'tweets' / 'coin=bitcoin' / 'date=2024-01-02')
+    assert len(_parquet_files(tmp_path)) == 3
+
+def test_query_filters_coin_and_time_range(tmp_path):
+    store = DataStore(str(tmp_path))
+    store.append('tweets', TWEETS, time_key='created_at')
+    df = store.query('tweets', coins=['bitcoin'], start='2024-01-02')
+    assert df['id'].tolist() == [3]
+    df = store.query('tweets', end='2024-01-02 10:30', columns=['id'])
+    assert df['id'].tolist() == [1, 2]
+    assert store.query('missing').empty
+
+def test_compact_merges_small_files_and_dedups(tmp_path):
+    store = DataStore(str(tmp_path))
+    store.append('tweets', TWEETS[:1], time_key='created_at')
+    store.append('tweets', [dict(TWEETS[0], text='btc up again', lang='en')], time_key='created_at')
+    assert store.compact('tweets', dedup_on=['id']) == 2
+    assert len(_parquet_files(tmp_path)) == 1
+    df = store.query('tweets')
+    assert df['text'].tolist() == ['btc up again']
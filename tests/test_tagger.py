@@ -0,0 +1,21 @@
+from src.data.tagger import CoinTagger
+
+def test_tags_all_coins_respecting_word_boundaries():
+    tagger = CoinTagger.from_defaults(extra_path=None)
+    assert tagger.tag('Moving to Canada, selling my adaptive strategy') == []
+    assert tagger.tag('#BTC and $eth pumping, ADA next?') == ['bitcoin', 'ethereum', 'cardano']
+    assert tagger.tag('Binance Coin (BNB) vs XRP/ETH') == ['binancecoin', 'ripple', 'ethereum']
+    assert tagger.tag('dogecoin_fan says doge') == ['dogecoin']
+
+def test_overlapping_aliases_and_custom_table():
+    tagger = CoinTagger({'bitcoin-cash': ['bitcoin cash', 'bch'], 'bitcoin': ['bitcoin', 'btc']})
+    assert tagger.tag('bitcoin cash is not bitcoin') == ['bitcoin', 'bitcoin-cash']
+    assert tagger.tag('bitcoins') == []
+
+def test_tag_record_sets_crypto_id_and_ids():
+    tagger = CoinTagger.from_defaults(extra_path=None)
+    post = tagger.tag_record({'title': 'ETH merge', 'text': 'also watching cardano'})
+    assert post['crypto_id'] == 'ethereum'
+    assert post['crypto_ids'] == ['ethereum', 'cardano']
+    tweet = tagger.tag_record({'text': 'btc!', 'crypto_id': 'dogecoin', 'crypto_ids': ['dogecoin']}, text_keys=('text',))
+    assert tweet['crypto_id'] == 'dogecoin' and tweet['crypto_ids'] == ['dogecoin', 'bitcoin']
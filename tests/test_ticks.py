@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from src.data.records import read_records
+from src.data.ticks import TickBuffer, TickPoller
+
+def quote(price):
+    return {'usd': price, 'usd_24h_vol': price * 10, 'usd_market_cap': price * 100, 'usd_24h_change': 1.5,
+            'eur': price * 0.9}
+
+class FakeCollector:
+    cryptocurrencies = {'bitcoin': 'BTC', 'ethereum': 'ETH'}
+    fiat_currencies = ['usd', 'eur']
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_current_prices(self, vs_currencies=None):
+        self.calls += 1
+        return {'bitcoin': quote(100.0 + self.calls), 'ethereum': quote(10.0 + self.calls)}
+
+def test_windows_are_contiguous_read_only_views_across_wraparound():
+    buffer = TickBuffer(['bitcoin', 'ethereum'], ['usd', 'eur'], capacity=8)
+    for i in range(21):
+        buffer.append(1000.0 + i, {'bitcoin': quote(float(i))})
+    times, prices = buffer.window('bitcoin')
+    assert buffer.count == 8 and buffer.total == 21
+    assert times.tolist() == [1000.0 + i for i in range(13, 21)]
+    assert prices.tolist() == [float(i) for i in range(13, 21)]
+    assert np.shares_memory(prices, buffer._values) and prices.flags.c_contiguous
+    with pytest.raises(ValueError):
+        prices[0] = 0.0
+    assert buffer.window('bitcoin', field='volume', n=3)[1].tolist() == [180.0, 190.0, 200.0]
+    assert buffer.window('bitcoin', since=1018.5)[0].tolist() == [1019.0, 1020.0]
+    assert np.isnan(buffer.window('ethereum', n=2)[1]).all()
+    assert np.isnan(buffer.window('bitcoin', 'eur', field='market_cap', n=1)[1]).all()
+
+def test_latest_matches_current_prices_shape():
+    buffer = TickBuffer(['bitcoin', 'ethereum'], ['usd', 'eur'], capacity=4)
+    assert buffer.latest() == {}
+    buffer.append(1.0, {'bitcoin': quote(5.0), 'ethereum': quote(7.0)})
+    buffer.append(2.0, {'bitcoin': quote(6.0)})
+    assert buffer.latest() == {'bitcoin': quote(6.0)}
+
+def test_poller_flushes_pending_ticks_in_batches(tmp_path):
+    poller = TickPoller(FakeCollector(), buffer=TickBuffer(['bitcoin', 'ethereum'], ['usd', 'eur'], capacity=4),
+                        flush_dir=str(tmp_path))
+    for _ in range(3):
+        assert poller.poll_once()
+    assert poller.flush() == 3
+    assert poller.flush() == 0
+    for _ in range(6):
+        poller.poll_once()
+    # Two of the six ticks were overwritten before this flush; the rest go out in one file.
+    assert poller.flush() == 4
+    files = sorted(tmp_path.iterdir())
+    rows = [row for path in files for row in read_records(str(path))]
+    assert len(rows) == (3 + 4) * 4
+    assert {(r['crypto_id'], r['currency']) for r in rows} == {(c, f) for c in ('bitcoin', 'ethereum') for f in ('usd', 'eur')}
+    eur = [r for r in rows if r['currency'] == 'eur']
+    assert eur[0]['volume'] is None and eur[0]['price'] == pytest.approx(0.9 * 101.0)
+    assert rows[-1]['crypto_id'] == 'ethereum' and rows[-1]['price'] == pytest.approx(0.9 * 19.0)
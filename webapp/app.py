@@ -5,33 +5,143 @@ import plotly.express as px
 import json
 import glob
 import os
+import sys
 from datetime import datetime, timedelta
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.data.file_index import LatestFileIndex
+from src.data.records import read_records
+from src.data.storage import DataStore
+from src.data.ticks import TickPoller
+from src.visualization.downsample import downsample_frame
+
+STORE = DataStore()
+INDEX = LatestFileIndex()
+MAX_POINTS_PER_TRACE = 2000
+# CRYPTOPULSE_LIVE_TICKS=1 polls current prices into an in-memory tick buffer, so the overview refreshes
+# without waiting for a collector run or reading files.
+LIVE_TICKS = os.getenv('CRYPTOPULSE_LIVE_TICKS', '0') != '0'
+TICK_INTERVAL = float(os.getenv('CRYPTOPULSE_TICK_INTERVAL', '15'))
+SPARKLINE_POINTS = 240
+
 st.set_page_config(page_title="CryptoPulse Dashboard", page_icon="📈", layout="wide")
 
 # Helper functions
-def load_latest_current_prices():
-    files = glob.glob('data/prices_current_*.json')
-    if not files:
-        return None
-    latest_file = max(files, key=os.path.getctime)
-    with open(latest_file, 'r') as f:
+# Loaders are cached on the (path, updated) pair recorded in data/latest.json by the collectors, so a rerun only
+# stats the index file unless something new has been written.
+@st.cache_data(show_spinner=False)
+def _index_entries(version):
+    return INDEX.load()
+
+def latest_entry(kind):
+    return _index_entries(INDEX.version()).get(kind)
+
+@st.cache_data(show_spinner=False, ttl=300)
+def _latest_legacy_file(pattern):
+    files = glob.glob(pattern)
+    return max(files, key=os.path.getctime) if files else None
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _read_json(path, updated):
+    with open(path, 'r') as f:
         return json.load(f)
 
-def load_historical_prices(crypto_id):
-    files = glob.glob(f'data/prices_historical_{crypto_id}_*.csv')
-    if not files:
+@st.cache_data(show_spinner=False, max_entries=64)
+def _read_records(path, updated):
+    return read_records(path)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _read_csv(path, updated):
+    return pd.read_csv(path, parse_dates=['timestamp'])
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _store_current_prices(updated):
+    df = STORE.latest('prices_current')
+    if df.empty:
         return None
-    latest_file = max(files, key=os.path.getctime)
-    return pd.read_csv(latest_file)
+    return df.drop(columns=['timestamp', 'coin', 'date']).set_index('crypto_id').to_dict('index')
 
-def load_sentiment_data():
-    files = glob.glob('data/sentiment/reddit/sentiment_*.json')
-    if not files:
+@st.cache_data(show_spinner=False, max_entries=64)
+def _store_historical_prices(crypto_id, updated, start, end):
+    df = STORE.query('prices_historical_usd', coins=[crypto_id], start=start, end=end,
+                     columns=['price', 'volume', 'market_cap'], dedup_on=['timestamp'])
+    return None if df.empty else df
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _store_sentiment(source, updated):
+    df = STORE.query(source, start=datetime.utcnow() - timedelta(days=7))
+    return None if df.empty else df.drop(columns=['coin', 'date']).to_dict('records')
+
+def _load_latest(kind, legacy_pattern, reader):
+    entry = latest_entry(kind)
+    if entry is not None and os.path.exists(entry['path']):
+        return reader(entry['path'], entry['updated'])
+    latest_file = _latest_legacy_file(legacy_pattern)
+    if latest_file is None:
         return None
-    latest_file = max(files, key=os.path.getctime)
-    with open(latest_file, 'r') as f:
-        return json.load(f)
+    return reader(latest_file, None)
+
+@st.cache_resource(show_spinner=False)
+def tick_poller():
+    from src.data.price_collector import PriceCollector
+    poller = TickPoller(PriceCollector(), interval=TICK_INTERVAL,
+                        flush_interval=float(os.getenv('CRYPTOPULSE_TICK_FLUSH', '300')),
+                        store=STORE if os.getenv('CRYPTOPULSE_STORAGE') == 'parquet' else None)
+    # Poll once up front so the first render already has live prices.
+    poller.poll_once()
+    return poller.start()
+
+def live_ticks():
+    return tick_poller().buffer if LIVE_TICKS else None
+
+def sparkline(ticks, crypto_id):
+    if (crypto_id, 'usd') not in ticks.pairs:
+        return []
+    # The window is a view into the tick buffer; tolist() copies just the points the chart needs.
+    return [value for value in ticks.window(crypto_id, n=SPARKLINE_POINTS)[1].tolist() if value == value]
+
+def load_latest_current_prices():
+    ticks = live_ticks()
+    if ticks is not None:
+        data = ticks.latest()
+        if data:
+            return data
+    entry = latest_entry('store_prices_current')
+    if entry is not None:
+        data = _store_current_prices(entry['updated'])
+        if data:
+            return data
+    return _load_latest('prices_current', 'data/prices_current_*.json', _read_json)
+
+def _day_bounds(start_date, end_date):
+    start = pd.Timestamp(start_date) if start_date is not None else None
+    end = pd.Timestamp(end_date) + pd.Timedelta(days=1) - pd.Timedelta(milliseconds=1) if end_date is not None else None
+    return start, end
+
+def load_historical_prices(crypto_id, start_date=None, end_date=None):
+    start, end = _day_bounds(start_date, end_date)
+    entry = latest_entry('store_prices_historical_usd')
+    if entry is not None:
+        df = _store_historical_prices(crypto_id, entry['updated'], start, end)
+        if df is not None:
+            return df
+    df = _load_latest(f'history_{crypto_id}_usd', f'data/prices_historical_{crypto_id}_*.csv', _read_csv)
+    if df is None or (start is None and end is None):
+        return df
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= df['timestamp'] >= start
+    if end is not None:
+        mask &= df['timestamp'] <= end
+    return df.loc[mask] if mask.any() else None
+
+def load_sentiment_data():
+    entry = latest_entry('store_sentiment_reddit')
+    if entry is not None:
+        data = _store_sentiment('sentiment_reddit', entry['updated'])
+        if data is not None:
+            return data
+    return _load_latest('sentiment_reddit', 'data/sentiment/reddit/sentiment_*.json*', _read_records)
 
 st.sidebar.title("CryptoPulse")
 st.sidebar.markdown("---")
@@ -45,12 +155,13 @@ if current_prices is None:
     st.error("No price data available. Please run the data collector first.")
     st.stop()
 
-if selected_page == "Market Overview":
-    st.title("📊 Cryptocurrency Market Overview")
+def market_overview():
+    ticks = live_ticks()
+    prices = (ticks.latest() if ticks is not None else None) or current_prices
     col1, col2, col3 = st.columns(3)
-    total_market_cap = sum(data.get('usd_market_cap', 0) for data in current_prices.values())
-    total_volume = sum(data.get('usd_24h_vol', 0) for data in current_prices.values())
-    avg_change = sum(data.get('usd_24h_change', 0) for data in current_prices.values()) / len(current_prices)
+    total_market_cap = sum(data.get('usd_market_cap', 0) for data in prices.values())
+    total_volume = sum(data.get('usd_24h_vol', 0) for data in prices.values())
+    avg_change = sum(data.get('usd_24h_change', 0) for data in prices.values()) / len(prices)
     with col1:
         st.metric("Total Market Cap", f"${total_market_cap:,.0f}")
     with col2:
@@ -59,7 +170,7 @@ if selected_page == "Market Overview":
         st.metric("Average 24h Change", f"{avg_change:.2f}%", delta=f"{avg_change:.2f}%")
     st.subheader("Price Overview")
     price_data = []
-    for crypto_id, data in current_prices.items():
+    for crypto_id, data in prices.items():
         price = data.get('usd', 0)
         change = data.get('usd_24h_change', 0)
         market_cap = data.get('usd_market_cap', 0)
@@ -69,7 +180,8 @@ if selected_page == "Market Overview":
             "Price (USD)": price,
             "24h Change": change,
             "Market Cap": market_cap,
-            "24h Volume": volume
+            "24h Volume": volume,
+            **({"Trend": sparkline(ticks, crypto_id)} if ticks is not None else {})
         })
     df = pd.DataFrame(price_data)
     styled_df = df.copy()
@@ -84,9 +196,18 @@ if selected_page == "Market Overview":
             cmap='RdYlGn',
             gmap=numerical_changes
         ),
-        use_container_width=True
+        use_container_width=True,
+        column_config={"Trend": st.column_config.LineChartColumn("Trend", width="medium")}
     )
 
+# st.fragment (streamlit >= 1.37) reruns only the overview on each tick; older versions refresh on a full rerun.
+if LIVE_TICKS and getattr(st, 'fragment', None) is not None:
+    market_overview = st.fragment(run_every=TICK_INTERVAL)(market_overview)
+
+if selected_page == "Market Overview":
+    st.title("📊 Cryptocurrency Market Overview")
+    market_overview()
+
 elif selected_page == "Price Analysis":
     st.title("💹 Price Analysis")
     selected_crypto = st.selectbox(
@@ -96,10 +217,11 @@ elif selected_page == "Price Analysis":
     )
     historical_data = load_historical_prices(selected_crypto)
     if historical_data is not None:
+        price_points = downsample_frame(historical_data, 'timestamp', 'price', MAX_POINTS_PER_TRACE)
         fig = go.Figure()
         fig.add_trace(go.Scatter(
-            x=historical_data['timestamp'] if 'timestamp' in historical_data else historical_data.index,
-            y=historical_data['price'],
+            x=price_points['timestamp'],
+            y=price_points['price'],
             name='Price',
             line=dict(color='#00ff88', width=2)
         ))
@@ -112,8 +234,8 @@ elif selected_page == "Price Analysis":
         )
         st.plotly_chart(fig, use_container_width=True)
         fig_volume = px.bar(
-            historical_data,
-            x='timestamp' if 'timestamp' in historical_data else historical_data.index,
+            downsample_frame(historical_data, 'timestamp', 'volume', MAX_POINTS_PER_TRACE, method='minmax'),
+            x='timestamp',
             y='volume',
             title=f"{selected_crypto.title()} Trading Volume"
         )
@@ -136,13 +258,14 @@ elif selected_page == "Historical Trends":
     if selected_cryptos:
         fig = go.Figure()
         for crypto in selected_cryptos:
-            historical_data = load_historical_prices(crypto)
+            historical_data = load_historical_prices(crypto, start_date, end_date)
             if historical_data is not None:
-                first_price = historical_data['price'].iloc[0]
-                normalized_prices = (historical_data['price'] - first_price) / first_price * 100
+                prices = historical_data['price'].to_numpy()
+                window = historical_data[['timestamp']].assign(change=(prices / prices[0] - 1.0) * 100)
+                window = downsample_frame(window, 'timestamp', 'change', MAX_POINTS_PER_TRACE)
                 fig.add_trace(go.Scatter(
-                    x=historical_data['timestamp'] if 'timestamp' in historical_data else historical_data.index,
-                    y=normalized_prices,
+                    x=window['timestamp'],
+                    y=window['change'],
                     name=crypto.title(),
                     mode='lines'
                 ))